@@ -0,0 +1,123 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'SDTS-SSL-Generator/1.0'
+
+class TransportSettings:
+    """Pool, timeout and retry settings applied to every ACME transport"""
+
+    __slots__ = ('pool_size', 'connect_timeout', 'read_timeout', 'retries', 'backoff')
+
+    def __init__(self, pool_size: int = 32, connect_timeout: float = 5.0, read_timeout: float = 15.0,
+                 retries: int = 3, backoff: float = 0.5):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+
+class ACMETransport:
+    """Keep-alive connection pool to one ACME server, shared by every client in the process.
+
+    Idempotent GET/HEAD requests are retried on connection errors and 5xx/429
+    responses with exponential backoff. POSTs are never retried, because each
+    JWS carries a single-use nonce. get/head/post mirror requests.Session and
+    apply the configured (connect, read) timeout unless one is given.
+    """
+
+    def __init__(self, base_url: str, settings: Optional[TransportSettings] = None):
+        # Imported here so configuring transports at startup doesn't load requests
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url
+        self.settings = settings or TransportSettings()
+        retry = Retry(
+            total=self.settings.retries,
+            backoff_factor=self.settings.backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            respect_retry_after_header=True,
+            # Hand the final response back so callers' raise_for_status() reports it as before
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.settings.pool_size, max_retries=retry)
+        self.timeout = (self.settings.connect_timeout, self.settings.read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def request(self, method: str, url: str, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        with span('acme.http', method=method, path=urlsplit(url).path) as current:
+            response = self.session.request(method, url, **kwargs)
+            current.set('status_code', response.status_code)
+            return response
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url: str, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def stats(self) -> Dict:
+        """Requests sent and TCP/TLS connections opened; the difference reused a kept-alive connection"""
+        pools = self.adapter.poolmanager.pools
+        connections = requests_sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            'requests': requests_sent,
+            'connections_opened': connections,
+            'connections_reused': max(0, requests_sent - connections),
+            'reuse_ratio': round(1 - connections / requests_sent, 3) if requests_sent else None,
+            'pool_size': self.settings.pool_size,
+        }
+
+_settings = TransportSettings()
+_transports: Dict[str, ACMETransport] = {}
+_transports_pid = os.getpid()
+_transports_lock = threading.Lock()
+
+def configure_transports(**settings):
+    """Replace the transport settings (see TransportSettings); existing pools are dropped"""
+    global _settings
+    with _transports_lock:
+        _settings = TransportSettings(**settings)
+        _transports.clear()
+
+def get_transport(base_url: str) -> ACMETransport:
+    """Return the process-wide transport for an ACME base URL, creating it on first use"""
+    global _transports_pid
+    with _transports_lock:
+        if _transports_pid != os.getpid():
+            # Pooled sockets must not be shared with the parent after a fork
+            _transports.clear()
+            _transports_pid = os.getpid()
+        transport = _transports.get(base_url)
+        if transport is None:
+            transport = _transports[base_url] = ACMETransport(base_url, _settings)
+            logger.info(f"Created pooled ACME transport for {base_url} (pool size {_settings.pool_size})")
+        return transport
+
+def transport_stats() -> Dict[str, Dict]:
+    """Connection reuse stats of every transport created in this process, keyed by base URL"""
+    with _transports_lock:
+        transports = dict(_transports) if _transports_pid == os.getpid() else {}
+    return {base_url: transport.stats() for base_url, transport in transports.items()}
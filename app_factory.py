@@ -1,8 +1,9 @@
-from flask import Flask
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Flask, request
+from werkzeug.exceptions import TooManyRequests
 from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
+import math
+import stat
 import os
 from config import config
 
@@ -24,19 +25,46 @@ def create_app(config_name='default'):
         format=app.config['LOG_FORMAT']
     )
     
+    # Shared caching DNS resolver for domain pre-validation (built on first lookup)
+    from validators import DomainValidator
+    DomainValidator.configure_resolver(
+        nameservers=app.config['DNS_NAMESERVERS'] or None,
+        port=app.config['DNS_PORT'],
+        timeout=app.config['DNS_TIMEOUT'],
+        max_workers=app.config['DNS_MAX_WORKERS'],
+        cache_size=app.config['DNS_CACHE_SIZE']
+    )
+    DomainValidator.CAA_ISSUER = app.config['CAA_ISSUER']
+    
+    # Shared keep-alive connection pools to the CA (created on first ACME request)
+    from acme_transport import configure_transports
+    configure_transports(
+        pool_size=app.config['ACME_POOL_SIZE'],
+        connect_timeout=app.config['ACME_CONNECT_TIMEOUT'],
+        read_timeout=app.config['ACME_READ_TIMEOUT'],
+        retries=app.config['ACME_GET_RETRIES'],
+        backoff=app.config['ACME_RETRY_BACKOFF']
+    )
+    
+    # Request tracing (spans exported to TRACING_FILE and/or an OTLP collector)
+    from tracing import init_tracing
+    init_tracing(app)
+    
     # Security middleware
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
-    # Rate limiting
-    if app.config['RATE_LIMIT_ENABLED']:
-        storage_uri = app.config.get('REDIS_URL') or "memory://"
-        limiter = Limiter(
-            app=app,
-            key_func=get_remote_address,
-            storage_uri=storage_uri,
-            default_limits=["200 per day", "50 per hour"]
+    # Request profiling (not installed at all unless enabled)
+    if app.config['PROFILER_ENABLED']:
+        from request_profiler import SamplingProfilerMiddleware
+        app.wsgi_app = SamplingProfilerMiddleware(
+            app.wsgi_app,
+            output_dir=app.config['PROFILER_DIR'],
+            sample_rate=app.config['PROFILER_SAMPLE_RATE'],
+            slow_ms=app.config['PROFILER_SLOW_MS'],
+            interval_ms=app.config['PROFILER_INTERVAL_MS'],
+            paths=app.config['PROFILER_PATHS'],
+            formats=app.config['PROFILER_FORMATS']
         )
-        app.limiter = limiter
     
     # Create upload directory (skip on Vercel due to read-only filesystem)
     if not os.environ.get('VERCEL'):
@@ -49,15 +77,165 @@ def create_app(config_name='default'):
         # On Vercel, we don't need the upload directory since we handle files in memory
         logging.info("Running on Vercel - skipping upload directory creation")
     
+    # Keyed session store, challenge table and download registry shared by all workers
+    from storage import (
+        SessionStoreFactory, ChallengeTableFactory, DownloadRegistryFactory, OCSPCacheFactory,
+        CertificateInventoryFactory, InflightOrdersFactory, ArtifactStoreFactory
+    )
+    app.session_store = SessionStoreFactory.create_store(app.config)
+    app.challenge_table = ChallengeTableFactory.create_table(app.config)
+    app.download_registry = DownloadRegistryFactory.create_registry(app.config)
+    app.certificate_inventory = CertificateInventoryFactory.create_inventory(app.config)
+    app.artifact_store = ArtifactStoreFactory.create_store(app.config)
+    if app.config['OCSP_ENABLED']:
+        app.ocsp_cache = OCSPCacheFactory.create_cache(app.config)
+    app.inflight_orders = None
+    if app.config['ORDER_COALESCING_ENABLED']:
+        app.inflight_orders = InflightOrdersFactory.create_table(app.config)
+        if not os.environ.get('SECRET_KEY') and not app.config.get('DEBUG') and not app.config.get('TESTING'):
+            logging.warning("SECRET_KEY is not set: each worker signs session cookies with its own random key, "
+                            "so duplicate submits are coalesced across workers only through the form's client id")
+    
+    # Crash-safe order journal, so orders interrupted by a restart resume instead of re-ordering
+    app.order_journal = None
+    if app.config['ORDER_JOURNAL_ENABLED']:
+        from storage import OrderJournal
+        app.order_journal = OrderJournal(
+            app.config['ORDER_JOURNAL_PATH'],
+            fsync_window=app.config['ORDER_JOURNAL_FSYNC_WINDOW_MS'] / 1000.0,
+            retention=app.config['ORDER_JOURNAL_RETENTION_HOURS'] * 3600
+        )
+    
+    # Rate limiting
+    configure_rate_limits(app)
+    
     # Register blueprints
     from routes import main_bp
     app.register_blueprint(main_bp)
     
+    # Static assets and templates
+    from static_assets import init_assets
+    init_assets(app)
+    configure_template_cache(app)
+    
     # Register error handlers
     register_error_handlers(app)
     
+    # Background housekeeping keeps expiry scans off the request path
+    if app.config['REAPER_ENABLED']:
+        import routes
+        from storage import ExpiryReaper
+        reaper = ExpiryReaper(app.config['REAPER_INTERVAL_SECONDS'])
+        reaper.register('sessions', app.session_store.purge_expired, app.session_store.oldest_expiry)
+        reaper.register('challenges', app.challenge_table.purge_expired, app.challenge_table.oldest_expiry)
+        reaper.register('rate_limits', app.rate_limiter.purge_expired, app.rate_limiter.oldest_expiry)
+        reaper.register('downloads', lambda: routes.reap_expired_files(app.download_registry, app.artifact_store),
+                        app.download_registry.oldest_expiry)
+        reaper.register('artifacts', app.artifact_store.purge_expired, app.artifact_store.oldest_expiry)
+        if app.inflight_orders is not None:
+            reaper.register('inflight_orders', app.inflight_orders.purge_expired, app.inflight_orders.oldest_expiry)
+        if app.config['OCSP_ENABLED']:
+            # Responses are refetched at half-life, before stapling edges would see them go stale
+            reaper.register('ocsp', app.ocsp_cache.purge_expired, app.ocsp_cache.oldest_expiry)
+            reaper.register('ocsp_refresh', lambda: routes.get_ocsp_service(app).refresh_due(),
+                            app.ocsp_cache.next_refresh)
+        if app.order_journal is not None:
+            # Finished orders are forgotten after ORDER_JOURNAL_RETENTION_HOURS and compacted out of the file
+            reaper.register('order_journal', app.order_journal.reap, app.order_journal.oldest_expiry)
+        reaper.start()
+        app.reaper = reaper
+    
+    if app.order_journal is not None:
+        start_order_recovery(app)
+    
     return app
 
+def start_order_recovery(app):
+    """Resume interrupted orders in the background, in whichever worker takes the recovery lock first"""
+    import threading
+    import routes
+    
+    def recover():
+        with app.order_journal.recovery_lock() as acquired:
+            if not acquired:
+                return
+            try:
+                resumed = routes.resume_interrupted_orders(app, app.config['ORDER_RECOVERY_GRACE_SECONDS'])
+                if resumed:
+                    logging.info(f"Order recovery finished {resumed} interrupted orders")
+                app.order_journal.compact()
+            except Exception as e:
+                logging.error(f"Order recovery failed: {e}", exc_info=True)
+    
+    threading.Thread(target=recover, name='order-recovery', daemon=True).start()
+
+def configure_rate_limits(app):
+    """Attach the token-bucket limiter and enforce the default per-IP limits.
+    
+    With REDIS_URL, Flask-Limiter keeps the default limits in Redis. Otherwise
+    they go through app.rate_limiter, whose SQLite buckets are shared by every
+    worker; Flask-Limiter's memory:// storage would give each worker its own
+    counters and multiply the effective limit by the worker count.
+    """
+    from storage import RateLimiterFactory, parse_limit
+    app.rate_limiter = RateLimiterFactory.create_limiter(app.config)
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+    
+    default_limits = app.config['RATE_LIMIT_DEFAULTS']
+    if app.config.get('REDIS_URL'):
+        from flask_limiter import Limiter
+        from flask_limiter.util import get_remote_address
+        limiter = Limiter(
+            app=app,
+            key_func=get_remote_address,
+            storage_uri=app.config['REDIS_URL'],
+            default_limits=default_limits
+        )
+        app.limiter = limiter
+        return
+    
+    limits = [parse_limit(limit) for limit in default_limits]
+    
+    @app.before_request
+    def enforce_default_limits():
+        # The CA validates from several vantage points at once; never throttle its challenge fetches
+        if request.endpoint in (None, 'static', 'assets.asset', 'main.health_check', 'main.acme_challenge'):
+            return None
+        client = request.remote_addr or '127.0.0.1'
+        for amount, period in limits:
+            # Per route and client, as Flask-Limiter's default limits are
+            allowed, retry_after = app.rate_limiter.consume(
+                f"default:{amount}/{period}:{request.endpoint}:{client}", amount, period
+            )
+            if not allowed:
+                raise TooManyRequests(retry_after=math.ceil(retry_after))
+        return None
+
+def configure_template_cache(app):
+    """Share compiled templates between workers and restarts through an on-disk bytecode cache.
+    
+    Jinja executes whatever bytecode it finds in the cache, so a directory
+    that another user owns or can write to is refused rather than used.
+    """
+    from jinja2 import FileSystemBytecodeCache
+    cache_dir = app.config.get('JINJA_CACHE_DIR')
+    if cache_dir is None:
+        # Jinja creates (and ownership-checks) a private per-user directory itself
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+        return
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except OSError as e:
+        logging.warning(f"Could not create template cache directory: {e}")
+        return
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        logging.warning(f"Not caching template bytecode in {cache_dir}: it must be a directory owned by "
+                        f"this user and not accessible to group or others (chmod 700)")
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
 def register_error_handlers(app):
     """Register error handlers"""
     @app.errorhandler(404)
@@ -70,4 +248,5 @@ def register_error_handlers(app):
     
     @app.errorhandler(429)
     def ratelimit_handler(e):
-        return {'error': 'Rate limit exceeded'}, 429 
\ No newline at end of file
+        retry_after = [(name, value) for name, value in e.get_headers() if name == 'Retry-After']
+        return {'error': 'Rate limit exceeded'}, 429, retry_after 
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .harness import Benchmark, benchmark, run_benchmarks, compare_results, load_results, save_results
+
+__all__ = ['Benchmark', 'benchmark', 'run_benchmarks', 'compare_results', 'load_results', 'save_results']
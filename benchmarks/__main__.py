@@ -0,0 +1,51 @@
+"""Run the benchmark suite: python -m benchmarks [--filter NAME] [--output FILE] [--compare BASELINE]"""
+import sys
+import logging
+import argparse
+
+from . import bench_acme, bench_artifacts, bench_challenges, bench_inventory, bench_sessions, bench_validation  # noqa: F401  (registers the benchmarks)
+from .harness import run_benchmarks, compare_results, load_results, save_results, format_duration
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Run micro-benchmarks and compare them against a baseline')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Slowdown (fraction of the baseline median) that counts as a regression')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timing round')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing rounds per benchmark')
+    args = parser.parse_args(argv)
+
+    # Keep library logging (e.g. demo certificate generation) out of the report
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def progress(name, result):
+        print(f"{name:<45} {format_duration(result['median']):>10}  "
+              f"(min {format_duration(result['min'])}, {result['number']} x {result['repeat']})", flush=True)
+
+    results = run_benchmarks(args.filter, args.min_time, args.repeat, progress)
+    if args.output:
+        save_results(results, args.output)
+        print(f"\nWrote {len(results['benchmarks'])} results to {args.output}")
+
+    if not args.compare:
+        return 0
+
+    rows = compare_results(load_results(args.compare), results, args.threshold)
+    if args.filter:
+        rows = [row for row in rows if row['status'] != 'missing']
+    print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        print(f"{row['name']:<45} {format_duration(row['baseline']):>10} -> {format_duration(row['current']):>10}"
+              f"  {ratio:>7}  {row['status']}")
+    regressions = [row for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
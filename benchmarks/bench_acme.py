@@ -0,0 +1,73 @@
+from ssl_generator import SSLGenerator
+from real_acme_client import RealACMEClient, LETSENCRYPT_STAGING_URL
+
+from .harness import benchmark
+
+class _StubResponse:
+    status_code = 200
+    headers = {'Replay-Nonce': 'bench-nonce'}
+    text = '{}'
+
+    def raise_for_status(self):
+        pass
+
+class _StubSession:
+    """Stands in for requests.Session so only JWS construction and signing are timed"""
+
+    headers = {}
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        return _StubResponse()
+
+    def head(self, url, timeout=None):
+        return _StubResponse()
+
+def _acme_client(account_url=None) -> RealACMEClient:
+    client = RealACMEClient(use_staging=True)
+    client.session = _StubSession()
+    client.nonce = 'bench-nonce'
+    client.account_url = account_url
+    client.directory = {'newNonce': f"{LETSENCRYPT_STAGING_URL}/acme/new-nonce"}
+    client.order_url = f"{LETSENCRYPT_STAGING_URL}/acme/order/1/2"
+    client.order_data = {'finalize': f"{LETSENCRYPT_STAGING_URL}/acme/finalize/1/2"}
+    return client
+
+def _generator():
+    return SSLGenerator()
+
+def _cleanup_generator(generator):
+    generator.cleanup()
+
+@benchmark('ssl_generator.generate_certificate', group='crypto', setup=_generator, teardown=_cleanup_generator)
+def bench_generate_certificate(generator):
+    generator.generate_certificate(['example.com', 'www.example.com'], 'admin@example.com')
+
+@benchmark('acme.send_signed_request.jwk', group='crypto', setup=_acme_client)
+def bench_send_signed_request_jwk(client):
+    # New-account style request: the JWK is embedded in the protected header
+    client._send_signed_request(f"{LETSENCRYPT_STAGING_URL}/acme/new-acct", {'termsOfServiceAgreed': True})
+
+@benchmark('acme.send_signed_request.kid', group='crypto',
+           setup=lambda: _acme_client(f"{LETSENCRYPT_STAGING_URL}/acme/acct/1"))
+def bench_send_signed_request_kid(client):
+    client._send_signed_request(f"{LETSENCRYPT_STAGING_URL}/acme/chall/1/abc", {})
+
+@benchmark('acme.get_key_authorization', group='crypto', setup=_acme_client)
+def bench_get_key_authorization(client):
+    client._get_key_authorization('evaGxfADs6pSRb2LAv9IZf17Dt3juxGJ-PCt92wr-oA')
+
+@benchmark('acme.export_state', group='state', setup=_acme_client)
+def bench_export_state(client):
+    client.export_state()
+
+@benchmark('acme.from_state.pem', group='state', setup=lambda: _acme_client().export_state())
+def bench_from_state_pem(state):
+    RealACMEClient.from_state(state)
+
+@benchmark('acme.export_compact_state', group='state', setup=_acme_client)
+def bench_export_compact_state(client):
+    client.export_compact_state()
+
+@benchmark('acme.from_state.der', group='state', setup=lambda: _acme_client().export_compact_state())
+def bench_from_state_der(state):
+    RealACMEClient.from_state(state)
@@ -0,0 +1,33 @@
+import os
+import atexit
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from storage import SQLiteArtifactStore, MemoryArtifactStore
+
+from .harness import benchmark
+
+# Roughly the size of an issued chain and its RSA key
+_FILES = {'certificate': b'c' * 3800, 'private_key': b'k' * 1700}
+
+_STORES = {
+    'sqlite': lambda directory: SQLiteArtifactStore(os.path.join(directory, 'state.db'),
+                                                    os.path.join(directory, 'artifacts'), 64 * 1024 * 1024),
+    'memory': lambda directory: MemoryArtifactStore(os.path.join(directory, 'artifacts'), 64 * 1024 * 1024),
+}
+
+def _store(backend: str):
+    directory = tempfile.mkdtemp(prefix='bench-artifacts-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    return _STORES[backend](directory)
+
+def _register(backend: str):
+    @benchmark(f"artifacts.save_remove.{backend}", group='artifacts', setup=lambda: _store(backend))
+    def bench_save_remove(store):
+        # remove() overwrites and fsyncs the key, so this is the full lifetime cost of one certificate
+        artifact_id, _ = store.save(_FILES, datetime.now() + timedelta(minutes=15))
+        store.remove(artifact_id)
+
+for _backend in _STORES:
+    _register(_backend)
@@ -0,0 +1,47 @@
+import os
+import atexit
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from storage import SQLiteChallengeTable, MemoryChallengeTable
+
+from .harness import benchmark
+
+CHALLENGE_COUNT = 10000
+
+_TABLES = {
+    'sqlite': lambda directory: SQLiteChallengeTable(os.path.join(directory, 'state.db')),
+    'memory': lambda directory: MemoryChallengeTable(),
+}
+
+_fixtures = {}
+
+def _table(backend: str):
+    """A table holding CHALLENGE_COUNT live HTTP-01 challenges, two domains per request"""
+    if backend not in _fixtures:
+        directory = tempfile.mkdtemp(prefix='bench-challenges-')
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        table = _fixtures[backend] = _TABLES[backend](directory)
+        expires = datetime.now() + timedelta(hours=1)
+        for i in range(CHALLENGE_COUNT // 2):
+            table.put_many(f"request-{i}", [
+                {'domain': domain, 'type': 'http-01', 'token': f"token-{i}-{n}",
+                 'url': f"https://acme.invalid/chall/{i}/{n}", 'file_content': f"token-{i}-{n}.thumbprint"}
+                for n, domain in enumerate((f"host{i}.example.com", f"www.host{i}.example.com"))
+            ], expires)
+    return _fixtures[backend]
+
+def _register(backend: str):
+    setup = lambda: _table(backend)
+
+    @benchmark(f"challenges.http01_lookup.{backend}.{CHALLENGE_COUNT}", group='challenges', setup=setup)
+    def bench_lookup(table):
+        assert table.key_authorization('token-2500-1', 'www.host2500.example.com')
+
+    @benchmark(f"challenges.http01_miss.{backend}.{CHALLENGE_COUNT}", group='challenges', setup=setup)
+    def bench_miss(table):
+        assert table.key_authorization('token-2500-1', 'host2500.example.com') is None
+
+for _backend in _TABLES:
+    _register(_backend)
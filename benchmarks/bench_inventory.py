@@ -0,0 +1,61 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+
+from storage import SQLiteCertificateInventory, MemoryCertificateInventory
+
+from .harness import benchmark
+
+INVENTORY_SIZE = 200000
+
+_INVENTORIES = {
+    'sqlite': lambda directory: SQLiteCertificateInventory(os.path.join(directory, 'state.db')),
+    'memory': lambda directory: MemoryCertificateInventory(),
+}
+
+def _entries(count: int):
+    """Synthetic entries: one in ten is a wildcard, expiries spread over 90 days"""
+    now = time.time()
+    for i in range(count):
+        site = f"site{i // 4}.example{i % 50}.com"
+        names = [f"*.{site}", site] if i % 10 == 0 else [f"host{i}.{site}", f"www.host{i}.{site}"]
+        yield {
+            'fingerprint': f"{i:064x}", 'serial': f"{i:x}", 'subject': f"CN={names[0]}",
+            'issuer': 'CN=Bench CA', 'names': names, 'not_before': now - 86400,
+            'not_after': now + (i % 90 + 1) * 86400, 'file_id': None,
+        }
+
+_fixtures = {}
+
+def _inventory(backend: str):
+    """Build each backend's inventory once; every benchmark only reads from it"""
+    if backend not in _fixtures:
+        directory = tempfile.mkdtemp(prefix='bench-inventory-')
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        _fixtures[backend] = _INVENTORIES[backend](directory)
+        _fixtures[backend].add_many(_entries(INVENTORY_SIZE))
+    return _fixtures[backend]
+
+def _register(backend: str):
+    setup = lambda: _inventory(backend)
+
+    @benchmark(f"inventory.covering.exact.{backend}", group='inventory', setup=setup)
+    def bench_exact(inventory):
+        assert inventory.covering('host12345.site3086.example45.com', valid_at=time.time())
+
+    @benchmark(f"inventory.covering.wildcard.{backend}", group='inventory', setup=setup)
+    def bench_wildcard(inventory):
+        assert inventory.covering('api.site2500.example0.com', valid_at=time.time())
+
+    @benchmark(f"inventory.under.{backend}", group='inventory', setup=setup)
+    def bench_under(inventory):
+        assert inventory.under('site2500.example0.com')
+
+    @benchmark(f"inventory.expiring_14d.{backend}", group='inventory', setup=setup)
+    def bench_expiring(inventory):
+        assert inventory.expiring(time.time() + 14 * 86400, limit=100)
+
+for _backend in _INVENTORIES:
+    _register(_backend)
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+import routes
+from storage import SQLiteSessionStore, PickleSessionStore, SessionRecord
+
+from .harness import benchmark
+from .bench_acme import _acme_client
+
+SESSION_COUNTS = (10, 1000, 10000)
+
+_STORES = {
+    'sqlite': lambda directory: SQLiteSessionStore(os.path.join(directory, 'state.db')),
+    'pickle': lambda directory: PickleSessionStore(os.path.join(directory, 'sessions.pkl')),
+}
+
+_state = None
+
+def _sessions(count: int):
+    """count realistic session records sharing one pair of keys (keygen is not what's measured)"""
+    global _state
+    if _state is None:
+        _state = _acme_client(account_url='https://acme.invalid/acct/1').export_compact_state()
+    expires = datetime.now() + timedelta(hours=1)
+    return {
+        f"session-{i:05d}": SessionRecord.from_client_state(
+            _state, [f"host{i}.example.com", f"www.host{i}.example.com"], 'http', 'real', True, expires
+        )
+        for i in range(count)
+    }
+
+class _Fixture:
+    def __init__(self, backend: str, count: int):
+        self.directory = tempfile.mkdtemp(prefix='bench-sessions-')
+        self.app = Flask(__name__)
+        self.app.session_store = _STORES[backend](self.directory)
+        self.sessions = _sessions(count)
+        self.context = self.app.app_context()
+        self.context.push()
+        routes.save_sessions(self.sessions)
+
+    def close(self):
+        self.context.pop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def _register(backend: str, count: int):
+    setup = lambda: _Fixture(backend, count)
+    teardown = lambda fixture: fixture.close()
+
+    @benchmark(f"sessions.load.{backend}.{count}", group='sessions', setup=setup, teardown=teardown)
+    def bench_load(fixture):
+        routes.load_sessions()
+
+    @benchmark(f"sessions.save.{backend}.{count}", group='sessions', setup=setup, teardown=teardown)
+    def bench_save(fixture):
+        routes.save_sessions(fixture.sessions)
+
+for _backend in _STORES:
+    for _count in SESSION_COUNTS:
+        _register(_backend, _count)
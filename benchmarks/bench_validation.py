@@ -0,0 +1,31 @@
+from validators import DomainValidator
+
+from .harness import benchmark
+
+DOMAIN_COUNTS = (1, 100, 10000)
+
+class _Fixture:
+    """A comma-separated domain list spread over several registered domains and suffixes"""
+
+    SUFFIXES = ('com', 'co.uk', 'org', 'com.au', 'io')
+
+    def __init__(self, count: int):
+        self.domains = ', '.join(
+            f"host{i}.site{i % 97}.{self.SUFFIXES[i % len(self.SUFFIXES)]}" for i in range(count)
+        )
+        # MAX_DOMAINS would reject the large inputs before validating them
+        self.max_domains = DomainValidator.MAX_DOMAINS
+        DomainValidator.MAX_DOMAINS = max(self.max_domains, count)
+
+    def close(self):
+        DomainValidator.MAX_DOMAINS = self.max_domains
+
+def _register(count: int):
+    @benchmark(f"validation.validate_domains.{count}", group='validation',
+               setup=lambda: _Fixture(count), teardown=lambda fixture: fixture.close())
+    def bench_validate_domains(fixture):
+        is_valid, _, error = DomainValidator.validate_domains(fixture.domains)
+        assert is_valid, error
+
+for _count in DOMAIN_COUNTS:
+    _register(_count)
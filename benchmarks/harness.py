@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+class Benchmark:
+    """One registered benchmark.
+
+    setup() returns the argument passed to every call of func, so fixtures
+    such as keys or populated stores are built once and never timed.
+    """
+
+    __slots__ = ('name', 'group', 'func', 'setup', 'teardown')
+
+    def __init__(self, name: str, group: str, func: Callable, setup: Optional[Callable] = None,
+                 teardown: Optional[Callable] = None):
+        self.name = name
+        self.group = group
+        self.func = func
+        self.setup = setup
+        self.teardown = teardown
+
+REGISTRY: List[Benchmark] = []
+
+def benchmark(name: str, group: str = 'default', setup: Optional[Callable] = None,
+              teardown: Optional[Callable] = None):
+    """Decorator registering func(fixture) as a benchmark"""
+    def decorator(func):
+        REGISTRY.append(Benchmark(name, group, func, setup, teardown))
+        return func
+    return decorator
+
+def time_benchmark(bench: Benchmark, min_time: float = 0.2, repeat: int = 5) -> Dict:
+    """Time a benchmark like timeit: calibrate calls per round to min_time, then take repeat rounds"""
+    fixture = bench.setup() if bench.setup else None
+    try:
+        bench.func(fixture)  # warm caches and lazy imports outside the measurement
+        number = 1
+        while True:
+            elapsed = _run_round(bench.func, fixture, number)
+            if elapsed >= min_time or number >= 1_000_000:
+                break
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+        rounds = [elapsed / number] + [_run_round(bench.func, fixture, number) / number for _ in range(repeat - 1)]
+    finally:
+        if bench.teardown:
+            bench.teardown(fixture)
+    return {
+        'group': bench.group,
+        'number': number,
+        'repeat': len(rounds),
+        'min': min(rounds),
+        'median': statistics.median(rounds),
+        'mean': statistics.fmean(rounds),
+        'stdev': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+    }
+
+def _run_round(func: Callable, fixture, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        func(fixture)
+    return time.perf_counter() - started
+
+def run_benchmarks(pattern: Optional[str] = None, min_time: float = 0.2, repeat: int = 5,
+                   progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """Run every registered benchmark whose name contains pattern; returns a JSON-ready result document"""
+    results = {}
+    for bench in REGISTRY:
+        if pattern and pattern not in bench.name:
+            continue
+        results[bench.name] = time_benchmark(bench, min_time, repeat)
+        if progress:
+            progress(bench.name, results[bench.name])
+    return {'meta': _environment(), 'benchmarks': results}
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.15) -> List[Dict]:
+    """Compare medians; a benchmark regresses when it is more than threshold slower than baseline"""
+    rows = []
+    base_results = baseline.get('benchmarks', {})
+    for name, result in current.get('benchmarks', {}).items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({'name': name, 'baseline': None, 'current': result['median'], 'ratio': None, 'status': 'new'})
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'baseline': base['median'], 'current': result['median'],
+                     'ratio': ratio, 'status': status})
+    for name in base_results.keys() - current.get('benchmarks', {}).keys():
+        rows.append({'name': name, 'baseline': base_results[name]['median'], 'current': None,
+                     'ratio': None, 'status': 'missing'})
+    return rows
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_results(results: Dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -13,22 +14,111 @@ class Config:
     # Certificate settings
     CERT_EXPIRY_MINUTES = int(os.environ.get('CERT_EXPIRY_MINUTES', 15))
     CHALLENGE_EXPIRY_HOURS = int(os.environ.get('CHALLENGE_EXPIRY_HOURS', 1))
+    # Per-worker memory for parsed chains and converted download formats (fullchain, der, pkcs12, ...)
+    ARTIFACT_CACHE_BYTES = int(os.environ.get('ARTIFACT_CACHE_BYTES', 8 * 1024 * 1024))
+    # Issued certificate files on disk, shared by all workers; LRU artifacts are evicted beyond the quota
+    ARTIFACT_STORE_DIR = os.environ.get('ARTIFACT_STORE_DIR') or (
+        os.path.join(tempfile.gettempdir(), 'sdts-artifacts') if os.environ.get('VERCEL')
+        else os.path.join(UPLOAD_FOLDER, 'artifacts')
+    )
+    ARTIFACT_STORE_QUOTA_BYTES = int(os.environ.get('ARTIFACT_STORE_QUOTA_BYTES', 256 * 1024 * 1024))
+    
+    # Bulk inspection of uploaded certificate/key bundles (POST /api/inspect, tools/inspect_certs.py)
+    INSPECT_WORKERS = int(os.environ.get('INSPECT_WORKERS', 2))  # parsing processes per audit; 0 means one per CPU
+    INSPECT_HOST_POOLS = int(os.environ.get('INSPECT_HOST_POOLS', 1))  # audits parsed in a pool at once per host
+    INSPECT_RATE_LIMIT = int(os.environ.get('INSPECT_RATE_LIMIT', 10))  # requests per minute per IP
+    INSPECT_CACHE_ENTRIES = int(os.environ.get('INSPECT_CACHE_ENTRIES', 4096))  # parsed files kept by content hash
+    INSPECT_MAX_FILES = int(os.environ.get('INSPECT_MAX_FILES', 1000))
+    INSPECT_MAX_BYTES = int(os.environ.get('INSPECT_MAX_BYTES', 32 * 1024 * 1024))  # after unpacking ZIPs
     
     # ACME settings
     ACME_STAGING = os.environ.get('ACME_STAGING', 'true').lower() == 'true'
     ACME_RATE_LIMIT = int(os.environ.get('ACME_RATE_LIMIT', 5))  # requests per minute per IP
+    ACME_BASE_URL = os.environ.get('ACME_BASE_URL')  # overrides ACME_STAGING, e.g. a local fake CA
+    # Answer /.well-known/acme-challenge/<token> for domains CNAME'd or proxied to this service
+    HTTP01_RESPONDER_ENABLED = os.environ.get('HTTP01_RESPONDER_ENABLED', 'true').lower() == 'true'
+    
+    # Pooled keep-alive HTTP transport shared by all ACME clients in a worker
+    ACME_POOL_SIZE = int(os.environ.get('ACME_POOL_SIZE', 32))
+    ACME_CONNECT_TIMEOUT = float(os.environ.get('ACME_CONNECT_TIMEOUT', 5))
+    ACME_READ_TIMEOUT = float(os.environ.get('ACME_READ_TIMEOUT', 15))
+    ACME_GET_RETRIES = int(os.environ.get('ACME_GET_RETRIES', 3))  # GET/HEAD only; POSTs use single-use nonces
+    ACME_RETRY_BACKOFF = float(os.environ.get('ACME_RETRY_BACKOFF', 0.5))
+    
+    # OCSP responses fetched, cached and refreshed for issued certificates (served at /ocsp/...)
+    OCSP_ENABLED = os.environ.get('OCSP_ENABLED', 'true').lower() == 'true'
     
     # DNS validation settings
     DNS_PROPAGATION_TIMEOUT = int(os.environ.get('DNS_PROPAGATION_TIMEOUT', 300))  # 5 minutes
     DNS_CHECK_INTERVAL = int(os.environ.get('DNS_CHECK_INTERVAL', 30))  # 30 seconds
+    DNS_NAMESERVERS = [ns.strip() for ns in os.environ.get('DNS_NAMESERVERS', '').split(',') if ns.strip()]
+    DNS_PORT = int(os.environ.get('DNS_PORT', 53))
+    DNS_TIMEOUT = float(os.environ.get('DNS_TIMEOUT', 2.0))  # per nameserver attempt
+    DNS_MAX_WORKERS = int(os.environ.get('DNS_MAX_WORKERS', 32))
+    DNS_CACHE_SIZE = int(os.environ.get('DNS_CACHE_SIZE', 10000))
+    
+    # CAA pre-check before real orders are created
+    CAA_CHECK_ENABLED = os.environ.get('CAA_CHECK_ENABLED', 'true').lower() == 'true'
+    CAA_ISSUER = os.environ.get('CAA_ISSUER', 'letsencrypt.org')
     
     # Security settings
     CSRF_ENABLED = os.environ.get('CSRF_ENABLED', 'true').lower() == 'true'
     RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_DEFAULTS = [limit.strip() for limit in
+                           os.environ.get('RATE_LIMIT_DEFAULTS', '200 per day;50 per hour').split(';') if limit.strip()]
     
     # Database settings (for future use)
     DATABASE_URL = os.environ.get('DATABASE_URL')
     
+    # Session store settings
+    SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite')  # sqlite, pickle (legacy) or memory
+    STATE_DB_PATH = os.environ.get('STATE_DB_PATH') or os.path.join(UPLOAD_FOLDER, 'state.db')
+    SESSION_CACHE_FILE = os.environ.get('SESSION_CACHE_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '.session_cache.pkl'
+    )
+    
+    # Append-only order journal; after a restart one worker resumes orders interrupted mid-verification
+    ORDER_JOURNAL_ENABLED = os.environ.get('ORDER_JOURNAL_ENABLED', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+    ORDER_JOURNAL_PATH = os.environ.get('ORDER_JOURNAL_PATH') or os.path.join(UPLOAD_FOLDER, 'orders.journal')
+    ORDER_JOURNAL_FSYNC_WINDOW_MS = float(os.environ.get('ORDER_JOURNAL_FSYNC_WINDOW_MS', 2))  # batch appends per fsync
+    ORDER_JOURNAL_RETENTION_HOURS = float(os.environ.get('ORDER_JOURNAL_RETENTION_HOURS', 24))
+    ORDER_RECOVERY_GRACE_SECONDS = float(os.environ.get('ORDER_RECOVERY_GRACE_SECONDS', 180))  # longer than any poll
+    
+    # Identical concurrent /generate_ssl requests attach to one ACME order instead of racing for its authorizations
+    ORDER_COALESCING_ENABLED = os.environ.get('ORDER_COALESCING_ENABLED', 'true').lower() == 'true'
+    ORDER_COALESCE_WAIT_SECONDS = float(os.environ.get('ORDER_COALESCE_WAIT_SECONDS', 60))  # longest order creation
+    
+    # Background reaper for expired sessions and downloads (disabled on serverless platforms)
+    REAPER_ENABLED = os.environ.get('REAPER_ENABLED', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+    REAPER_INTERVAL_SECONDS = float(os.environ.get('REAPER_INTERVAL_SECONDS', 60))
+    
+    # Fingerprinted, precompressed static assets and on-disk template bytecode shared by workers
+    STATIC_ASSETS_ENABLED = os.environ.get('STATIC_ASSETS_ENABLED', 'true').lower() == 'true'
+    STATIC_BUILD_DIR = os.environ.get('STATIC_BUILD_DIR') or (
+        os.path.join(tempfile.gettempdir(), 'sdts-static') if os.environ.get('VERCEL')
+        else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+    )
+    # Cached bytecode is executed, so the directory must be private to this user; on Vercel
+    # (None) Jinja's own per-user directory in the tempdir is used
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR') or (
+        None if os.environ.get('VERCEL') else os.path.join(UPLOAD_FOLDER, 'jinja-cache')
+    )
+    
+    # Opt-in sampling request profiler (pstats and collapsed-stack output)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.01))  # fraction of requests
+    PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', 0))  # also keep any request slower than this
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'sdts-profiles')
+    PROFILER_PATHS = [p.strip() for p in os.environ.get('PROFILER_PATHS', '').split(',') if p.strip()]
+    PROFILER_FORMATS = [f.strip() for f in os.environ.get('PROFILER_FORMATS', 'pstats,collapsed').split(',') if f.strip()]
+    
+    # Opt-in tracing: one span per request, ACME call, keygen, CSR, session load/save and template render
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'
+    TRACING_FILE = os.environ.get('TRACING_FILE') or os.path.join(tempfile.gettempdir(), 'sdts-traces.jsonl')
+    TRACING_OTLP_ENDPOINT = os.environ.get('TRACING_OTLP_ENDPOINT')  # e.g. http://collector:4318/v1/traces
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', 1.0))  # fraction of new traces kept
+    
     # Add FLASK_CONFIG to be read from environment
     FLASK_CONFIG = os.environ.get('FLASK_CONFIG', 'default')
     
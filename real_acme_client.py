@@ -4,20 +4,22 @@ Real ACME Client for Let's Encrypt Integration
 A from-scratch implementation to bypass library bugs and generate real certificates.
 """
 
-import os
 import time
 import logging
-import tempfile
 import json
 import base64
 import hashlib
+import secrets
 from datetime import datetime, timedelta
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.x509.oid import NameOID
 import requests
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_der_private_key
+
+from acme_transport import get_transport
+from tracing import span, traced
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,13 +30,21 @@ LETSENCRYPT_PROD_URL = "https://acme-v02.api.letsencrypt.org"
 KEY_SIZE = 2048
 
 class RealACMEClient:
-    def __init__(self, use_staging=True):
-        self.base_url = LETSENCRYPT_STAGING_URL if use_staging else LETSENCRYPT_PROD_URL
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'SDTS-SSL-Generator/1.0'})
+    def __init__(self, use_staging=True, generate_keys=True, base_url=None):
+        # base_url points the client at another ACME server (e.g. a local fake CA for load tests)
+        self.base_url = base_url or (LETSENCRYPT_STAGING_URL if use_staging else LETSENCRYPT_PROD_URL)
+        # Pooled keep-alive connections shared with every other client for this CA
+        self.session = get_transport(self.base_url)
         
-        self.account_key = rsa.generate_private_key(public_exponent=65537, key_size=KEY_SIZE)
-        self.domain_key = rsa.generate_private_key(public_exponent=65537, key_size=KEY_SIZE)
+        # Rehydrated clients load their keys from state, so skip two throwaway RSA keygens
+        if generate_keys:
+            with span('crypto.keygen', key='account', bits=KEY_SIZE):
+                self.account_key = rsa.generate_private_key(public_exponent=65537, key_size=KEY_SIZE)
+            with span('crypto.keygen', key='domain', bits=KEY_SIZE):
+                self.domain_key = rsa.generate_private_key(public_exponent=65537, key_size=KEY_SIZE)
+        else:
+            self.account_key = None
+            self.domain_key = None
         
         self.directory = None
         self.account_url = None
@@ -63,14 +73,40 @@ class RealACMEClient:
             'base_url': self.base_url
         }
 
+    def export_compact_state(self):
+        """Exports DER-encoded keys and only the order URLs needed to verify and finalize."""
+        return {
+            'account_key_der': self.account_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ),
+            'domain_key_der': self.domain_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ),
+            'account_url': self.account_url,
+            'order_url': self.order_url,
+            'order_data': {'finalize': self.order_data['finalize']},
+            'directory': {'newNonce': self.directory['newNonce']},
+            'nonce': self.nonce,
+            'base_url': self.base_url
+        }
+
     @classmethod
+    @traced('acme.load_state')
     def from_state(cls, state):
-        """Creates a client instance from a saved state."""
+        """Creates a client instance from a saved state (PEM or compact DER form)."""
         is_staging = (LETSENCRYPT_STAGING_URL in state['base_url'])
-        client = cls(use_staging=is_staging)
+        client = cls(use_staging=is_staging, generate_keys=False, base_url=state['base_url'])
         
-        client.account_key = load_pem_private_key(state['account_key_pem'].encode('utf-8'), password=None)
-        client.domain_key = load_pem_private_key(state['domain_key_pem'].encode('utf-8'), password=None)
+        if 'account_key_der' in state:
+            client.account_key = load_der_private_key(state['account_key_der'], password=None)
+            client.domain_key = load_der_private_key(state['domain_key_der'], password=None)
+        else:
+            client.account_key = load_pem_private_key(state['account_key_pem'].encode('utf-8'), password=None)
+            client.domain_key = load_pem_private_key(state['domain_key_pem'].encode('utf-8'), password=None)
         
         client.account_url = state['account_url']
         client.order_url = state['order_url']
@@ -83,7 +119,7 @@ class RealACMEClient:
     def _get_nonce(self):
         """Gets a new nonce from the ACME server."""
         try:
-            response = self.session.head(self.directory['newNonce'], timeout=10)
+            response = self.session.head(self.directory['newNonce'])
             response.raise_for_status()
             self.nonce = response.headers['Replay-Nonce']
         except requests.exceptions.RequestException as e:
@@ -129,7 +165,7 @@ class RealACMEClient:
             "signature": signature_b64.decode('utf-8')
         }
         
-        response = self.session.post(url, data=json.dumps(jws_payload), headers={'Content-Type': 'application/jose+json'}, timeout=15)
+        response = self.session.post(url, data=json.dumps(jws_payload), headers={'Content-Type': 'application/jose+json'})
         self.nonce = response.headers.get('Replay-Nonce')
         
         try:
@@ -157,7 +193,7 @@ class RealACMEClient:
         if self.account_url:
             return
 
-        self.directory = self.session.get(f"{self.base_url}/directory", timeout=10).json()
+        self.directory = self.session.get(f"{self.base_url}/directory").json()
         self._get_nonce()
 
         account_payload = {"termsOfServiceAgreed": True, "contact": [f"mailto:{email}"]}
@@ -165,6 +201,7 @@ class RealACMEClient:
         self.account_url = response.headers['Location']
         logger.info(f"ACME account created successfully: {self.account_url}")
 
+    @traced('acme.new_order')
     def generate_challenges(self, domains, email, validation_method):
         """Generates challenges for the given domains."""
         self._init_client(email)
@@ -176,10 +213,10 @@ class RealACMEClient:
         self.order_url = response.headers['Location']
         self.order_data = response.json()
 
-        request_id = str(int(time.time()))
+        request_id = secrets.token_urlsafe(16)
         challenges = []
         for auth_url in self.order_data['authorizations']:
-            auth_data = self.session.get(auth_url, timeout=10).json()
+            auth_data = self.session.get(auth_url).json()
             
             # Handle both dictionary and string formats for the identifier
             identifier = auth_data.get('identifier', {})
@@ -204,76 +241,98 @@ class RealACMEClient:
         
         return {'request_id': request_id, 'challenges': challenges}
 
-    def verify_domain_challenges(self, challenges):
-        """Verifies that challenges have been met."""
+    @traced('acme.verify_challenges')
+    def verify_domain_challenges(self, challenges, progress=None):
+        """Verifies that challenges have been met.
+
+        progress, if given, is called as progress(event, domain, message) with the
+        events 'signalled', 'pending', 'valid' and 'invalid'.
+        """
+        notify = progress or (lambda event, domain, message: None)
         results = []
         for chal in challenges:
-            self._send_signed_request(chal['url'], {}) # Signal readiness
+            # A resumed verification skips challenges the CA has already validated
+            try:
+                already_valid = self.session.get(chal['url']).json().get('status') == 'valid'
+            except (requests.exceptions.RequestException, ValueError):
+                already_valid = False
+            if not already_valid:
+                self._send_signed_request(chal['url'], {}) # Signal readiness
+                notify('signalled', chal['domain'], 'Challenge submitted to the CA')
 
             # Poll for status
             start_time = time.time()
             while time.time() - start_time < 90: # 90-second timeout
                 try:
-                    response = self.session.get(chal['url'], timeout=10).json()
+                    response = self.session.get(chal['url']).json()
                     if response['status'] == 'valid':
                         results.append({'domain': chal['domain'], 'verified': True, 'message': 'Verified'})
+                        notify('valid', chal['domain'], 'Verified')
                         break
                     elif response['status'] == 'invalid':
                         error_detail = response.get('error', {}).get('detail', 'No details provided')
                         results.append({'domain': chal['domain'], 'verified': False, 'message': f"Failed: {error_detail}"})
+                        notify('invalid', chal['domain'], f"Failed: {error_detail}")
                         break
+                    notify('pending', chal['domain'], f"CA reports status '{response['status']}'")
                 except requests.exceptions.RequestException as e:
                     logger.error(f"Polling failed for {chal['domain']}: {e}")
                     results.append({'domain': chal['domain'], 'verified': False, 'message': f"Polling request failed: {e}"})
+                    notify('invalid', chal['domain'], f"Polling request failed: {e}")
                     break
                 time.sleep(3)
             else:
                 results.append({'domain': chal['domain'], 'verified': False, 'message': 'Polling timed out.'})
+                notify('invalid', chal['domain'], 'Polling timed out.')
         return results
 
-    def complete_certificate_generation(self, domains):
-        """Finalizes the order and retrieves the certificate."""
-        csr = x509.CertificateSigningRequestBuilder().subject_name(
-            x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, domains[0])])
-        ).add_extension(
-            x509.SubjectAlternativeName([x509.DNSName(d) for d in domains]), critical=False
-        ).sign(self.domain_key, hashes.SHA256())
+    @traced('acme.complete_order')
+    def complete_certificate_generation(self, domains, progress=None):
+        """Finalizes the order and retrieves the certificate.
+
+        An order that was already finalized (e.g. before a worker restart) is
+        not finalized again; its certificate is downloaded with the stored key.
+        """
+        try:
+            order_status = self.session.get(self.order_url).json().get('status')
+        except (requests.exceptions.RequestException, ValueError):
+            order_status = None
+        if order_status not in ('processing', 'valid'):
+            self._finalize_order(domains, progress)
+        return self._await_certificate()
+
+    def _finalize_order(self, domains, progress=None):
+        """Submits the CSR for the order."""
+        if progress:
+            progress('finalizing', None, 'Submitting CSR and waiting for the certificate')
+        with span('crypto.csr_sign', names=len(domains)):
+            csr = x509.CertificateSigningRequestBuilder().subject_name(
+                x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, domains[0])])
+            ).add_extension(
+                x509.SubjectAlternativeName([x509.DNSName(d) for d in domains]), critical=False
+            ).sign(self.domain_key, hashes.SHA256())
         csr_der = csr.public_bytes(serialization.Encoding.DER)
         
         finalize_payload = {'csr': base64.urlsafe_b64encode(csr_der).rstrip(b'=').decode('utf-8')}
         self._send_signed_request(self.order_data['finalize'], finalize_payload)
-        
-        # Poll for cert
+
+    def _await_certificate(self):
+        """Polls the order until it is valid and returns the certificate chain and key as PEM text."""
         start_time = time.time()
         while time.time() - start_time < 90:
             try:
-                order_status = self.session.get(self.order_url, timeout=10).json()
+                order_status = self.session.get(self.order_url).json()
                 if order_status['status'] == 'valid':
                     cert_url = order_status['certificate']
-                    cert_pem = self.session.get(cert_url, timeout=10).text
+                    cert_pem = self.session.get(cert_url).text
                     key_pem = self.domain_key.private_bytes(
                         encoding=serialization.Encoding.PEM,
                         format=serialization.PrivateFormat.TraditionalOpenSSL,
                         encryption_algorithm=serialization.NoEncryption()
                     ).decode('utf-8')
 
-                    # Check if we're on Vercel (serverless environment)
-                    if os.environ.get('VERCEL'):
-                        # On Vercel, return the certificate data directly
-                        return {
-                            'certificate_data': cert_pem,
-                            'private_key_data': key_pem,
-                            'certificate': None,  # No file path
-                            'private_key': None   # No file path
-                        }
-                    else:
-                        # Local/Docker environment - create temporary files
-                        temp_dir = tempfile.mkdtemp()
-                        cert_path = os.path.join(temp_dir, 'certificate.crt')
-                        key_path = os.path.join(temp_dir, 'private.key')
-                        with open(cert_path, 'w') as f: f.write(cert_pem)
-                        with open(key_path, 'w') as f: f.write(key_pem)
-                        return {'certificate': cert_path, 'private_key': key_path}
+                    # The caller decides where the files go (see RealSSLService.verify_challenges)
+                    return {'certificate_data': cert_pem, 'private_key_data': key_pem}
                 elif order_status['status'] == 'invalid':
                     logger.error(f"Order failed: {order_status}")
                     raise Exception(f"Certificate order failed: {order_status.get('error', 'No details')}")
@@ -0,0 +1,182 @@
+import os
+import re
+import sys
+import time
+import random
+import secrets
+import logging
+import cProfile
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StackSampler:
+    """Background thread that samples the Python stacks of registered threads.
+
+    One sampler per process serves every in-flight request; a request costs a
+    dict insert when it starts and a pop when it ends.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def track(self, thread_id: int) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+        self._ensure_running()
+        return samples
+
+    def untrack(self, thread_id: int):
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _ensure_running(self):
+        # Threads don't survive a fork, so each gunicorn worker starts its own
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+def _collapse(frame) -> str:
+    """Render a stack root-first in collapsed (flamegraph.pl / speedscope) form"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+def _short_path(filename: str) -> str:
+    for marker in ('site-packages' + os.sep, 'lib' + os.sep + 'python'):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return os.path.relpath(filename) if os.path.isabs(filename) else filename
+
+class SamplingProfilerMiddleware:
+    """Opt-in WSGI middleware that profiles a sample of requests.
+
+    A random sample_rate fraction of requests runs under cProfile and the
+    stack sampler and is always written. With slow_ms set, every other
+    request is stack-sampled too and written only if it took longer than
+    slow_ms. Output files are named <time>-<route>-<request id> with a
+    .pstats (cProfile) and/or .collapsed (flamegraph) extension.
+    """
+
+    def __init__(self, app, output_dir: str, sample_rate: float = 0.01, slow_ms: float = 0.0,
+                 interval_ms: float = 5.0, paths: Optional[List[str]] = None, formats=('pstats', 'collapsed')):
+        self.app = app
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.paths = tuple(paths or ())
+        self.formats = set(formats)
+        self.sampler = StackSampler(interval_ms / 1000.0)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if self.paths and not path.startswith(self.paths):
+            return self.app(environ, start_response)
+
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return self.app(environ, start_response)
+
+        request_id = environ.get('HTTP_X_REQUEST_ID') or secrets.token_hex(8)
+        environ['profiler.request_id'] = request_id
+        profile = ProfiledRequest(self, environ, request_id, sampled)
+        profile.start()
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            profile.finish()
+            raise
+        # Streamed bodies keep working after the app returns; stop when the server closes them
+        return _ClosingIterator(body, profile)
+
+    def write(self, environ, request_id: str, duration_ms: float, stats: Optional[cProfile.Profile],
+              samples: Counter):
+        route = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{environ.get('REQUEST_METHOD', 'GET')}_{route[:60]}-{request_id}"
+        base = os.path.join(self.output_dir, name)
+        try:
+            if stats is not None and 'pstats' in self.formats:
+                stats.dump_stats(base + '.pstats')
+            if samples and 'collapsed' in self.formats:
+                with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                    for stack, count in samples.most_common():
+                        f.write(f"{stack} {count}\n")
+            logger.info(f"Profiled {environ.get('PATH_INFO')} ({duration_ms:.1f} ms) to {base}")
+        except OSError as e:
+            logger.warning(f"Could not write request profile {base}: {e}")
+
+class ProfiledRequest:
+    """Profiling state for one request, from app call until its body is closed"""
+
+    def __init__(self, middleware: SamplingProfilerMiddleware, environ, request_id: str, sampled: bool):
+        self.middleware = middleware
+        self.environ = environ
+        self.request_id = request_id
+        self.sampled = sampled
+        self.profile = None
+        self.samples = None
+        self.thread_id = threading.get_ident()
+        self.started = 0.0
+
+    def start(self):
+        self.samples = self.middleware.sampler.track(self.thread_id)
+        if self.sampled and 'pstats' in self.middleware.formats:
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another profiler already owns this interpreter; keep the stack samples only
+                self.profile = None
+        self.started = time.perf_counter()
+
+    def finish(self):
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        if self.profile is not None:
+            self.profile.disable()
+        self.middleware.sampler.untrack(self.thread_id)
+        if self.sampled or duration_ms >= self.middleware.slow_ms:
+            self.middleware.write(self.environ, self.request_id, duration_ms, self.profile, self.samples)
+
+class _ClosingIterator:
+    """Wraps a WSGI body so profiling ends when the server closes it"""
+
+    def __init__(self, body, profile: ProfiledRequest):
+        self.body = body
+        self.profile = profile
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self.profile.finish()
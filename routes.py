@@ -1,14 +1,20 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, flash, redirect, url_for, session, current_app
-from flask_limiter.util import get_remote_address
+from flask import Blueprint, render_template as _render_template, request, jsonify, send_file, flash, redirect, url_for, session, current_app, Response, stream_with_context
+from werkzeug.exceptions import TooManyRequests
 import logging
-import time
 from datetime import datetime, timedelta
+from functools import wraps
 import os
+import re
+import json
+import secrets
+import math
+import time
+import queue
+import threading
 from io import BytesIO
-import pickle
 
-from services import SSLServiceFactory
-from validators import DomainValidator
+from storage import SessionRecord, order_key
+from tracing import bind, current_trace_id, span
 
 # Create blueprint
 main_bp = Blueprint('main', __name__)
@@ -16,69 +22,145 @@ main_bp = Blueprint('main', __name__)
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# --- Persistent Session Cache using Pickle ---
-SESSION_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.session_cache.pkl')
+# Seconds between keep-alive comments on an idle verification event stream
+SSE_KEEPALIVE_SECONDS = 15
+
+# Duplicates attach to a coalesced order for this many ORDER_COALESCE_WAIT_SECONDS after it is created
+COALESCE_WINDOW_WAITS = 2
+
+# ACME tokens are base64url (RFC 8555 section 8.1); anything else can't be one of ours
+_ACME_TOKEN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+
+def render_template(template_name, **context):
+    """flask.render_template, timed as a trace span"""
+    with span('render_template', template=template_name):
+        return _render_template(template_name, **context)
+
+def get_session_store():
+    """Return the application's keyed session store."""
+    return current_app.session_store
 
 def load_sessions():
-    """Loads active sessions from a pickle file or environment variable."""
-    # Check if we're on Vercel (serverless environment)
-    if os.environ.get('VERCEL'):
-        # On Vercel, use environment variable for session storage
-        import json
-        session_data = os.environ.get('SESSION_DATA', '{}')
-        try:
-            acme_challenges = json.loads(session_data)
-            # Filter out expired sessions
-            current_time = datetime.now()
-            return {
-                k: v for k, v in acme_challenges.items() 
-                if v.get('expires', current_time + timedelta(days=1)) > current_time
-            }
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.error(f"Could not load session data from environment: {e}. Starting fresh.")
-            return {}
-    else:
-        # Local/Docker environment - use pickle file
-        if os.path.exists(SESSION_CACHE_FILE):
-            try:
-                with open(SESSION_CACHE_FILE, 'rb') as f:
-                    acme_challenges = pickle.load(f)
-                # Filter out expired sessions
-                current_time = datetime.now()
-                return {
-                    k: v for k, v in acme_challenges.items() 
-                    if v.get('expires', current_time + timedelta(days=1)) > current_time
-                }
-            except (pickle.UnpicklingError, EOFError, TypeError) as e:
-                logger.error(f"Could not load session cache: {e}. Starting fresh.")
-                return {}
-    return {}
+    """Loads all active sessions (legacy bulk view; request paths use get_session_store())."""
+    return get_session_store().items()
 
 def save_sessions(acme_challenges):
-    """Saves active sessions to pickle file or environment variable."""
-    # Check if we're on Vercel (serverless environment)
-    if os.environ.get('VERCEL'):
-        # On Vercel, we can't persist to filesystem, so we'll use a simplified approach
-        # For now, we'll just keep sessions in memory for the duration of the request
-        # In a production Vercel app, you'd want to use a database like MongoDB Atlas or Supabase
-        logger.info("Running on Vercel - sessions will be kept in memory only")
-        return
-    else:
-        # Local/Docker environment - use pickle file
-        with open(SESSION_CACHE_FILE, 'wb') as f:
-            pickle.dump(acme_challenges, f)
+    """Replaces all stored sessions (legacy bulk write; request paths use get_session_store())."""
+    get_session_store().replace_all(acme_challenges)
+
+def get_challenge_table():
+    """Return the application's challenge table, indexed by request and domain."""
+    return current_app.challenge_table
+
+def get_download_registry():
+    """Return the application's download registry (shared by all workers)."""
+    return current_app.download_registry
+
+def get_artifact_store():
+    """Return the application's store of issued certificate files"""
+    return current_app.artifact_store
+
+def get_inflight_orders():
+    """Return the table of orders being created, or None when coalescing is disabled"""
+    return getattr(current_app, 'inflight_orders', None)
+
+def get_certificate_inventory():
+    """Return the application's inventory of issued certificates"""
+    return current_app.certificate_inventory
+
+def get_order_journal():
+    """Return the application's order journal, or None when journaling is disabled"""
+    return getattr(current_app, 'order_journal', None)
+
+# ACME client progress events that are order state transitions
+_JOURNAL_EVENTS = {
+    'signalled': 'challenge_signalled',
+    'valid': 'challenge_valid',
+    'invalid': 'challenge_invalid',
+    'finalizing': 'finalizing',
+}
+
+def _journal(journal, request_id: str, event: str, **data):
+    """Journal a transition; a failed write costs only resumability, never the issuance itself"""
+    try:
+        journal.append(request_id, event, **data)
+    except OSError as e:
+        logger.error(f"Could not journal '{event}' for order {request_id}: {e}")
+
+def get_ocsp_service(app=None):
+    """Return the application's OCSP service, or None when OCSP_ENABLED is off (built on first use)"""
+    app = app or current_app._get_current_object()
+    if getattr(app, 'ocsp_cache', None) is None:
+        return None
+    service = getattr(app, 'ocsp_service', None)
+    if service is None:
+        from services import OCSPService
+        service = app.ocsp_service = OCSPService(app.ocsp_cache)
+    return service
 
-# Store for temporary file downloads with expiration
-temp_files = {}
+def get_artifact_cache():
+    """Return this worker's cache of parsed certificates and converted formats (built on first use)"""
+    app = current_app._get_current_object()
+    cache = getattr(app, 'artifact_cache', None)
+    if cache is None:
+        from services import ArtifactCache
+        cache = app.artifact_cache = ArtifactCache(app.config['ARTIFACT_CACHE_BYTES'])
+    return cache
+
+def get_certificate_inspector():
+    """Return this worker's bulk certificate inspector (built on first use)"""
+    app = current_app._get_current_object()
+    inspector = getattr(app, 'certificate_inspector', None)
+    if inspector is None:
+        from services import CertificateInspector
+        # Pool slots live beside the state database, so every worker on the host shares them;
+        # a serverless instance serves one request at a time and has no such disk
+        slots_dir = None
+        if not os.environ.get('VERCEL'):
+            slots_dir = os.path.join(os.path.dirname(os.path.abspath(app.config['STATE_DB_PATH'])), 'inspect-slots')
+        inspector = app.certificate_inspector = CertificateInspector(
+            app.config['INSPECT_WORKERS'] or None, app.config['INSPECT_CACHE_ENTRIES'],
+            slots_dir=slots_dir, host_pools=app.config['INSPECT_HOST_POOLS']
+        )
+    return inspector
+
+def _rate_limited(bucket, limit_key):
+    """Decorator enforcing config[limit_key] requests per minute, per client IP, from one shared bucket"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_app.config['RATE_LIMIT_ENABLED']:
+                client = request.remote_addr or '127.0.0.1'
+                allowed, retry_after = current_app.rate_limiter.consume(
+                    f"{bucket}:{client}", current_app.config[limit_key], 60
+                )
+                if not allowed:
+                    logger.warning(f"{limit_key} exceeded for {client} on {request.endpoint}")
+                    raise TooManyRequests(retry_after=math.ceil(retry_after))
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+# Routes that talk to the CA all draw from one token bucket per client, shared by every worker
+acme_rate_limited = _rate_limited('acme', 'ACME_RATE_LIMIT')
+# Bulk inspection is CPU-bound rather than CA-bound, so it gets a bucket of its own
+inspect_rate_limited = _rate_limited('inspect', 'INSPECT_RATE_LIMIT')
 
 @main_bp.route('/')
 def index():
     """Main index page"""
-    return render_template('index.html')
+    # Issued with the form, so even a first visit's double submit carries one client id
+    coalesce_client = _coalesce_client_id() if get_inflight_orders() is not None else None
+    return render_template('index.html', coalesce_client=coalesce_client)
 
 @main_bp.route('/generate_ssl', methods=['POST'])
+@acme_rate_limited
 def generate_ssl():
     """Generate SSL certificate endpoint"""
+    # The validation, crypto and ACME stacks load on first use rather than at cold start
+    from validators import DomainValidator
+    from services import SSLServiceFactory
+    coalesce_key = None
     try:
         # Get form data
         domains = request.form.get('domains', '').strip()
@@ -93,7 +175,9 @@ def generate_ssl():
             return redirect(url_for('main.index'))
         
         # Validate domains
-        is_valid, domain_list, domain_error = DomainValidator.validate_domains(domains)
+        # CAA pre-check only for real orders, so a forbidden CA fails before an order is created
+        check_caa = cert_type == 'real' and current_app.config.get('CAA_CHECK_ENABLED', True)
+        is_valid, domain_list, domain_error = DomainValidator.validate_domains(domains, check_caa=check_caa)
         if not is_valid:
             flash(f'Domain validation failed: {domain_error}', 'error')
             return redirect(url_for('main.index'))
@@ -105,14 +189,27 @@ def generate_ssl():
             return redirect(url_for('main.index'))
         
         # Validate validation method
-        is_valid, method_error = DomainValidator.validate_validation_method(validation_method)
+        is_valid, method_error = DomainValidator.validate_validation_method(validation_method, domain_list)
         if not is_valid:
             flash(f'Validation method error: {method_error}', 'error')
             return redirect(url_for('main.index'))
         
-        # Create SSL service
         staging = current_app.config.get('ACME_STAGING', True)
-        ssl_service = SSLServiceFactory.create_service(cert_type, staging)
+        
+        # An identical request that is already being ordered is joined rather than ordered again
+        if cert_type == 'real' and get_inflight_orders() is not None:
+            key = order_key(_coalesce_client_id(), domain_list, email, validation_method,
+                            current_app.config.get('ACME_BASE_URL') or ('staging' if staging else 'production'))
+            leading, attached = _join_inflight_order(key)
+            if attached is not None:
+                return attached
+            if leading:
+                coalesce_key = key
+        
+        # Create SSL service
+        ssl_service = SSLServiceFactory.create_service(cert_type, staging,
+                                                       base_url=current_app.config.get('ACME_BASE_URL'),
+                                                       artifact_store=get_artifact_store())
         
         try:
             # Generate certificate
@@ -131,42 +228,39 @@ def generate_ssl():
                 # Store challenge information for later verification
                 request_id = result['challenge_data']['request_id']
                 
-                # Prepare challenges with verification URLs for the template
-                challenges_for_template = []
-                for ch in result['challenge_data']['challenges']:
-                    if validation_method == 'http':
-                        ch['verification_url'] = f"http://{ch['domain']}{ch['file_path']}"
-                    challenges_for_template.append(ch)
-                
-                # Export the state to a serializable dictionary
-                client_state = ssl_service.acme_client.export_state()
-
-                # Store the serializable state, not the service object
-                acme_challenges = load_sessions()
-                acme_challenges[request_id] = {
-                    'client_state': client_state,
-                    'challenges': result['challenge_data']['challenges'],
-                    'validation_method': validation_method,
-                    'expires': result['expires'],
-                    'domains': domain_list,
-                    'cert_type': 'real',
-                    'staging': staging,
-                }
-                save_sessions(acme_challenges)
+                # Store a compact record of the client state, not the service object;
+                # challenges go to their own table so single-token lookups stay cheap
+                record = SessionRecord.from_client_state(
+                    ssl_service.acme_client.export_compact_state(),
+                    domains=domain_list,
+                    validation_method=validation_method,
+                    cert_type='real',
+                    staging=staging,
+                    expires=result['expires'],
+                    trace_id=current_trace_id(),
+                )
+                get_challenge_table().put_many(request_id, result['challenge_data']['challenges'], result['expires'])
+                get_session_store().put(request_id, record, result['expires'])
+                journal = get_order_journal()
+                if journal is not None:
+                    _journal(journal, request_id, 'order_created', domains=domain_list, order_url=record.order_url)
+                if coalesce_key is not None:
+                    # Duplicates waiting on this key now attach to the order; only retries within a
+                    # short window do, not the same client's deliberate resubmission much later
+                    window = datetime.now() + timedelta(
+                        seconds=COALESCE_WINDOW_WAITS * current_app.config['ORDER_COALESCE_WAIT_SECONDS'])
+                    get_inflight_orders().publish(coalesce_key, request_id, min(result['expires'], window))
                 
-                return render_template('validation.html',
-                                     request_id=request_id,
-                                     challenges=challenges_for_template,
-                                     validation_method=validation_method,
-                                     domains=domain_list)
+                return _render_validation(request_id, result['challenge_data']['challenges'], validation_method,
+                                          domain_list)
             else:
                 # Demo certificate - store files for download
-                file_id = str(int(time.time()))
-                temp_files[file_id] = {
+                file_id = get_download_registry().register({
                     'files': result['files'],
+                    'artifact': result.get('artifact'),
                     'expires': result['expires'],
                     'domain': domain_list[0]
-                }
+                })
                 
                 # Read certificate contents for display
                 cert_contents = _read_certificate_contents(result['files'])
@@ -187,30 +281,88 @@ def generate_ssl():
         logger.error(f"SSL generation error: {str(e)}", exc_info=True)
         flash(f'An unexpected error occurred: {str(e)}', 'error')
         return redirect(url_for('main.index'))
+    finally:
+        if coalesce_key is not None:
+            # A no-op once the order was published; otherwise a waiting duplicate takes over
+            get_inflight_orders().release(coalesce_key)
+
+def _render_validation(request_id, challenges, validation_method, domains):
+    """Render an order's challenge instructions"""
+    for challenge in challenges:
+        if validation_method == 'http':
+            challenge['verification_url'] = f"http://{challenge['domain']}{challenge['file_path']}"
+    return render_template('validation.html',
+                         request_id=request_id,
+                         challenges=challenges,
+                         validation_method=validation_method,
+                         domains=domains)
+
+_COALESCE_CLIENT_RE = re.compile(r'[A-Za-z0-9_-]{22}')
+
+def _coalesce_client_id():
+    """Random id binding coalesced orders to their submitter.
+
+    Kept in the browser's signed session cookie and echoed in the index
+    form, so submits that carry no (or an unreadable) cookie still share the
+    id of the page they came from.
+    """
+    client_id = session.get('coalesce_client')
+    if client_id is None:
+        submitted = request.form.get('coalesce_client', '')
+        client_id = submitted if _COALESCE_CLIENT_RE.fullmatch(submitted) else secrets.token_urlsafe(16)
+        session['coalesce_client'] = client_id
+    return client_id
+
+def _join_inflight_order(key):
+    """Lead the order for key, or attach to the identical order another request is creating.
+    
+    Returns (leading, response): response is the validation page of the
+    order this request attached to. (False, None) means the other request
+    did not finish in time and this one goes ahead uncoalesced.
+    """
+    inflight = get_inflight_orders()
+    wait = current_app.config['ORDER_COALESCE_WAIT_SECONDS']
+    with span('order.coalesce') as current:
+        while True:
+            leading, request_id = inflight.join(key, lease=wait, timeout=wait)
+            if request_id is None:
+                if not leading:
+                    logger.warning("Identical issuance request did not finish in time; ordering separately")
+                current.set('outcome', 'lead' if leading else 'timeout')
+                return leading, None
+            challenge_session = get_session_store().get(request_id)
+            challenges = get_challenge_table().list(request_id)
+            if challenge_session is not None and challenges:
+                logger.info(f"Attached identical issuance request to order {request_id}")
+                current.set('outcome', 'attached')
+                return False, _render_validation(request_id, challenges, challenge_session.validation_method,
+                                                 challenge_session.domains)
+            # That order has been completed or has expired; order anew unless another duplicate already is
+            if inflight.take_over(key, request_id, wait):
+                current.set('outcome', 'lead')
+                return True, None
 
 @main_bp.route('/verify_challenges/<request_id>', methods=['GET', 'POST'])
+@acme_rate_limited
 def verify_challenges(request_id):
     """Verify domain validation challenges and generate real certificate"""
     try:
-        acme_challenges = load_sessions()
-        if request_id not in acme_challenges:
+        challenge_session = get_session_store().get(request_id)
+        if challenge_session is None:
+            recovered = _recovered_download(request_id)
+            if recovered is not None:
+                file_id, file_info = recovered
+                flash('Real SSL certificate generated successfully! Download links will expire in 15 minutes.', 'success')
+                return render_template('index.html',
+                                     success=True,
+                                     file_id=file_id,
+                                     domain=file_info['domain'],
+                                     cert_contents=_read_certificate_contents(file_info['files']),
+                                     cert_type='real')
             flash('Invalid or expired validation request. Please start over.', 'error')
             return redirect(url_for('main.index'))
         
-        challenge_session = acme_challenges[request_id]
-        
-        # Rehydrate the ACME client from the stored state
-        from real_acme_client import RealACMEClient
-        rehydrated_client = RealACMEClient.from_state(challenge_session['client_state'])
-        
-        # Create a new service wrapper and attach the rehydrated client
-        ssl_service = SSLServiceFactory.create_service(
-            challenge_session.get('cert_type', 'real'), 
-            challenge_session.get('staging', True)
-        )
-        ssl_service.acme_client = rehydrated_client
-        
-        result = ssl_service.verify_challenges(challenge_session['challenges'])
+        result, file_id, cert_contents = _verify_and_store(request_id, challenge_session)
         
         if not result['success']:
             # A domain failed. Let the user retry.
@@ -221,47 +373,18 @@ def verify_challenges(request_id):
                                  request_id=request_id,
                                  challenge_info=challenge_session)
         
-        # Success case: Store files for download
-        file_id = str(int(time.time()))
-        
-        # Handle Vercel vs local environment
-        if result.get('vercel_mode'):
-            # On Vercel, store certificate data directly
-            temp_files[file_id] = {
-                'files': result['files'],  # Contains certificate_data and private_key_data
-                'expires': result['expires'],
-                'domain': challenge_session['domains'][0],
-                'vercel_mode': True
-            }
-            cert_contents = {
-                'certificate': result['files']['certificate_data'],
-                'private_key': result['files']['private_key_data']
-            }
-        else:
-            # Local/Docker environment - normal file handling
-            temp_files[file_id] = {
-                'files': result['files'],
-                'expires': result['expires'],
-                'domain': challenge_session['domains'][0]
-            }
-            cert_contents = _read_certificate_contents(result['files'])
-        
-        # Clean up challenge info
-        del acme_challenges[request_id]
-        save_sessions(acme_challenges) # Save session to disk
-        
         flash('Real SSL certificate generated successfully! Download links will expire in 15 minutes.', 'success')
         return render_template('index.html', 
                              success=True, 
                              file_id=file_id,
-                             domain=challenge_session['domains'][0],
+                             domain=challenge_session.domains[0],
                              cert_contents=cert_contents,
                              cert_type='real')
 
     except Exception as e:
         logger.error(f"Challenge verification process failed: {str(e)}", exc_info=True)
         
-        challenge_session = load_sessions().get(request_id)
+        challenge_session = get_session_store().get(request_id)
         
         # Create a detailed error message for display
         error_result = [{
@@ -278,19 +401,179 @@ def verify_challenges(request_id):
                              request_id=request_id,
                              challenge_info=challenge_session)
 
+@main_bp.route('/verify_challenges/<request_id>/events')
+@acme_rate_limited
+def verify_challenges_events(request_id):
+    """Run verification and stream per-domain progress as Server-Sent Events"""
+    challenge_session = get_session_store().get(request_id)
+    if challenge_session is None:
+        recovered = _recovered_download(request_id)
+        if recovered is not None:
+            return Response(_sse_event('certificate_ready', _ready_event(recovered[0], {'success': True})),
+                            mimetype='text/event-stream')
+        return Response(_sse_event('error', {'message': 'Invalid or expired validation request. Please start over.'}),
+                        mimetype='text/event-stream')
+    
+    app = current_app._get_current_object()
+    events = queue.Queue()
+    
+    def progress(event, domain, message):
+        events.put((event, {'domain': domain, 'message': message}))
+    
+    def run():
+        # Verification runs beside the stream so events are sent as they happen
+        with app.app_context():
+            try:
+                result, file_id, _ = _verify_and_store(request_id, challenge_session, progress)
+                events.put(('_done', (result, file_id)))
+            except Exception as e:
+                logger.error(f"Challenge verification process failed: {str(e)}", exc_info=True)
+                events.put(('error', {'message': f"An unexpected error occurred: {str(e)}"}))
+                events.put(('_done', None))
+    
+    def stream():
+        threading.Thread(target=bind(run), name=f'verify-{request_id}', daemon=True).start()
+        while True:
+            try:
+                event, data = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                # Comment lines keep proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            if event != '_done':
+                yield _sse_event(event, data)
+                continue
+            if data is not None:
+                result, file_id = data
+                if result['success']:
+                    yield _sse_event('certificate_ready', _ready_event(file_id, result))
+                else:
+                    yield _sse_event('failed', {'results': result.get('verification_results', [])})
+            return
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _record_issued(chain_pem, file_id, result):
+    """Add an issued certificate to the inventory and register it for OCSP stapling"""
+    try:
+        from services import inventory_entry
+        from services.ocsp_service import load_pem_chain
+        certificates = load_pem_chain(chain_pem.encode('ascii'))
+        if certificates:
+            get_certificate_inventory().add(inventory_entry(certificates[0], file_id))
+    except Exception as e:
+        logger.warning(f"Could not add certificate to the inventory: {e}")
+    
+    # The OCSP response is then fetched and kept fresh in the background
+    ocsp_service = get_ocsp_service()
+    if ocsp_service is not None:
+        try:
+            result['ocsp_key'] = ocsp_service.register_chain(chain_pem)
+        except Exception as e:
+            logger.warning(f"Could not register certificate for OCSP: {e}")
+
+def _ready_event(file_id, result):
+    """Payload of the certificate_ready event"""
+    ready = {
+        'file_id': file_id,
+        'downloads': {
+            file_type: url_for('main.download_file', file_id=file_id, file_type=file_type)
+            for file_type in ('certificate', 'private_key')
+        }
+    }
+    if result.get('ocsp_key'):
+        ready['ocsp'] = url_for('main.ocsp_response', key=result['ocsp_key'])
+    return ready
+
+def _recovered_download(request_id):
+    """Return (file_id, file_info) if the order journal shows the certificate was already downloaded.
+    
+    This is how a user gets a certificate whose issuance was finished by the
+    startup recovery pass after their own request died with its worker.
+    """
+    journal = get_order_journal()
+    state = journal.state(request_id) if journal is not None else None
+    if state is None or state.file_id is None:
+        return None
+    file_info = get_download_registry().get(state.file_id)
+    return (state.file_id, file_info) if file_info is not None else None
+
+def _sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _verify_and_store(request_id, challenge_session, progress=None):
+    """Verify a session's challenges and register the certificate for download on success.
+    
+    Returns (result, file_id, cert_contents); file_id and cert_contents are None on failure.
+    The work is traced as part of the order's trace, linked to the calling request.
+    """
+    with span('order.verify', trace_id=challenge_session.get('trace_id'), request_id=request_id,
+              domains=len(challenge_session.domains)) as current:
+        result, file_id, cert_contents = _run_verification(request_id, challenge_session, progress)
+        current.set('success', result['success'])
+        return result, file_id, cert_contents
+
+def _run_verification(request_id, challenge_session, progress=None):
+    """Body of _verify_and_store, run inside its span"""
+    # Rehydrate the ACME client from the stored state (keys are decoded only here)
+    from real_acme_client import RealACMEClient
+    from services import SSLServiceFactory
+    rehydrated_client = RealACMEClient.from_state(challenge_session.client_state())
+    
+    # Create a new service wrapper and attach the rehydrated client
+    ssl_service = SSLServiceFactory.create_service(
+        challenge_session.cert_type, 
+        challenge_session.staging,
+        acme_client=rehydrated_client,
+        artifact_store=get_artifact_store()
+    )
+    
+    journal = get_order_journal()
+    if journal is not None:
+        # Journal each transition before reporting it, so a restarted worker resumes from the last one
+        def progress_and_journal(event, domain, message):
+            if event in _JOURNAL_EVENTS:
+                _journal(journal, request_id, _JOURNAL_EVENTS[event], domain=domain)
+            if progress:
+                progress(event, domain, message)
+        result = ssl_service.verify_challenges(get_challenge_table().list(request_id), progress_and_journal)
+    else:
+        result = ssl_service.verify_challenges(get_challenge_table().list(request_id), progress)
+    if not result['success']:
+        return result, None, None
+    
+    # Success case: Store files for download
+    file_id = get_download_registry().register({
+        'files': result['files'],
+        'artifact': result.get('artifact'),
+        'expires': result['expires'],
+        'domain': challenge_session.domains[0]
+    })
+    cert_contents = _read_certificate_contents(result['files'])
+    
+    if cert_contents and cert_contents.get('certificate'):
+        _record_issued(cert_contents['certificate'], file_id, result)
+    
+    if journal is not None:
+        _journal(journal, request_id, 'certificate_downloaded', file_id=file_id)
+    
+    # Clean up challenge info
+    get_session_store().delete(request_id)
+    get_challenge_table().delete(request_id)
+    
+    return result, file_id, cert_contents
+
 @main_bp.route('/download_challenge/<request_id>/<domain>')
 def download_challenge(request_id, domain):
     """Serves the ACME challenge file for download."""
-    acme_challenges = load_sessions()
-    if request_id not in acme_challenges:
+    # Keyed lookup of the one challenge; the session record is never deserialized here
+    challenge_data = get_challenge_table().get(request_id, domain)
+    if challenge_data is None and not get_challenge_table().list(request_id):
         flash('Invalid or expired validation request.', 'error')
         return redirect(url_for('main.index'))
 
-    challenge_session = acme_challenges[request_id]
-    
-    # Find the specific challenge for the requested domain
-    challenge_data = next((c for c in challenge_session['challenges'] if c['domain'] == domain), None)
-
     if not challenge_data or 'file_content' not in challenge_data:
         flash(f'Challenge data not found for domain {domain}.', 'error')
         return redirect(url_for('main.index'))
@@ -310,85 +593,227 @@ def download_challenge(request_id, domain):
         mimetype='text/plain'
     )
 
+@main_bp.route('/.well-known/acme-challenge/<token>')
+def acme_challenge(token):
+    """Answer an HTTP-01 validation for a domain pointed (CNAME or proxy) at this service.
+    
+    One indexed lookup by token and Host; no session is loaded and nothing is
+    rendered, so the CA's burst of multi-vantage-point fetches stays cheap.
+    """
+    key_authorization = None
+    if current_app.config['HTTP01_RESPONDER_ENABLED'] and _ACME_TOKEN.match(token):
+        # The CA connects to the domain being validated, so Host names it (ProxyFix applies X-Forwarded-Host)
+        domain = request.host.rsplit(':', 1)[0].rstrip('.').lower()
+        key_authorization = get_challenge_table().key_authorization(token, domain)
+    if key_authorization is None:
+        return Response('Not found\n', 404, mimetype='text/plain', headers={'Cache-Control': 'no-store'})
+    return Response(key_authorization, mimetype='text/plain', headers={'Cache-Control': 'no-store'})
+
 @main_bp.route('/download/<file_id>/<file_type>')
 def download_file(file_id, file_type):
     """Download certificate files"""
     try:
-        # Clean up expired files
-        cleanup_expired_files()
-        
-        if file_id not in temp_files:
+        # Expired entries are removed by the background reaper; just refuse them here
+        file_info = get_download_registry().get(file_id)
+        if file_info is None:
             flash('File not found or expired.', 'error')
             return redirect(url_for('main.index'))
+        if file_info.get('artifact'):
+            # Recently downloaded certificates are the last to be evicted by the store's quota
+            get_artifact_store().touch(file_info['artifact'])
         
-        file_info = temp_files[file_id]
+        # Converted formats (fullchain, leaf, chain, der, pkcs12) are derived from the stored PEM
+        from services import CERTIFICATE_FORMATS
+        if file_type in CERTIFICATE_FORMATS:
+            return _download_converted(file_id, file_info, file_type)
         
-        # Handle Vercel vs local environment
-        if file_info.get('vercel_mode'):
-            # On Vercel, serve certificate data directly from memory
-            if file_type == 'certificate' and 'certificate_data' in file_info['files']:
-                cert_data = file_info['files']['certificate_data']
-                buffer = BytesIO()
-                buffer.write(cert_data.encode('utf-8'))
-                buffer.seek(0)
-                return send_file(
-                    buffer,
-                    as_attachment=True,
-                    download_name=f"{file_info['domain']}.crt",
-                    mimetype='text/plain'
-                )
-            elif file_type == 'private_key' and 'private_key_data' in file_info['files']:
-                key_data = file_info['files']['private_key_data']
-                buffer = BytesIO()
-                buffer.write(key_data.encode('utf-8'))
-                buffer.seek(0)
-                return send_file(
-                    buffer,
-                    as_attachment=True,
-                    download_name=f"{file_info['domain']}.key",
-                    mimetype='text/plain'
-                )
-            else:
-                flash('Invalid file type requested.', 'error')
-                return redirect(url_for('main.index'))
+        if file_type not in file_info['files']:
+            flash('Invalid file type requested.', 'error')
+            return redirect(url_for('main.index'))
+        
+        file_path = file_info['files'][file_type]
+        
+        if not os.path.exists(file_path):
+            flash('File not found on server.', 'error')
+            return redirect(url_for('main.index'))
+        
+        # Generate filename
+        domain = file_info['domain']
+        if file_type == 'private_key':
+            filename = f'{domain}.key'
+        elif file_type == 'certificate':
+            filename = f'{domain}.crt'
+        elif file_type == 'ca_bundle':
+            filename = f'{domain}-ca.crt'
         else:
-            # Local/Docker environment - normal file handling
-            if file_type not in file_info['files']:
-                flash('Invalid file type requested.', 'error')
-                return redirect(url_for('main.index'))
-            
-            file_path = file_info['files'][file_type]
-            
-            if not os.path.exists(file_path):
-                flash('File not found on server.', 'error')
-                return redirect(url_for('main.index'))
-            
-            # Generate filename
-            domain = file_info['domain']
-            if file_type == 'private_key':
-                filename = f'{domain}.key'
-            elif file_type == 'certificate':
-                filename = f'{domain}.crt'
-            elif file_type == 'ca_bundle':
-                filename = f'{domain}-ca.crt'
-            else:
-                filename = f'{domain}-{file_type}'
-            
-            return send_file(file_path, as_attachment=True, download_name=filename)
+            filename = f'{domain}-{file_type}'
+        
+        return send_file(file_path, as_attachment=True, download_name=filename)
         
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         flash('Download failed. Please try again.', 'error')
         return redirect(url_for('main.index'))
 
+def _download_converted(file_id, file_info, fmt):
+    """Serve a download in one of CERTIFICATE_FORMATS, converting on first request only"""
+    from services import CERTIFICATE_FORMATS
+    try:
+        content, _ = get_artifact_cache().render(file_id, fmt, lambda: _load_artifact(file_info))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot provide {fmt} for download {file_id}: {e}")
+        flash('This format is not available for this certificate.', 'error')
+        return redirect(url_for('main.index'))
+    
+    mimetype, suffix = CERTIFICATE_FORMATS[fmt]
+    return send_file(BytesIO(content), as_attachment=True, download_name=f"{file_info['domain']}{suffix}",
+                     mimetype=mimetype)
+
+def _load_artifact(file_info):
+    """Read a download's certificate chain and key for format conversion"""
+    from services import CertificateArtifact
+    files = file_info['files']
+    # Demo certificates keep their CA in a separate bundle; real chains include the issuer
+    chain_pem = b''
+    for file_type in ('certificate', 'ca_bundle'):
+        if files.get(file_type):
+            with open(files[file_type], 'rb') as f:
+                chain_pem += f.read().rstrip(b'\n') + b'\n'
+    key_pem = None
+    if files.get('private_key'):
+        with open(files['private_key'], 'rb') as f:
+            key_pem = f.read()
+    return CertificateArtifact(chain_pem, key_pem, file_info['domain'])
+
+@main_bp.route('/ocsp/<path:key>')
+def ocsp_response(key):
+    """Serve the cached DER OCSP response of an issued certificate for stapling.
+    
+    key is '<issuer key hash>/<serial>' in hex, as in the certificate_ready event.
+    """
+    ocsp_service = get_ocsp_service()
+    cached = ocsp_service.get_response(key) if ocsp_service is not None else None
+    if cached is None:
+        return jsonify({'error': 'No OCSP response available'}), 404
+    response_der, fresh_for = cached
+    response = Response(response_der, mimetype='application/ocsp-response')
+    # Edges may reuse the response until it is refreshed here at half-life
+    response.headers['Cache-Control'] = f"public, max-age={int(fresh_for)}"
+    return response
+
+# Largest page the inventory API returns
+INVENTORY_MAX_LIMIT = 1000
+
+@main_bp.route('/api/certificates')
+def list_certificates():
+    """Search the certificate inventory.
+    
+    ?name=api.foo.com           certificates covering a hostname (exact SAN or wildcard)
+    ?domain=foo.com             certificates naming the domain or anything below it
+    ?expires_within_days=14     certificates expiring in the next N days, soonest first
+    limit (default 100) and, for expiry queries, offset page through results;
+    valid=false also returns expired or not-yet-valid certificates for name queries.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 100)), INVENTORY_MAX_LIMIT)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'limit must be a positive integer and offset a non-negative one'}), 400
+    
+    inventory = get_certificate_inventory()
+    started = time.perf_counter()
+    if request.args.get('name'):
+        valid_at = None if request.args.get('valid', 'true').lower() == 'false' else time.time()
+        entries = inventory.covering(request.args['name'], valid_at=valid_at, limit=limit)
+    elif request.args.get('domain'):
+        entries = inventory.under(request.args['domain'], limit=limit)
+    elif request.args.get('expires_within_days'):
+        try:
+            days = float(request.args['expires_within_days'])
+        except ValueError:
+            return jsonify({'error': 'expires_within_days must be a number'}), 400
+        entries = inventory.expiring(time.time() + days * 86400, limit=limit, offset=offset)
+    else:
+        return jsonify({'error': 'Give one of name, domain or expires_within_days', 'total': inventory.count()}), 400
+    
+    return jsonify({
+        'certificates': [_inventory_json(entry) for entry in entries],
+        'count': len(entries),
+        'query_ms': round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@main_bp.route('/api/certificates/<fingerprint>')
+def get_certificate(fingerprint):
+    """Return one inventory entry by SHA-256 fingerprint (hex)"""
+    entry = get_certificate_inventory().get(fingerprint)
+    if entry is None:
+        return jsonify({'error': 'Certificate not found'}), 404
+    return jsonify(_inventory_json(entry))
+
+@main_bp.route('/api/inspect', methods=['POST'])
+@inspect_rate_limited
+def inspect_certificates():
+    """Audit uploaded certificates and keys (PEM, DER, PKCS#12 or ZIPs of them).
+    
+    Upload one or more `files` (multipart) or send a single file as the body.
+    hostname (repeatable) checks SAN coverage; warn_days (default 30) sets
+    when a certificate counts as expiring.
+    """
+    uploads = [(upload.filename or 'upload', upload.read()) for upload in request.files.getlist('files')]
+    if not uploads and request.content_type and not request.content_type.startswith('multipart/'):
+        uploads = [('body', request.get_data())]
+    uploads = [(name, data) for name, data in uploads if data]
+    if not uploads:
+        return jsonify({'error': 'Upload certificate or key files as "files", or send one as the request body'}), 400
+    try:
+        warn_days = float(request.values.get('warn_days', 30))
+    except ValueError:
+        return jsonify({'error': 'warn_days must be a number'}), 400
+    
+    from services import expand_uploads
+    try:
+        files = expand_uploads(uploads, current_app.config['INSPECT_MAX_FILES'], current_app.config['INSPECT_MAX_BYTES'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    hostnames = [name for name in request.values.getlist('hostname') if name.strip()]
+    return jsonify(get_certificate_inspector().inspect(files, hostnames, warn_days))
+
+def _inventory_json(entry):
+    """Inventory entry with ISO 8601 UTC times"""
+    entry = dict(entry)
+    for field in ('not_before', 'not_after', 'added'):
+        entry[field] = datetime.utcfromtimestamp(entry[field]).isoformat() + 'Z'
+    return entry
+
 @main_bp.route('/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    health = {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'version': '1.0.0'
-    })
+    }
+    reaper = getattr(current_app, 'reaper', None)
+    if reaper is not None:
+        health['reaper'] = reaper.stats()
+    health['artifact_store'] = get_artifact_store().stats()
+    journal = getattr(current_app, 'order_journal', None)
+    if journal is not None:
+        health['order_journal'] = journal.stats()
+    inspector = getattr(current_app, 'certificate_inspector', None)
+    if inspector is not None:
+        health['certificate_inspector'] = inspector.stats()
+    from tracing import get_tracer
+    tracer = get_tracer()
+    if tracer is not None:
+        health['tracing'] = tracer.stats()
+    from acme_transport import transport_stats
+    transports = transport_stats()
+    if transports:
+        health['acme_transports'] = transports
+    return jsonify(health)
 
 def _read_certificate_contents(files):
     """Read certificate file contents for display"""
@@ -403,47 +828,81 @@ def _read_certificate_contents(files):
         logger.error(f"Error reading certificate contents: {str(e)}")
         return None
 
-def cleanup_expired_files():
-    """Clean up expired temporary files"""
-    current_time = datetime.now()
-    
-    # Clean up expired file downloads
-    expired_files = []
-    for file_id, file_info in temp_files.items():
-        if current_time > file_info['expires']:
-            expired_files.append(file_id)
-    
-    for file_id in expired_files:
-        cleanup_file(file_id)
-    
-    # Clean up expired challenges
-    expired_challenges = []
-    acme_challenges = load_sessions()
-    for request_id, challenge_info in acme_challenges.items():
-        if current_time > challenge_info['expires']:
-            expired_challenges.append(request_id)
-    
-    for request_id in expired_challenges:
-        del acme_challenges[request_id]
+def reap_expired_files(registry=None, store=None):
+    """Remove expired download entries and their files (callable outside a request)"""
+    expired = (registry or get_download_registry()).pop_expired()
+    for file_info in expired:
+        _remove_files(file_info, store)
+    return len(expired)
+
+def resume_interrupted_orders(app, grace: float, stop=None):
+    """Finish orders whose verification died with its worker; returns how many were resumed.
     
-    # Save the cleaned up sessions back to file
-    if expired_challenges:
-        save_sessions(acme_challenges)
+    Orders that got as far as signalling a challenge are resumed from the CA's
+    state with their stored keys, so no new order is created. An order is
+    only touched once `grace` seconds have passed since its last journaled
+    transition, so verifications still running in live workers are left alone.
+    """
+    journal = app.order_journal
+    stop = stop or threading.Event()
+    resumable = ('challenge_signalled', 'challenge_valid', 'finalizing')
+    candidates = [(state.request_id, state.updated) for state in journal.pending() if state.step in resumable]
+    resumed = 0
+    with app.app_context():
+        for request_id, updated in candidates:
+            delay = updated + grace - time.time()
+            if delay > 0 and stop.wait(delay):
+                break
+            state = journal.state(request_id)
+            if state is None or state.updated != updated:
+                # Another worker has moved the order on in the meantime
+                continue
+            challenge_session = app.session_store.get(request_id)
+            if challenge_session is None:
+                _journal(journal, request_id, 'failed', reason='session expired before recovery')
+                continue
+            logger.info(f"Resuming order {request_id} from '{state.step}'")
+            try:
+                result, _, _ = _verify_and_store(request_id, challenge_session)
+            except Exception as e:
+                logger.error(f"Could not resume order {request_id}: {e}", exc_info=True)
+                continue
+            if result['success']:
+                resumed += 1
+    return resumed
+
+def cleanup_expired_files():
+    """Clean up expired temporary files and challenge sessions in one pass"""
+    reap_expired_files()
+    get_session_store().purge_expired()
+    get_challenge_table().purge_expired()
 
 def cleanup_file(file_id):
     """Clean up a specific file"""
+    file_info = get_download_registry().delete(file_id)
+    if file_info is not None:
+        _remove_files(file_info)
+    artifact_cache = getattr(current_app, 'artifact_cache', None)
+    if artifact_cache is not None:
+        artifact_cache.discard(file_id)
+
+def _remove_files(file_info, store=None):
+    """Remove a download entry's files from disk"""
     try:
-        if file_id in temp_files:
-            file_info = temp_files[file_id]
-            
-            # Remove files from disk
-            for file_path in file_info['files'].values():
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            
-            # Remove from memory
-            del temp_files[file_id]
-            
+        if file_info.get('artifact'):
+            (store or get_artifact_store()).remove(file_info['artifact'])
+            return
+        # Entries registered before the artifact store: remove the files and their directory if now empty
+        directories = set()
+        for file_path in file_info['files'].values():
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+                directories.add(os.path.dirname(file_path))
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
     except Exception as e:
         logger.error(f"File cleanup error: {str(e)}")
 
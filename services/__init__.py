@@ -1,3 +1,34 @@
-from .ssl_service import SSLServiceInterface, DemoSSLService, RealSSLService, SSLServiceFactory
+import importlib
 
-__all__ = ['SSLServiceInterface', 'DemoSSLService', 'RealSSLService', 'SSLServiceFactory'] 
\ No newline at end of file
+# Submodules load on first attribute access so importing the package stays cheap
+_EXPORTS = {
+    'SSLServiceInterface': '.ssl_service',
+    'DemoSSLService': '.ssl_service',
+    'RealSSLService': '.ssl_service',
+    'SSLServiceFactory': '.ssl_service',
+    'IssuancePlanner': '.issuance_planner',
+    'IssuancePlan': '.issuance_planner',
+    'CertificatePlan': '.issuance_planner',
+    'CertificateArtifact': '.certificate_formats',
+    'ArtifactCache': '.certificate_formats',
+    'CERTIFICATE_FORMATS': '.certificate_formats',
+    'inventory_entry': '.certificate_formats',
+    'CertificateInspector': '.certificate_inspector',
+    'inspect_blob': '.certificate_inspector',
+    'expand_uploads': '.certificate_inspector',
+    'OCSPService': '.ocsp_service',
+    'OCSPError': '.ocsp_service',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+
+from datetime import timezone
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+from .ocsp_service import load_pem_chain
+
+# format -> (mimetype, download name suffix)
+CERTIFICATE_FORMATS = {
+    'fullchain': ('application/pem-certificate-chain', '-fullchain.pem'),
+    'leaf': ('application/x-pem-file', '.pem'),
+    'chain': ('application/pem-certificate-chain', '-chain.pem'),
+    'der': ('application/pkix-cert', '.der'),
+    'pkcs12': ('application/x-pkcs12', '.p12'),
+}
+
+def inventory_entry(certificate: x509.Certificate, file_id: Optional[str] = None) -> Dict:
+    """Describe a certificate for the inventory (see storage.certificate_inventory.ENTRY_FIELDS)"""
+    try:
+        names = certificate.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(
+            x509.DNSName
+        )
+    except x509.ExtensionNotFound:
+        names = [attribute.value for attribute in certificate.subject.get_attributes_for_oid(NameOID.COMMON_NAME)]
+    return {
+        'fingerprint': certificate.fingerprint(hashes.SHA256()).hex(),
+        'serial': f"{certificate.serial_number:x}",
+        'subject': certificate.subject.rfc4514_string(),
+        'issuer': certificate.issuer.rfc4514_string(),
+        'names': [name.lower() for name in names],
+        # cryptography returns naive UTC datetimes
+        'not_before': certificate.not_valid_before.replace(tzinfo=timezone.utc).timestamp(),
+        'not_after': certificate.not_valid_after.replace(tzinfo=timezone.utc).timestamp(),
+        'file_id': file_id,
+    }
+
+class CertificateArtifact:
+    """One issued certificate chain (and key) whose download formats are derived on first request.
+
+    The PEM chain is parsed at most once and every rendered format is kept,
+    so repeated downloads of the same format cost a dictionary lookup.
+    """
+
+    __slots__ = ('chain_pem', 'key_pem', 'name', '_certificates', '_rendered')
+
+    def __init__(self, chain_pem: bytes, key_pem: Optional[bytes] = None, name: str = 'certificate'):
+        self.chain_pem = chain_pem
+        self.key_pem = key_pem
+        self.name = name
+        self._certificates: Optional[List[x509.Certificate]] = None
+        self._rendered: Dict[str, bytes] = {}
+
+    @property
+    def certificates(self) -> List[x509.Certificate]:
+        """Leaf first, then the issuing chain"""
+        if self._certificates is None:
+            certificates = load_pem_chain(self.chain_pem)
+            if not certificates:
+                raise ValueError("No certificate found in the stored chain")
+            self._certificates = certificates
+        return self._certificates
+
+    @property
+    def size(self) -> int:
+        """Approximate bytes held, used by ArtifactCache for its memory bound"""
+        # Parsed certificates are counted at roughly the size of their PEM
+        return (len(self.chain_pem) + len(self.key_pem or b'') + sum(len(v) for v in self._rendered.values())
+                + (len(self.chain_pem) if self._certificates is not None else 0))
+
+    def render(self, fmt: str) -> bytes:
+        """Return the artifact in one of CERTIFICATE_FORMATS, encoding it on first use"""
+        rendered = self._rendered.get(fmt)
+        if rendered is None:
+            rendered = self._rendered[fmt] = self._encode(fmt)
+        return rendered
+
+    def _encode(self, fmt: str) -> bytes:
+        if fmt not in CERTIFICATE_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        leaf, chain = self.certificates[0], self.certificates[1:]
+        if fmt == 'fullchain':
+            return b''.join(cert.public_bytes(serialization.Encoding.PEM) for cert in self.certificates)
+        if fmt == 'leaf':
+            return leaf.public_bytes(serialization.Encoding.PEM)
+        if fmt == 'chain':
+            return b''.join(cert.public_bytes(serialization.Encoding.PEM) for cert in chain)
+        if fmt == 'der':
+            return leaf.public_bytes(serialization.Encoding.DER)
+        if self.key_pem is None:
+            raise ValueError("PKCS#12 needs the private key, which is not available")
+        key = serialization.load_pem_private_key(self.key_pem, password=None)
+        # Unencrypted like the .key download; import tools accept an empty password
+        return pkcs12.serialize_key_and_certificates(
+            self.name.encode('utf-8'), key, leaf, chain or None, serialization.NoEncryption()
+        )
+
+class ArtifactCache:
+    """Bounded LRU of CertificateArtifacts keyed by download id, shared by a worker's threads"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._artifacts: 'OrderedDict[str, CertificateArtifact]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def render(self, key: str, fmt: str, loader: Callable[[], CertificateArtifact]) -> Tuple[bytes, CertificateArtifact]:
+        """Return (rendered bytes, artifact), loading the artifact with loader() on a miss"""
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is not None:
+                self._artifacts.move_to_end(key)
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+        if artifact is None:
+            artifact = loader()
+        # Encoding runs outside the lock; two threads racing on a new format just both encode it
+        rendered = artifact.render(fmt)
+        self._account(key, artifact)
+        return rendered, artifact
+
+    def discard(self, key: str):
+        """Drop an artifact, e.g. when its download is removed"""
+        with self._lock:
+            if self._artifacts.pop(key, None) is not None:
+                self._bytes -= self._sizes.pop(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._artifacts), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes}
+
+    def _account(self, key: str, artifact: CertificateArtifact):
+        size = artifact.size
+        with self._lock:
+            self._artifacts[key] = artifact
+            self._artifacts.move_to_end(key)
+            self._bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            # Evict least recently used artifacts, but never the one just served
+            while self._bytes > self.max_bytes and len(self._artifacts) > 1:
+                evicted, _ = self._artifacts.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+                self._stats['evictions'] += 1
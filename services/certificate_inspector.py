@@ -0,0 +1,379 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import fcntl
+import hashlib
+import logging
+import zipfile
+import time
+import io
+import os
+import re
+
+from datetime import datetime
+
+from cryptography import x509
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import dsa, ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+from tracing import span
+from .certificate_formats import inventory_entry
+
+logger = logging.getLogger(__name__)
+
+_PEM_BLOCK = re.compile(rb'-----BEGIN ([A-Z0-9 ]+)-----\r?\n.*?-----END \1-----', re.S)
+_ZIP_MAGIC = b'PK\x03\x04'
+
+# A certificate or key is a few KB; anything far bigger in an archive is not one
+MAX_MEMBER_BYTES = 1024 * 1024
+
+def public_key_id(public_key) -> str:
+    """SHA-256 of the DER SubjectPublicKeyInfo, equal for a certificate and its private key"""
+    der = public_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha256(der).hexdigest()
+
+def _key_type(public_key) -> str:
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return f"RSA-{public_key.key_size}"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return f"EC-{public_key.curve.name}"
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return 'Ed25519'
+    if isinstance(public_key, ed448.Ed448PublicKey):
+        return 'Ed448'
+    if isinstance(public_key, dsa.DSAPublicKey):
+        return f"DSA-{public_key.key_size}"
+    return type(public_key).__name__
+
+def _describe_certificate(certificate: x509.Certificate) -> Dict:
+    entry = inventory_entry(certificate)
+    del entry['file_id']
+    try:
+        ca = certificate.extensions.get_extension_for_class(x509.BasicConstraints).value.ca
+    except x509.ExtensionNotFound:
+        ca = False
+    public_key = certificate.public_key()
+    entry.update({
+        'public_key': public_key_id(public_key),
+        'key_type': _key_type(public_key),
+        'ca': ca,
+        'self_signed': certificate.issuer == certificate.subject,
+    })
+    return entry
+
+def _describe_key(private_key) -> Dict:
+    public_key = private_key.public_key()
+    return {'public_key': public_key_id(public_key), 'key_type': _key_type(public_key)}
+
+def inspect_blob(data: bytes) -> Dict:
+    """Parse one file's certificates and private keys (PEM, DER or unencrypted PKCS#12).
+
+    Runs in the inspector's process pool, so the result is plain data and
+    holds nothing time-dependent; it is cached by content hash.
+    """
+    result = {'certificates': [], 'keys': [], 'errors': []}
+    if b'-----BEGIN ' in data:
+        result['format'] = 'pem'
+        for block in _PEM_BLOCK.finditer(data):
+            label = block.group(1).decode('ascii')
+            try:
+                if label == 'CERTIFICATE':
+                    result['certificates'].append(_describe_certificate(x509.load_pem_x509_certificate(block.group(0))))
+                elif label.endswith('PRIVATE KEY'):
+                    result['keys'].append(_describe_key(serialization.load_pem_private_key(block.group(0), None)))
+            except TypeError:
+                result['errors'].append(f"{label}: encrypted, not inspected")
+            except (ValueError, UnsupportedAlgorithm) as e:
+                result['errors'].append(f"{label}: {e}")
+        if not result['certificates'] and not result['keys'] and not result['errors']:
+            result['errors'].append('No certificate or private key found')
+        return result
+
+    try:
+        result['certificates'].append(_describe_certificate(x509.load_der_x509_certificate(data)))
+        result['format'] = 'der'
+        return result
+    except ValueError:
+        pass
+    try:
+        result['keys'].append(_describe_key(serialization.load_der_private_key(data, None)))
+        result['format'] = 'der'
+        return result
+    except TypeError:
+        result['format'] = 'der'
+        result['errors'].append('PRIVATE KEY: encrypted, not inspected')
+        return result
+    except (ValueError, UnsupportedAlgorithm):
+        pass
+    try:
+        key, certificate, chain = pkcs12.load_key_and_certificates(data, None)
+    except ValueError:
+        result['format'] = 'unknown'
+        result['errors'].append('Not a PEM, DER or unencrypted PKCS#12 certificate or key')
+        return result
+    result['format'] = 'pkcs12'
+    if key is not None:
+        result['keys'].append(_describe_key(key))
+    result['certificates'] = [_describe_certificate(cert) for cert in [certificate, *chain] if cert is not None]
+    return result
+
+def expand_uploads(uploads: Iterable[Tuple[str, bytes]], max_files: int, max_bytes: int) -> List[Tuple[str, bytes]]:
+    """Flatten uploads into (name, content) files, unpacking ZIP archives one level deep.
+
+    Raises ValueError when the input exceeds max_files or max_bytes (after
+    decompression) or an archive is unreadable.
+    """
+    files = []
+    total = 0
+    for name, data in uploads:
+        if not data.startswith(_ZIP_MAGIC):
+            members = [(name, len(data), lambda data=data: data)]
+        else:
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"{name}: not a readable ZIP archive ({e})")
+            members = [(f"{name}/{info.filename}", info.file_size, lambda info=info: archive.read(info))
+                       for info in archive.infolist() if not info.is_dir()]
+        for member_name, size, read in members:
+            if size > MAX_MEMBER_BYTES:
+                raise ValueError(f"{member_name}: {size} bytes is too large for a certificate or key")
+            total += size
+            if len(files) >= max_files or total > max_bytes:
+                raise ValueError(f"Too much to inspect at once (at most {max_files} files and {max_bytes} bytes)")
+            try:
+                files.append((member_name, read()))
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, RuntimeError) as e:
+                raise ValueError(f"{member_name}: cannot be extracted ({e})")
+    return files
+
+def _take_slot(directory: str, slots: int) -> Optional[int]:
+    """Return a descriptor holding the lock of a free slot file, or None if every slot is taken"""
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        for slot in range(slots):
+            fd = os.open(os.path.join(directory, f"slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+    except OSError as e:
+        logger.warning(f"Could not take an inspection pool slot in {directory}: {e}")
+    return None
+
+@contextmanager
+def pool_slot(directory: Optional[str], slots: int):
+    """Yield True while holding one of `slots` host-wide pool slots, False if all are taken.
+
+    Slots are flock'd files in directory, so they are shared by every worker
+    on the host and freed when a holder exits or dies. Without a directory
+    there is no cap (e.g. the CLI).
+    """
+    if directory is None:
+        yield True
+        return
+    fd = _take_slot(directory, slots)
+    try:
+        yield fd is not None
+    finally:
+        # Closing the descriptor releases the slot
+        if fd is not None:
+            os.close(fd)
+
+class CertificateInspector:
+    """Bulk audit of certificate and key files: expiry, SAN coverage, key matching and chain order.
+
+    Large batches are parsed in a process pool of max_workers, started for the
+    batch while it holds one of host_pools slots in slots_dir; when every slot
+    is busy the batch is parsed inline, so the host never runs more than
+    host_pools x max_workers parsing processes however many workers serve
+    audits. Each file's parse result is kept in an LRU keyed by content hash,
+    so re-auditing the same bundles skips the parsing. Expiry and matching are
+    computed per report, never cached.
+    """
+
+    # Below this many uncached files, parsing inline beats the pool's start-up and IPC overhead
+    PARALLEL_THRESHOLD = 16
+
+    def __init__(self, max_workers: Optional[int] = None, cache_entries: int = 4096,
+                 slots_dir: Optional[str] = None, host_pools: int = 1):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_entries = cache_entries
+        self.slots_dir = slots_dir
+        self.host_pools = host_pools
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'parallel_batches': 0, 'pool_busy': 0}
+        self._lock = threading.Lock()
+
+    def inspect(self, files: Sequence[Tuple[str, bytes]], hostnames: Sequence[str] = (),
+                warn_days: float = 30.0, now: Optional[float] = None) -> Dict:
+        """Report on (name, content) files; hostnames are checked for coverage by the valid certificates"""
+        with span('inspector.inspect', files=len(files)):
+            digests = [hashlib.sha256(data).hexdigest() for _, data in files]
+            parsed = self._parse_all(files, digests)
+            return build_report(
+                [(name, digest, len(data), parsed[digest]) for (name, data), digest in zip(files, digests)],
+                hostnames, warn_days, time.time() if now is None else now
+            )
+
+    def _parse_all(self, files: Sequence[Tuple[str, bytes]], digests: List[str]) -> Dict[str, Dict]:
+        parsed = {}
+        missing = {}
+        with self._lock:
+            for (_, data), digest in zip(files, digests):
+                if digest in parsed or digest in missing:
+                    continue
+                cached = self._cache.get(digest)
+                if cached is not None:
+                    self._cache.move_to_end(digest)
+                    parsed[digest] = cached
+                    self._stats['hits'] += 1
+                else:
+                    missing[digest] = data
+                    self._stats['misses'] += 1
+        if not missing:
+            return parsed
+        blobs = list(missing.values())
+        parallel = self.max_workers > 1 and len(blobs) >= self.PARALLEL_THRESHOLD
+        results = self._parse_parallel(blobs) if parallel else None
+        if results is None:
+            results = [inspect_blob(blob) for blob in blobs]
+        with self._lock:
+            for digest, result in zip(missing, results):
+                parsed[digest] = self._cache[digest] = result
+                self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return parsed
+
+    def _parse_parallel(self, blobs: List[bytes]) -> Optional[List[Dict]]:
+        """Parse in a process pool; None if no pool slot is free or the pool fails, so the caller parses inline"""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        with pool_slot(self.slots_dir, self.host_pools) as acquired:
+            if not acquired:
+                with self._lock:
+                    self._stats['pool_busy'] += 1
+                return None
+            # Forked where possible: spawned children would re-import the main module, and
+            # `python app.py` builds a whole app (reaper, order recovery) at import time.
+            # Children only run inspect_blob, so they touch none of the parent's threads or locks.
+            context = None
+            if 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+            chunksize = max(1, len(blobs) // (self.max_workers * 4))
+            try:
+                with ProcessPoolExecutor(self.max_workers, mp_context=context) as executor:
+                    results = list(executor.map(inspect_blob, blobs, chunksize=chunksize))
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"Inspection pool failed, parsing inline: {e}")
+                return None
+        with self._lock:
+            self._stats['parallel_batches'] += 1
+        return results
+
+    def export_cache(self) -> Dict[str, Dict]:
+        """Cached parse results by content hash, e.g. for the CLI to keep between runs"""
+        with self._lock:
+            return dict(self._cache)
+
+    def import_cache(self, entries: Dict[str, Dict]):
+        with self._lock:
+            self._cache.update(entries)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._cache), 'workers': self.max_workers}
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat() + 'Z'
+
+def build_report(files: List[Tuple[str, str, int, Dict]], hostnames: Sequence[str], warn_days: float,
+                 now: float) -> Dict:
+    """Combine per-file parse results (name, sha256, size, result) into an audit report"""
+    from storage.certificate_inventory import covering_names, normalize_name
+
+    subjects = {cert['subject'] for _, _, _, result in files for cert in result['certificates']}
+    key_ids = {key['public_key'] for _, _, _, result in files for key in result['keys']}
+    certificates_by_key: Dict[str, List[str]] = {}
+    for _, _, _, result in files:
+        for cert in result['certificates']:
+            certificates_by_key.setdefault(cert['public_key'], []).append(cert['fingerprint'])
+
+    summary = {'files': len(files), 'certificates': 0, 'keys': 0, 'expired': 0, 'expiring': 0,
+               'not_yet_valid': 0, 'keys_without_certificate': 0, 'leaves_without_key': 0,
+               'misordered_chains': 0, 'files_with_errors': 0}
+    report_files = []
+    for name, digest, size, result in files:
+        certificates = []
+        for cert in result['certificates']:
+            if now < cert['not_before']:
+                status = 'not_yet_valid'
+            elif now >= cert['not_after']:
+                status = 'expired'
+            elif cert['not_after'] - now < warn_days * 86400:
+                status = 'expiring'
+            else:
+                status = 'valid'
+            if status != 'valid':
+                summary[status] += 1
+            key_found = cert['public_key'] in key_ids
+            if not cert['ca'] and not key_found:
+                summary['leaves_without_key'] += 1
+            certificates.append({
+                **cert,
+                'not_before': _iso(cert['not_before']),
+                'not_after': _iso(cert['not_after']),
+                'status': status,
+                'expires_in_days': round((cert['not_after'] - now) / 86400, 1),
+                'key_found': key_found,
+                'issuer_found': cert['self_signed'] or cert['issuer'] in subjects,
+            })
+        keys = []
+        for key in result['keys']:
+            matches = certificates_by_key.get(key['public_key'], [])
+            if not matches:
+                summary['keys_without_certificate'] += 1
+            keys.append({**key, 'certificates': matches})
+
+        # A bundle lists the leaf first and each following certificate issues the one before it
+        chain_problems = [
+            f"certificate {i + 2} ({nxt['subject']}) did not issue certificate {i + 1} ({cur['subject']})"
+            for i, (cur, nxt) in enumerate(zip(result['certificates'], result['certificates'][1:]))
+            if cur['issuer'] != nxt['subject']
+        ]
+        if chain_problems:
+            summary['misordered_chains'] += 1
+        if result['errors']:
+            summary['files_with_errors'] += 1
+        summary['certificates'] += len(certificates)
+        summary['keys'] += len(keys)
+        report_files.append({
+            'name': name,
+            'sha256': digest,
+            'size': size,
+            'format': result.get('format'),
+            'certificates': certificates,
+            'keys': keys,
+            'chain': {'ordered': not chain_problems, 'problems': chain_problems},
+            'errors': result['errors'],
+        })
+
+    coverage = {}
+    for hostname in hostnames:
+        wanted = set(covering_names(hostname))
+        coverage[normalize_name(hostname)] = [
+            {'file': entry['name'], 'fingerprint': cert['fingerprint'], 'status': cert['status']}
+            for entry in report_files for cert in entry['certificates'] if wanted & set(cert['names'])
+        ]
+    summary['uncovered_hostnames'] = sum(
+        1 for matches in coverage.values() if not any(m['status'] in ('valid', 'expiring') for m in matches)
+    )
+    return {'generated': _iso(now), 'summary': summary, 'files': report_files, 'hostnames': coverage}
@@ -0,0 +1,195 @@
+import json
+import logging
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from validators import DomainValidator
+
+logger = logging.getLogger(__name__)
+
+class CertificatePlan:
+    """One certificate of an issuance plan"""
+
+    __slots__ = ('domains', 'registered_domains', 'validation_method', 'week')
+
+    def __init__(self, domains: List[str], registered_domains: List[str], validation_method: str, week: int = 0):
+        self.domains = domains
+        self.registered_domains = registered_domains
+        self.validation_method = validation_method
+        self.week = week
+
+    def to_dict(self) -> Dict:
+        return {
+            'domains': self.domains,
+            'registered_domains': self.registered_domains,
+            'validation_method': self.validation_method,
+            'week': self.week,
+        }
+
+class IssuancePlan:
+    """Result of packing an inventory into certificates"""
+
+    def __init__(self, certificates: List[CertificatePlan], rejected: Dict[str, str], input_count: int):
+        self.certificates = certificates
+        self.rejected = rejected
+        self.input_count = input_count
+
+    def orders(self, email: str, week: Optional[int] = None) -> Iterator[Dict]:
+        """Yield generate_certificate() keyword arguments for the account email, optionally for one week only"""
+        for certificate in self.certificates:
+            if week is None or certificate.week == week:
+                yield {'domains': certificate.domains, 'email': email,
+                       'validation_method': certificate.validation_method}
+
+    def summary(self) -> Dict:
+        return {
+            'input_domains': self.input_count,
+            'certificates': len(self.certificates),
+            'sans': sum(len(c.domains) for c in self.certificates),
+            'wildcards': sum(1 for c in self.certificates for d in c.domains if d.startswith('*.')),
+            'weeks': max((c.week for c in self.certificates), default=-1) + 1,
+            'rejected': len(self.rejected),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'summary': self.summary(),
+            'certificates': [c.to_dict() for c in self.certificates],
+            'rejected': self.rejected,
+        }
+
+class IssuancePlanner:
+    """Packs a large domain inventory into the fewest certificates of at most max_sans names.
+
+    Names are grouped by registered domain so each certificate touches as few
+    rate-limit buckets as possible. When DNS-01 is available, two or more sibling
+    hosts are collapsed into one wildcard. Groups are then packed best-fit
+    decreasing one week at a time: each week takes only as many certificates'
+    worth of a registered domain as its weekly limit allows, so the overflow of
+    one large domain never shares (and delays) a certificate with others.
+    """
+
+    def __init__(self, max_sans: int = DomainValidator.MAX_DOMAINS, dns01_available: bool = False,
+                 wildcard_threshold: int = 2, weekly_limit: int = 50,
+                 issued_this_week: Optional[Dict[str, int]] = None, default_method: str = 'http'):
+        self.max_sans = max_sans
+        self.dns01_available = dns01_available
+        self.wildcard_threshold = wildcard_threshold
+        if weekly_limit < 1:
+            raise ValueError("weekly_limit must be at least 1")
+        self.weekly_limit = weekly_limit
+        self.issued_this_week = issued_this_week or {}
+        self.default_method = 'dns' if dns01_available and default_method == 'dns' else default_method
+
+    def plan(self, domains: List[str]) -> IssuancePlan:
+        names = list(dict.fromkeys(d.strip().lower() for d in domains if d.strip()))
+        rejected = {}
+        valid = []
+        for name in names:
+            is_valid, error = DomainValidator.validate_single_domain(name)
+            if not is_valid:
+                rejected[name] = error
+            elif name.startswith('*.') and not self.dns01_available:
+                rejected[name] = "Wildcard domains require DNS validation"
+            else:
+                valid.append(name)
+
+        groups = DomainValidator.group_by_registered_domain(valid)
+        if self.dns01_available:
+            groups = {key: self._collapse_wildcards(group) for key, group in groups.items()}
+        else:
+            groups = {key: self._drop_covered(group) for key, group in groups.items()}
+
+        certificates = [self._certificate(items, week) for week, items in self._schedule(groups)]
+        logger.info(f"Planned {len(certificates)} certificates for {len(names)} domains")
+        return IssuancePlan(certificates, rejected, len(names))
+
+    def _collapse_wildcards(self, group: List[str]) -> List[str]:
+        """Replace sibling hosts with a wildcard for their parent when there are enough of them"""
+        children = defaultdict(list)
+        for name in group:
+            if not name.startswith('*.'):
+                children[name.split('.', 1)[1]].append(name)
+
+        registered = DomainValidator.registered_domain(group[0])
+        wildcards = {f"*.{parent}" for parent, hosts in children.items()
+                     if len(hosts) >= self.wildcard_threshold and parent.count('.') >= registered.count('.')}
+        return self._drop_covered(group + sorted(wildcards - set(group)))
+
+    @staticmethod
+    def _drop_covered(group: List[str]) -> List[str]:
+        """Remove hosts that a wildcard in the same group already covers"""
+        wildcard_parents = {name[2:] for name in group if name.startswith('*.')}
+        return [name for name in group
+                if name.startswith('*.') or name.split('.', 1)[-1] not in wildcard_parents]
+
+    def _schedule(self, groups: Dict[str, List[str]]) -> List[Tuple[int, List[tuple]]]:
+        """Split groups into certificate-sized chunks and pack them week by week, returning (week, bin) pairs.
+
+        A registered domain's chunks each take a certificate of their own, so a
+        week admits at most its remaining limit of them; the rest wait for a
+        later week instead of being packed alongside other domains now.
+        """
+        pending = {key: [names[start:start + self.max_sans] for start in range(0, len(names), self.max_sans)]
+                   for key, names in groups.items()}
+        planned = []
+        week = 0
+        while pending:
+            items = []
+            for key in list(pending):
+                allowance = max(0, self.weekly_limit - (self.issued_this_week.get(key, 0) if week == 0 else 0))
+                items.extend((key, names) for names in pending[key][:allowance])
+                pending[key] = pending[key][allowance:]
+                if not pending[key]:
+                    del pending[key]
+            planned.extend((week, items) for items in self._pack(items))
+            week += 1
+        return planned
+
+    def _pack(self, items: List[tuple]) -> List[List[tuple]]:
+        """Best-fit decreasing over (registered domain, names) chunks of at most max_sans names"""
+        items = sorted(items, key=lambda item: len(item[1]), reverse=True)
+
+        bins = []
+        # Bins indexed by remaining capacity make each placement O(max_sans) instead of O(bins)
+        by_room = defaultdict(list)
+        for key, names in items:
+            size = len(names)
+            room = next((r for r in range(size, self.max_sans + 1) if by_room[r]), None)
+            if room is None:
+                index = len(bins)
+                bins.append([])
+                room = self.max_sans
+            else:
+                index = by_room[room].pop()
+            bins[index].append((key, names))
+            by_room[room - size].append(index)
+        return bins
+
+    def _certificate(self, items: List[tuple], week: int) -> CertificatePlan:
+        domains = [name for _, names in items for name in names]
+        # The first name becomes the CN and file name, so avoid leading with a wildcard
+        domains.sort(key=lambda name: name.startswith('*.'))
+        method = 'dns' if any(name.startswith('*.') for name in domains) else self.default_method
+        registered = list(dict.fromkeys(key for key, _ in items))
+        return CertificatePlan(domains, registered, method, week)
+
+def main(argv=None):
+    """Plan certificates for an inventory file with one hostname per line"""
+    parser = argparse.ArgumentParser(description='Pack a domain inventory into the fewest certificates')
+    parser.add_argument('inventory', help='File with one hostname per line')
+    parser.add_argument('--dns01', action='store_true', help='DNS-01 is available, so wildcards may be used')
+    parser.add_argument('--max-sans', type=int, default=DomainValidator.MAX_DOMAINS)
+    parser.add_argument('--weekly-limit', type=int, default=50)
+    parser.add_argument('--wildcard-threshold', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    with open(args.inventory) as f:
+        domains = [line.split('#', 1)[0] for line in f]
+    planner = IssuancePlanner(max_sans=args.max_sans, dns01_available=args.dns01,
+                              wildcard_threshold=args.wildcard_threshold, weekly_limit=args.weekly_limit)
+    print(json.dumps(planner.plan(domains).to_dict(), indent=2))
+
+if __name__ == '__main__':
+    main()
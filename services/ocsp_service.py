@@ -0,0 +1,218 @@
+from typing import List, Optional, Tuple
+import logging
+import base64
+import re
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+from cryptography.x509 import ocsp
+from cryptography.x509.oid import AuthorityInformationAccessOID, ExtendedKeyUsageOID
+
+from acme_transport import get_transport
+from storage import OCSPCacheInterface
+
+logger = logging.getLogger(__name__)
+
+_PEM_CERTIFICATE = re.compile(rb'-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----', re.DOTALL)
+
+class OCSPError(Exception):
+    """Raised when an OCSP response cannot be fetched or fails validation"""
+
+def load_pem_chain(chain_pem: bytes) -> List[x509.Certificate]:
+    """Parse every certificate of a PEM chain, leaf first"""
+    return [x509.load_pem_x509_certificate(block) for block in _PEM_CERTIFICATE.findall(chain_pem)]
+
+def responder_url(certificate: x509.Certificate) -> Optional[str]:
+    """Return the OCSP responder named in a certificate's Authority Information Access extension"""
+    try:
+        aia = certificate.extensions.get_extension_for_class(x509.AuthorityInformationAccess).value
+    except x509.ExtensionNotFound:
+        return None
+    for description in aia:
+        if description.access_method == AuthorityInformationAccessOID.OCSP:
+            return description.access_location.value
+    return None
+
+def _timestamp(value: datetime) -> float:
+    # cryptography returns naive UTC datetimes
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def _verify_signature(public_key, signature: bytes, data: bytes, algorithm):
+    if isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(signature, data, padding.PKCS1v15(), algorithm)
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_key.verify(signature, data, ec.ECDSA(algorithm))
+    else:
+        public_key.verify(signature, data)
+
+class OCSPService:
+    """Fetches, validates and caches OCSP responses for issued certificates.
+
+    Responses are cached until their nextUpdate and refreshed proactively at
+    half-life, so stapling edges always get a response with plenty of
+    validity left. A failed refresh keeps serving the cached response until
+    it expires.
+    """
+
+    # Responses without nextUpdate are treated as valid for this long
+    DEFAULT_LIFETIME = 3600.0
+    # Never refresh more often than this, even for very short-lived responses
+    MIN_REFRESH_INTERVAL = 60.0
+    # Back-off before retrying a failed fetch
+    RETRY_INTERVAL = 300.0
+    # Tolerated clock difference to the responder
+    CLOCK_SKEW = 300.0
+
+    def __init__(self, cache: OCSPCacheInterface):
+        self.cache = cache
+
+    @staticmethod
+    def certificate_key(certificate: x509.Certificate, issuer: x509.Certificate) -> str:
+        """Return the cache key '<issuer key hash>/<serial>' used by the OCSP endpoint"""
+        request = ocsp.OCSPRequestBuilder().add_certificate(certificate, issuer, hashes.SHA1()).build()
+        return f"{request.issuer_key_hash.hex()}/{request.serial_number:x}"
+
+    def register_chain(self, chain_pem) -> Optional[str]:
+        """Register an issued leaf + issuer chain for stapling and return its key.
+
+        Returns None when the chain has no issuer or the leaf names no OCSP
+        responder. The first response is fetched by the next refresh.
+        """
+        if isinstance(chain_pem, str):
+            chain_pem = chain_pem.encode('ascii')
+        certificates = load_pem_chain(chain_pem)
+        if len(certificates) < 2:
+            logger.info("Not registering certificate for OCSP: the chain has no issuer")
+            return None
+        leaf, issuer = certificates[0], certificates[1]
+        url = responder_url(leaf)
+        if url is None:
+            logger.info(f"Not registering certificate {leaf.serial_number:x} for OCSP: no responder URL")
+            return None
+        key = self.certificate_key(leaf, issuer)
+        self.cache.put_certificate(key, chain_pem, url, _timestamp(leaf.not_valid_after))
+        return key
+
+    def get_response(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (DER response, seconds until its refresh) for a registered certificate.
+
+        Fetches synchronously only when nothing usable is cached; otherwise
+        the background refresh keeps the entry current.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if entry['response'] is None or entry['next_update'] <= now:
+            try:
+                entry = self._refresh_entry(entry)
+            except OCSPError as e:
+                logger.warning(f"OCSP fetch for {key} failed: {e}")
+                self.cache.schedule_refresh(key, now + self.RETRY_INTERVAL)
+                return None
+        return entry['response'], max(0.0, entry['refresh_at'] - now)
+
+    def refresh_due(self, limit: int = 100) -> int:
+        """Refresh every response past its half-life; returns how many were refreshed"""
+        refreshed = 0
+        # Claiming pushes each refresh back by RETRY_INTERVAL, so other workers skip these
+        # entries and a failed (or abandoned) fetch is retried after the usual back-off
+        for entry in self.cache.claim_due(time.time(), self.RETRY_INTERVAL, limit):
+            try:
+                self._refresh_entry(entry)
+                refreshed += 1
+            except OCSPError as e:
+                # The cached response stays in use until its nextUpdate
+                logger.warning(f"OCSP refresh for {entry['key']} failed: {e}")
+        return refreshed
+
+    def _refresh_entry(self, entry: dict) -> dict:
+        certificates = load_pem_chain(entry['chain_pem'])
+        response, this_update, next_update = self.fetch(certificates[0], certificates[1], entry['responder_url'])
+        now = time.time()
+        half_life = this_update + (next_update - this_update) / 2
+        refresh_at = min(max(half_life, now + self.MIN_REFRESH_INTERVAL), next_update)
+        self.cache.store_response(entry['key'], response, this_update, next_update, refresh_at)
+        return dict(entry, response=response, this_update=this_update, next_update=next_update,
+                    refresh_at=refresh_at)
+
+    def fetch(self, certificate: x509.Certificate, issuer: x509.Certificate,
+              url: str) -> Tuple[bytes, float, float]:
+        """Query a responder and return (DER response, thisUpdate, nextUpdate) once validated"""
+        request = ocsp.OCSPRequestBuilder().add_certificate(certificate, issuer, hashes.SHA1()).build()
+        request_der = request.public_bytes(serialization.Encoding.DER)
+        transport = get_transport(url)
+        try:
+            # RFC 5019: small requests go by GET so responders and CDNs can cache them
+            encoded = base64.b64encode(request_der).decode('ascii')
+            if len(encoded) < 255:
+                response = transport.get(f"{url.rstrip('/')}/{quote(encoded, safe='')}")
+            else:
+                response = transport.post(url, data=request_der,
+                                          headers={'Content-Type': 'application/ocsp-request'})
+            response.raise_for_status()
+        except Exception as e:
+            raise OCSPError(f"request to {url} failed: {e}") from e
+
+        try:
+            parsed = ocsp.load_der_ocsp_response(response.content)
+        except ValueError as e:
+            raise OCSPError(f"malformed response from {url}") from e
+        self._validate(parsed, request, issuer)
+
+        this_update = _timestamp(parsed.this_update)
+        next_update = (_timestamp(parsed.next_update) if parsed.next_update is not None
+                       else this_update + self.DEFAULT_LIFETIME)
+        return response.content, this_update, next_update
+
+    def _validate(self, response: ocsp.OCSPResponse, request: ocsp.OCSPRequest, issuer: x509.Certificate):
+        """Check that a response answers this request, is current and is signed on the issuer's behalf"""
+        if response.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+            raise OCSPError(f"responder returned {response.response_status.name}")
+        if (response.serial_number != request.serial_number
+                or response.issuer_key_hash != request.issuer_key_hash):
+            raise OCSPError("response is for a different certificate")
+        if response.certificate_status == ocsp.OCSPCertStatus.UNKNOWN:
+            raise OCSPError("responder does not know the certificate")
+
+        now = time.time()
+        if _timestamp(response.this_update) > now + self.CLOCK_SKEW:
+            raise OCSPError("response thisUpdate is in the future")
+        if response.next_update is not None and _timestamp(response.next_update) <= now:
+            raise OCSPError("response has already expired")
+
+        signer = self._signer(response, issuer)
+        try:
+            _verify_signature(signer.public_key(), response.signature, response.tbs_response_bytes,
+                              response.signature_hash_algorithm)
+        except InvalidSignature as e:
+            raise OCSPError("response signature is invalid") from e
+
+    @staticmethod
+    def _signer(response: ocsp.OCSPResponse, issuer: x509.Certificate) -> x509.Certificate:
+        """Return the issuer, or a delegated responder certificate the issuer signed for OCSP"""
+        def is_responder(certificate):
+            if response.responder_key_hash is not None:
+                key_id = x509.SubjectKeyIdentifier.from_public_key(certificate.public_key()).digest
+                return key_id == response.responder_key_hash
+            return certificate.subject == response.responder_name
+
+        if is_responder(issuer):
+            return issuer
+        for certificate in response.certificates:
+            if not is_responder(certificate) or certificate.issuer != issuer.subject:
+                continue
+            try:
+                _verify_signature(issuer.public_key(), certificate.signature,
+                                  certificate.tbs_certificate_bytes, certificate.signature_hash_algorithm)
+                usages = certificate.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+            except (InvalidSignature, x509.ExtensionNotFound):
+                continue
+            if ExtendedKeyUsageOID.OCSP_SIGNING in usages:
+                return certificate
+        raise OCSPError(f"response is not signed by {issuer.subject.rfc4514_string()} or a responder it authorised")
@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 import logging
 from datetime import datetime, timedelta
-import tempfile
-import os
 
-from real_acme_client import RealACMEClient
+from tracing import traced
+
+if TYPE_CHECKING:
+    from real_acme_client import RealACMEClient
+    from storage import ArtifactStoreInterface
 
 logger = logging.getLogger(__name__)
 
@@ -25,21 +27,29 @@ class SSLServiceInterface(ABC):
 class DemoSSLService(SSLServiceInterface):
     """Service for generating demo/self-signed certificates"""
     
-    def __init__(self, temp_dir: Optional[str] = None):
-        self.temp_dir = temp_dir or tempfile.mkdtemp()
+    def __init__(self, artifact_store: Optional['ArtifactStoreInterface'] = None):
+        # Without a store, files go to the generator's own temp directory, removed by cleanup()
+        self.artifact_store = artifact_store
         self.ssl_generator = None
     
+    @traced('ssl_service.demo.generate_certificate')
     def generate_certificate(self, domains: List[str], email: str, validation_method: str) -> Dict:
         """Generate demo SSL certificate"""
         try:
             from ssl_generator import SSLGenerator
             self.ssl_generator = SSLGenerator()
+            expires = datetime.now() + timedelta(minutes=15)
+            artifact_id = None
             
-            cert_files = self.ssl_generator.generate_certificate(
-                domains=domains,
-                email=email,
-                validation_method=validation_method
-            )
+            if self.artifact_store is not None:
+                contents = self.ssl_generator.render_certificate(domains, email, validation_method)
+                artifact_id, cert_files = self.artifact_store.save(contents, expires)
+            else:
+                cert_files = self.ssl_generator.generate_certificate(
+                    domains=domains,
+                    email=email,
+                    validation_method=validation_method
+                )
             
             if not cert_files:
                 raise Exception("Failed to generate certificate files")
@@ -47,9 +57,10 @@ class DemoSSLService(SSLServiceInterface):
             return {
                 'success': True,
                 'files': cert_files,
+                'artifact': artifact_id,
                 'type': 'demo',
                 'domains': domains,
-                'expires': datetime.now() + timedelta(minutes=15)
+                'expires': expires
             }
             
         except Exception as e:
@@ -61,16 +72,25 @@ class DemoSSLService(SSLServiceInterface):
             }
     
     def cleanup(self):
-        """Cleanup demo certificate resources"""
+        """Cleanup demo certificate resources (files saved to the artifact store outlive the service)"""
         if self.ssl_generator:
             self.ssl_generator.cleanup()
 
 class RealSSLService(SSLServiceInterface):
     """Service for generating real Let's Encrypt certificates"""
     
-    def __init__(self, use_staging=True):
-        self.acme_client = RealACMEClient(use_staging)
+    def __init__(self, use_staging=True, acme_client: Optional['RealACMEClient'] = None,
+                 base_url: Optional[str] = None, artifact_store: Optional['ArtifactStoreInterface'] = None):
+        # Reuse a rehydrated client when given instead of generating fresh keys;
+        # the ACME/crypto stack is imported here so demo-only processes never load it
+        if acme_client is None:
+            from real_acme_client import RealACMEClient
+            acme_client = RealACMEClient(use_staging, base_url=base_url)
+        self.acme_client = acme_client
+        # Required by verify_challenges, which saves the issued certificate and key through it
+        self.artifact_store = artifact_store
 
+    @traced('ssl_service.real.generate_certificate')
     def generate_certificate(self, domains, email, validation_method):
         """Generates a real SSL certificate."""
         try:
@@ -84,10 +104,14 @@ class RealSSLService(SSLServiceInterface):
             logger.error(f"Real SSL generation failed: {e}")
             raise
 
-    def verify_challenges(self, challenges):
-        """Verifies domain challenges and completes certificate generation."""
+    @traced('ssl_service.real.verify_challenges')
+    def verify_challenges(self, challenges, progress=None):
+        """Verifies domain challenges and completes certificate generation.
+
+        progress is forwarded to the ACME client to report per-domain events.
+        """
         try:
-            verification_results = self.acme_client.verify_domain_challenges(challenges)
+            verification_results = self.acme_client.verify_domain_challenges(challenges, progress)
             
             all_verified = all(r['verified'] for r in verification_results)
 
@@ -100,26 +124,20 @@ class RealSSLService(SSLServiceInterface):
             
             # All domains are verified, now finalize the certificate
             cert_result = self.acme_client.complete_certificate_generation(
-                [c['domain'] for c in challenges]
+                [c['domain'] for c in challenges], progress
             )
 
-            # Check if we're on Vercel and need to handle certificate data differently
-            if os.environ.get('VERCEL') and 'certificate_data' in cert_result:
-                # On Vercel, we need to create temporary files in memory or handle differently
-                # For now, we'll return the data directly and let the routes handle it
-                return {
-                    'success': True, 
-                    'files': cert_result,  # Contains certificate_data and private_key_data
-                    'expires': datetime.now() + timedelta(minutes=15),
-                    'vercel_mode': True
-                }
-            else:
-                # Local/Docker environment - normal file handling
-                return {
-                    'success': True, 
-                    'files': cert_result,
-                    'expires': datetime.now() + timedelta(minutes=15)
-                }
+            expires = datetime.now() + timedelta(minutes=15)
+            artifact_id, files = self.artifact_store.save({
+                'certificate': cert_result['certificate_data'],
+                'private_key': cert_result['private_key_data']
+            }, expires)
+            return {
+                'success': True, 
+                'files': files,
+                'artifact': artifact_id,
+                'expires': expires
+            }
         except Exception as e:
             logger.error(f"Challenge verification failed: {e}")
             raise
@@ -133,11 +151,18 @@ class SSLServiceFactory:
     """Factory for creating SSL services"""
     
     @staticmethod
-    def create_service(cert_type: str, staging: bool = True) -> SSLServiceInterface:
-        """Create appropriate SSL service based on type"""
+    def create_service(cert_type: str, staging: bool = True,
+                       acme_client: Optional['RealACMEClient'] = None,
+                       base_url: Optional[str] = None,
+                       artifact_store: Optional['ArtifactStoreInterface'] = None) -> SSLServiceInterface:
+        """Create appropriate SSL service based on type (base_url overrides the Let's Encrypt endpoint).
+
+        Issued files are written through artifact_store when one is given.
+        """
         if cert_type == 'demo':
-            return DemoSSLService()
+            return DemoSSLService(artifact_store)
         elif cert_type == 'real':
-            return RealSSLService(use_staging=staging)
+            return RealSSLService(use_staging=staging, acme_client=acme_client, base_url=base_url,
+                                  artifact_store=artifact_store)
         else:
             raise ValueError(f"Unsupported certificate type: {cert_type}") 
\ No newline at end of file
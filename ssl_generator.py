@@ -8,22 +8,44 @@ from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes
 import datetime
 
+from tracing import span
+
 class SSLGenerator:
     def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+        # Created on first generate_certificate(); render_certificate() never touches the disk
+        self.temp_dir = None
         
     def generate_certificate(self, domains, email, validation_method='http'):
         """
-        Generate SSL certificate using Let's Encrypt simulation
+        Generate SSL certificate using Let's Encrypt simulation and write it to a temporary directory
         Note: This is a simplified implementation for demonstration.
         In production, you would use the ACME protocol with proper domain validation.
         """
+        contents = self.render_certificate(domains, email, validation_method)
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp()
+        
+        # Write files
+        paths = {
+            'private_key': os.path.join(self.temp_dir, f'{domains[0]}.key'),
+            'certificate': os.path.join(self.temp_dir, f'{domains[0]}.crt'),
+            'ca_bundle': os.path.join(self.temp_dir, f'{domains[0]}-ca.crt')
+        }
+        for file_type, path in paths.items():
+            with open(path, 'wb') as f:
+                f.write(contents[file_type])
+        
+        return paths
+    
+    def render_certificate(self, domains, email, validation_method='http'):
+        """Generate the demo key, certificate and CA certificate as PEM bytes, keyed by file type"""
         try:
             # Generate private key
-            private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=2048,
-            )
+            with span('crypto.keygen', key='demo', bits=2048):
+                private_key = rsa.generate_private_key(
+                    public_exponent=65537,
+                    key_size=2048,
+                )
             
             # Create certificate request
             subject = x509.Name([
@@ -78,33 +100,16 @@ class SSLGenerator:
                 critical=True,
             ).sign(private_key, hashes.SHA256())
             
-            # Write files
-            private_key_path = os.path.join(self.temp_dir, f'{domains[0]}.key')
-            cert_path = os.path.join(self.temp_dir, f'{domains[0]}.crt')
-            ca_cert_path = os.path.join(self.temp_dir, f'{domains[0]}-ca.crt')
+            logging.info(f"SSL certificate generated for domains: {domains}")
             
-            # Write private key
-            with open(private_key_path, 'wb') as f:
-                f.write(private_key.private_bytes(
+            return {
+                'private_key': private_key.private_bytes(
                     encoding=serialization.Encoding.PEM,
                     format=serialization.PrivateFormat.PKCS8,
                     encryption_algorithm=serialization.NoEncryption()
-                ))
-            
-            # Write certificate
-            with open(cert_path, 'wb') as f:
-                f.write(cert.public_bytes(serialization.Encoding.PEM))
-            
-            # Write CA certificate
-            with open(ca_cert_path, 'wb') as f:
-                f.write(ca_cert.public_bytes(serialization.Encoding.PEM))
-            
-            logging.info(f"SSL certificate generated for domains: {domains}")
-            
-            return {
-                'private_key': private_key_path,
-                'certificate': cert_path,
-                'ca_bundle': ca_cert_path
+                ),
+                'certificate': cert.public_bytes(serialization.Encoding.PEM),
+                'ca_bundle': ca_cert.public_bytes(serialization.Encoding.PEM)
             }
             
         except Exception as e:
@@ -112,9 +117,12 @@ class SSLGenerator:
             raise Exception(f"Failed to generate SSL certificate: {str(e)}")
     
     def cleanup(self):
-        """Clean up temporary files"""
+        """Clean up temporary files written by generate_certificate()"""
+        if self.temp_dir is None:
+            return
         try:
             import shutil
             shutil.rmtree(self.temp_dir)
+            self.temp_dir = None
         except Exception as e:
             logging.error(f"Cleanup error: {str(e)}")
@@ -286,3 +286,95 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+// Live verification progress over Server-Sent Events
+const VERIFICATION_BADGES = {
+    signalled: ['bg-info', 'Submitted'],
+    pending: ['bg-warning', 'Pending'],
+    valid: ['bg-success', 'Verified'],
+    invalid: ['bg-danger', 'Failed']
+};
+
+function initVerificationStream() {
+    const verifyForm = document.getElementById('verifyForm');
+    if (!verifyForm || !window.EventSource) return;  // Fall back to the plain form POST
+    
+    verifyForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+        
+        const verifyBtn = document.getElementById('verifyBtn');
+        verifyBtn.disabled = true;
+        document.getElementById('verification-progress').classList.remove('d-none');
+        document.getElementById('verification-log').innerHTML = '';
+        document.getElementById('verification-downloads').innerHTML = '';
+        
+        const source = new EventSource(verifyForm.dataset.eventsUrl);
+        const finish = () => {
+            // Close explicitly so the browser doesn't reconnect and verify again
+            source.close();
+            verifyBtn.disabled = false;
+        };
+        
+        Object.keys(VERIFICATION_BADGES).forEach(eventName => {
+            source.addEventListener(eventName, function(event) {
+                const data = JSON.parse(event.data);
+                updateDomainBadge(data.domain, eventName);
+                appendVerificationLog(`${data.domain}: ${data.message}`, eventName === 'invalid' ? 'text-danger' : '');
+            });
+        });
+        
+        source.addEventListener('finalizing', function(event) {
+            appendVerificationLog(JSON.parse(event.data).message, 'text-primary');
+        });
+        
+        source.addEventListener('certificate_ready', function(event) {
+            const data = JSON.parse(event.data);
+            appendVerificationLog('Certificate ready. Download links expire in 15 minutes.', 'text-success fw-bold');
+            renderVerificationDownloads(data.downloads);
+            source.close();
+        });
+        
+        source.addEventListener('failed', function() {
+            appendVerificationLog('Some domains failed validation. Fix the issues above and verify again.', 'text-danger fw-bold');
+            finish();
+        });
+        
+        source.addEventListener('error', function(event) {
+            const message = event.data ? JSON.parse(event.data).message : 'Connection to the server was lost.';
+            appendVerificationLog(message, 'text-danger');
+            finish();
+        });
+    });
+}
+
+function updateDomainBadge(domain, eventName) {
+    const badge = document.querySelector(`.verification-status[data-domain="${CSS.escape(domain)}"]`);
+    if (!badge) return;
+    
+    const [className, label] = VERIFICATION_BADGES[eventName];
+    badge.className = `badge verification-status ${className}`;
+    badge.textContent = label;
+}
+
+function appendVerificationLog(message, className) {
+    const item = document.createElement('li');
+    item.className = className || '';
+    item.textContent = message;
+    document.getElementById('verification-log').appendChild(item);
+}
+
+function renderVerificationDownloads(downloads) {
+    const container = document.getElementById('verification-downloads');
+    const labels = { certificate: 'Certificate (.crt)', private_key: 'Private Key (.key)' };
+    
+    Object.entries(downloads).forEach(([fileType, url]) => {
+        const link = document.createElement('a');
+        link.href = url;
+        link.className = 'btn btn-primary me-2 mb-2';
+        link.innerHTML = '<i class="fas fa-download me-1"></i>';
+        link.appendChild(document.createTextNode(labels[fileType] || fileType));
+        container.appendChild(link);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initVerificationStream);
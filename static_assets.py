@@ -0,0 +1,177 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+from flask import Blueprint, current_app, request, send_file, url_for, abort
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone is used when Brotli isn't installed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ico'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Preferred order when the client accepts several encodings equally
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+assets_bp = Blueprint('assets', __name__)
+
+class AssetManifest:
+    """Content-hashed, precompressed copies of the static folder.
+
+    Each source file is written to the build directory as name.<hash>.ext plus
+    .gz (and .br when Brotli is installed) variants. The manifest maps logical
+    names to hashed ones; a hashed URL never changes content, so it is served
+    with immutable cache headers.
+    """
+
+    def __init__(self, source_dir: str, build_dir: str):
+        self.source_dir = os.path.abspath(source_dir)
+        self.build_dir = os.path.abspath(build_dir)
+        self.entries: Dict[str, Dict] = {}
+        self._by_hashed: Dict[str, str] = {}
+
+    def ensure(self) -> 'AssetManifest':
+        """Load the manifest, rebuilding any asset whose source changed since it was written"""
+        self.entries = self._read_manifest()
+        changed = False
+        for logical, path in self._sources():
+            digest = _file_digest(path)
+            entry = self.entries.get(logical)
+            if entry is None or entry['sha256'] != digest or not os.path.exists(self._path(entry['hashed'])):
+                self.entries[logical] = self._build_one(logical, path, digest)
+                changed = True
+        if changed:
+            self._write_manifest()
+        self._by_hashed = {entry['hashed']: logical for logical, entry in self.entries.items()}
+        return self
+
+    def hashed_name(self, logical: str) -> Optional[str]:
+        entry = self.entries.get(logical)
+        return entry['hashed'] if entry else None
+
+    def resolve(self, hashed: str, accept_encoding) -> Optional[Tuple[str, str, Optional[str]]]:
+        """Return (path, mimetype, content_encoding) of the best variant for the client"""
+        logical = self._by_hashed.get(hashed)
+        if logical is None:
+            return None
+        entry = self.entries[logical]
+        mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+
+        best, best_quality = None, 0
+        for encoding, suffix in ENCODINGS:
+            quality = accept_encoding.quality(encoding) if accept_encoding else 0
+            if encoding in entry['encodings'] and quality > best_quality:
+                best, best_quality = (encoding, suffix), quality
+        if best is not None:
+            return self._path(hashed + best[1]), mimetype, best[0]
+        return self._path(hashed), mimetype, None
+
+    def _sources(self):
+        for directory, dirnames, filenames in os.walk(self.source_dir):
+            # Never fingerprint our own output when it lives inside the static folder
+            dirnames[:] = [d for d in dirnames if os.path.join(directory, d) != self.build_dir]
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, self.source_dir).replace(os.sep, '/'), path
+
+    def _build_one(self, logical: str, path: str, digest: str) -> Dict:
+        root, ext = os.path.splitext(logical)
+        hashed = f"{root}.{digest[:12]}{ext}"
+        with open(path, 'rb') as f:
+            data = f.read()
+        _atomic_write(self._path(hashed), data)
+
+        encodings = []
+        if ext.lower() in COMPRESSIBLE_EXTENSIONS:
+            variants = [('gzip', '.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.insert(0, ('br', '.br', brotli.compress(data, quality=11)))
+            for encoding, suffix, compressed in variants:
+                # Skip variants that don't actually save bytes
+                if len(compressed) < len(data):
+                    _atomic_write(self._path(hashed + suffix), compressed)
+                    encodings.append(encoding)
+        logger.info(f"Built static asset {hashed} ({', '.join(encodings) or 'uncompressed'})")
+        return {'hashed': hashed, 'sha256': digest, 'encodings': encodings}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.build_dir, *name.split('/'))
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self._path(MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        _atomic_write(self._path(MANIFEST_NAME), json.dumps(self.entries, indent=2, sort_keys=True).encode('utf-8'))
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _atomic_write(path: str, data: bytes):
+    """Write via a temp file so concurrently starting workers never serve a partial asset"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def init_assets(app):
+    """Build or load the asset manifest and expose asset_url() to templates.
+
+    Without a writable build directory the app keeps serving the plain static files.
+    """
+    manifest = None
+    if app.config['STATIC_ASSETS_ENABLED']:
+        try:
+            manifest = AssetManifest(app.static_folder, app.config['STATIC_BUILD_DIR']).ensure()
+        except OSError as e:
+            logging.warning(f"Could not build precompressed static assets: {e}")
+    app.asset_manifest = manifest
+    app.register_blueprint(assets_bp)
+
+    def asset_url(filename: str) -> str:
+        hashed = manifest.hashed_name(filename) if manifest else None
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets.asset', filename=hashed)
+
+    app.add_template_global(asset_url)
+
+@assets_bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted asset, precompressed according to Accept-Encoding"""
+    manifest = current_app.asset_manifest
+    resolved = manifest.resolve(filename, request.accept_encodings) if manifest else None
+    if resolved is None:
+        abort(404)
+    path, mimetype, encoding = resolved
+
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+if __name__ == '__main__':
+    # Build step: python -m static_assets [static_dir] [build_dir]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    here = os.path.dirname(os.path.abspath(__file__))
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, 'static')
+    build = sys.argv[2] if len(sys.argv) > 2 else (os.environ.get('STATIC_BUILD_DIR') or os.path.join(source, 'dist'))
+    manifest = AssetManifest(source, build).ensure()
+    logger.info(f"Wrote {len(manifest.entries)} assets to {build}")
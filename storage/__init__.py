@@ -0,0 +1,40 @@
+from .database import SQLiteDatabase, get_database
+from .reaper import ExpiryReaper
+from .download_registry import (
+    DownloadRegistryInterface, SQLiteDownloadRegistry, MemoryDownloadRegistry, DownloadRegistryFactory, new_download_id
+)
+from .session_records import SessionRecord, ChallengeRecord
+from .certificate_inventory import (
+    CertificateInventoryInterface, SQLiteCertificateInventory, MemoryCertificateInventory, CertificateInventoryFactory
+)
+from .artifact_store import (
+    ArtifactStoreInterface, SQLiteArtifactStore, MemoryArtifactStore, ArtifactStoreFactory, new_artifact_id
+)
+from .order_journal import OrderJournal, OrderState, ORDER_EVENTS
+from .inflight_orders import (
+    InflightOrdersInterface, SQLiteInflightOrders, MemoryInflightOrders, InflightOrdersFactory, order_key
+)
+from .ocsp_cache import OCSPCacheInterface, SQLiteOCSPCache, MemoryOCSPCache, OCSPCacheFactory
+from .challenge_table import ChallengeTableInterface, SQLiteChallengeTable, MemoryChallengeTable, ChallengeTableFactory
+from .rate_limiter import (
+    RateLimiterInterface, SQLiteRateLimiter, MemoryRateLimiter, RateLimiterFactory, parse_limit
+)
+from .session_store import (
+    SessionStoreInterface, SQLiteSessionStore, MemorySessionStore, PickleSessionStore, SessionStoreFactory
+)
+
+__all__ = [
+    'SQLiteDatabase', 'get_database', 'ExpiryReaper',
+    'DownloadRegistryInterface', 'SQLiteDownloadRegistry', 'MemoryDownloadRegistry', 'DownloadRegistryFactory',
+    'new_download_id',
+    'SessionRecord', 'ChallengeRecord',
+    'ChallengeTableInterface', 'SQLiteChallengeTable', 'MemoryChallengeTable', 'ChallengeTableFactory',
+    'CertificateInventoryInterface', 'SQLiteCertificateInventory', 'MemoryCertificateInventory',
+    'CertificateInventoryFactory',
+    'ArtifactStoreInterface', 'SQLiteArtifactStore', 'MemoryArtifactStore', 'ArtifactStoreFactory', 'new_artifact_id',
+    'OrderJournal', 'OrderState', 'ORDER_EVENTS',
+    'InflightOrdersInterface', 'SQLiteInflightOrders', 'MemoryInflightOrders', 'InflightOrdersFactory', 'order_key',
+    'OCSPCacheInterface', 'SQLiteOCSPCache', 'MemoryOCSPCache', 'OCSPCacheFactory',
+    'RateLimiterInterface', 'SQLiteRateLimiter', 'MemoryRateLimiter', 'RateLimiterFactory', 'parse_limit',
+    'SessionStoreInterface', 'SQLiteSessionStore', 'MemorySessionStore', 'PickleSessionStore', 'SessionStoreFactory'
+]
@@ -0,0 +1,322 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import secrets
+import logging
+import threading
+import errno
+import time
+import os
+from datetime import datetime
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+# file type -> name on disk; downloads are renamed after the domain when served
+FILE_NAMES = {
+    'certificate': 'certificate.crt',
+    'private_key': 'private.key',
+    'ca_bundle': 'ca_bundle.crt',
+}
+SECRET_FILE_TYPES = ('private_key',)
+
+def new_artifact_id() -> str:
+    return secrets.token_hex(16)
+
+def _wipe(path: str):
+    """Overwrite a file with zeros before unlinking it, so the key does not linger in freed blocks.
+
+    Best effort: journaling and copy-on-write filesystems may still hold old
+    copies, which is why keys are written 0600 in a 0700 directory too.
+    """
+    try:
+        with open(path, 'r+b', buffering=0) as f:
+            f.write(b'\0' * os.fstat(f.fileno()).st_size)
+            os.fsync(f.fileno())
+    except OSError as e:
+        logger.warning(f"Could not overwrite {path} before removal: {e}")
+    os.unlink(path)
+
+class ArtifactStoreInterface(ABC):
+    """Abstract interface for the on-disk store of issued certificate files.
+
+    Each artifact (the files of one certificate) is a private directory
+    root/<artifact id>/. An index records every artifact's size, expiry and
+    last access: expired artifacts are reaped, and when a new artifact would
+    take the store over its byte quota, expired and then least recently used
+    artifacts are evicted first. Private keys are overwritten before removal.
+    """
+
+    def __init__(self, root: str, quota_bytes: int):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        self._stats = {'saved': 0, 'removed': 0, 'evicted': 0}
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def _reserve(self, artifact_id: str, size: int, expires: float) -> List[str]:
+        """Index a new artifact, returning the ids evicted (and unindexed) to keep within the quota"""
+        pass
+
+    @abstractmethod
+    def _forget(self, artifact_id: str) -> bool:
+        """Unindex an artifact; returns whether it was indexed"""
+        pass
+
+    @abstractmethod
+    def _pop_expired(self) -> List[str]:
+        """Unindex and return every expired artifact"""
+        pass
+
+    @abstractmethod
+    def touch(self, artifact_id: str):
+        """Mark an artifact as just used, so quota eviction takes it last"""
+        pass
+
+    @abstractmethod
+    def usage(self) -> Tuple[int, int]:
+        """Return (artifacts, bytes) currently indexed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any artifact"""
+        pass
+
+    def save(self, files: Dict[str, Union[bytes, str]], expires,
+             secret: Iterable[str] = SECRET_FILE_TYPES) -> Tuple[str, Dict[str, str]]:
+        """Write one certificate's files, returning (artifact id, file type -> path).
+
+        Raises OSError (ENOSPC) if the files alone exceed the quota.
+        """
+        contents = {file_type: data.encode('utf-8') if isinstance(data, str) else data
+                    for file_type, data in files.items()}
+        size = sum(len(data) for data in contents.values())
+        if size > self.quota_bytes:
+            raise OSError(errno.ENOSPC, f"Artifact of {size} bytes exceeds the store quota of {self.quota_bytes}")
+        artifact_id = new_artifact_id()
+        # Indexed before anything is written, so the directory is never an unaccounted orphan
+        evicted = self._reserve(artifact_id, size, expires.timestamp())
+        for victim in evicted:
+            self._remove_directory(victim)
+        if evicted:
+            self._count('evicted', len(evicted))
+            logger.info(f"Evicted {len(evicted)} artifacts to stay within the {self.quota_bytes} byte quota")
+        directory = self._directory(artifact_id)
+        paths = {}
+        try:
+            os.mkdir(directory, 0o700)
+            for file_type, data in contents.items():
+                path = paths[file_type] = os.path.join(directory, FILE_NAMES.get(file_type, file_type))
+                mode = 0o600 if file_type in secret else 0o644
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+        except OSError:
+            self.remove(artifact_id)
+            raise
+        self._count('saved')
+        return artifact_id, paths
+
+    def remove(self, artifact_id: str) -> bool:
+        """Delete an artifact and its directory; returns whether it was indexed"""
+        indexed = self._forget(artifact_id)
+        self._remove_directory(artifact_id)
+        if indexed:
+            self._count('removed')
+        return indexed
+
+    def purge_expired(self) -> int:
+        """Delete every expired artifact, returning how many were removed"""
+        expired = self._pop_expired()
+        for artifact_id in expired:
+            self._remove_directory(artifact_id)
+        if expired:
+            self._count('removed', len(expired))
+        return len(expired)
+
+    def stats(self) -> Dict:
+        artifacts, size = self.usage()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {**stats, 'artifacts': artifacts, 'bytes': size, 'quota_bytes': self.quota_bytes}
+
+    def _directory(self, artifact_id: str) -> str:
+        # Ids come from new_artifact_id(); anything else must not escape the root
+        if not artifact_id or not all(c in '0123456789abcdef' for c in artifact_id):
+            raise ValueError(f"Invalid artifact id: {artifact_id!r}")
+        return os.path.join(self.root, artifact_id)
+
+    def _remove_directory(self, artifact_id: str):
+        directory = self._directory(artifact_id)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                # Secret files are the ones written owner-only
+                if not os.stat(path).st_mode & 0o077:
+                    _wipe(path)
+                else:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(directory)
+        except OSError as e:
+            logger.error(f"Could not remove artifact directory {directory}: {e}")
+
+    def _count(self, stat: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += n
+
+class SQLiteArtifactStore(ArtifactStoreInterface):
+    """Artifact store indexed in the state database, shared by every worker on the host"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            id TEXT PRIMARY KEY,
+            bytes INTEGER NOT NULL,
+            expires REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS artifacts_expires ON artifacts (expires);
+        CREATE INDEX IF NOT EXISTS artifacts_last_access ON artifacts (last_access);
+    """
+
+    def __init__(self, path: str, root: str, quota_bytes: int):
+        super().__init__(root, quota_bytes)
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def _reserve(self, artifact_id: str, size: int, expires: float) -> List[str]:
+        now = time.time()
+        evicted = []
+        # Quota check, eviction and insert in one write transaction, so concurrent saves cannot overshoot
+        with self.db.transaction() as conn:
+            excess = conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM artifacts').fetchone()[0] + size - self.quota_bytes
+            if excess > 0:
+                for victim, victim_bytes in conn.execute(
+                    'SELECT id, bytes FROM artifacts ORDER BY expires > ?, last_access', (now,)
+                ):
+                    evicted.append(victim)
+                    excess -= victim_bytes
+                    if excess <= 0:
+                        break
+                conn.executemany('DELETE FROM artifacts WHERE id = ?', [(victim,) for victim in evicted])
+            conn.execute('INSERT INTO artifacts (id, bytes, expires, last_access) VALUES (?, ?, ?, ?)',
+                         (artifact_id, size, expires, now))
+        return evicted
+
+    def _forget(self, artifact_id: str) -> bool:
+        return self.db.execute('DELETE FROM artifacts WHERE id = ?', (artifact_id,)).rowcount > 0
+
+    def _pop_expired(self) -> List[str]:
+        now = time.time()
+        with self.db.transaction() as conn:
+            expired = [row[0] for row in conn.execute('SELECT id FROM artifacts WHERE expires <= ?', (now,))]
+            if expired:
+                conn.execute('DELETE FROM artifacts WHERE expires <= ?', (now,))
+        return expired
+
+    def touch(self, artifact_id: str):
+        self.db.execute('UPDATE artifacts SET last_access = ? WHERE id = ?', (time.time(), artifact_id))
+
+    def usage(self) -> Tuple[int, int]:
+        return tuple(self.db.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM artifacts').fetchone())
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM artifacts').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+    def sweep_orphans(self) -> int:
+        """Delete directories under the root that no artifact owns (left by a crash); returns how many"""
+        # Directories this young may belong to a save in progress in another worker
+        cutoff = time.time() - 60
+        indexed = {row[0] for row in self.db.execute('SELECT id FROM artifacts')}
+        swept = 0
+        for entry in os.scandir(self.root):
+            if (entry.is_dir(follow_symlinks=False) and entry.name not in indexed
+                    and entry.stat(follow_symlinks=False).st_mtime < cutoff):
+                try:
+                    self._remove_directory(entry.name)
+                except ValueError:
+                    continue
+                swept += 1
+        if swept:
+            logger.info(f"Removed {swept} orphaned artifact directories from {self.root}")
+        return swept
+
+class MemoryArtifactStore(ArtifactStoreInterface):
+    """Artifact store indexed per process, for serverless platforms without a shared state database"""
+
+    def __init__(self, root: str, quota_bytes: int):
+        super().__init__(root, quota_bytes)
+        # artifact id -> [bytes, expires, last_access]
+        self._entries: Dict[str, List] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, artifact_id: str, size: int, expires: float) -> List[str]:
+        now = time.time()
+        evicted = []
+        with self._lock:
+            excess = self._bytes + size - self.quota_bytes
+            if excess > 0:
+                for victim in sorted(self._entries, key=lambda i: (self._entries[i][1] > now, self._entries[i][2])):
+                    evicted.append(victim)
+                    excess -= self._entries[victim][0]
+                    if excess <= 0:
+                        break
+                for victim in evicted:
+                    self._bytes -= self._entries.pop(victim)[0]
+            self._entries[artifact_id] = [size, expires, now]
+            self._bytes += size
+        return evicted
+
+    def _forget(self, artifact_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(artifact_id, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+        return entry is not None
+
+    def _pop_expired(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            expired = [artifact_id for artifact_id, entry in self._entries.items() if entry[1] <= now]
+            for artifact_id in expired:
+                self._bytes -= self._entries.pop(artifact_id)[0]
+        return expired
+
+    def touch(self, artifact_id: str):
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            if entry is not None:
+                entry[2] = time.time()
+
+    def usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._entries:
+                return None
+            return datetime.fromtimestamp(min(entry[1] for entry in self._entries.values()))
+
+class ArtifactStoreFactory:
+    """Factory for creating artifact stores"""
+
+    @staticmethod
+    def create_store(config) -> ArtifactStoreInterface:
+        """Create a store whose index matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            store = SQLiteArtifactStore(config['STATE_DB_PATH'], config['ARTIFACT_STORE_DIR'],
+                                        config['ARTIFACT_STORE_QUOTA_BYTES'])
+            store.sweep_orphans()
+            return store
+        return MemoryArtifactStore(config['ARTIFACT_STORE_DIR'], config['ARTIFACT_STORE_QUOTA_BYTES'])
@@ -0,0 +1,257 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+import bisect
+import logging
+import threading
+import json
+import time
+import os
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Inventory entries are dicts with these keys; times are Unix timestamps
+ENTRY_FIELDS = ('fingerprint', 'serial', 'subject', 'issuer', 'names', 'not_before', 'not_after', 'added', 'file_id')
+
+def normalize_name(name: str) -> str:
+    return name.strip().rstrip('.').lower()
+
+def reverse_name(name: str) -> str:
+    """'api.foo.com' -> 'com.foo.api', so every name under a domain shares a sortable prefix"""
+    return '.'.join(reversed(normalize_name(name).split('.')))
+
+def covering_names(hostname: str) -> List[str]:
+    """Names a certificate must carry to cover hostname: itself or a wildcard one label up"""
+    hostname = normalize_name(hostname)
+    names = [hostname]
+    labels = hostname.split('.')
+    if len(labels) > 2 and labels[0] != '*':
+        names.append('*.' + '.'.join(labels[1:]))
+    return names
+
+class CertificateInventoryInterface(ABC):
+    """Abstract interface for the inventory of issued certificates.
+
+    Certificates are indexed by every SAN (an inverted index, so a hostname
+    lookup touches only the certificates that name it or its wildcard) and
+    by expiry.
+    """
+
+    @abstractmethod
+    def add_many(self, entries: Iterable[Dict]) -> int:
+        """Record certificates (see ENTRY_FIELDS), ignoring ones already present; returns how many were new"""
+        pass
+
+    def add(self, entry: Dict) -> bool:
+        """Record one certificate; returns whether it was new"""
+        return self.add_many([entry]) == 1
+
+    @abstractmethod
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """Return the certificate with this SHA-256 fingerprint"""
+        pass
+
+    @abstractmethod
+    def covering(self, hostname: str, valid_at: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """Return certificates whose SANs cover hostname (exactly or by wildcard), latest expiry first"""
+        pass
+
+    @abstractmethod
+    def under(self, domain: str, limit: int = 100) -> List[Dict]:
+        """Return certificates naming domain or any name below it, latest expiry first"""
+        pass
+
+    @abstractmethod
+    def expiring(self, before: float, after: Optional[float] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Return certificates expiring in [after, before), soonest first; after defaults to now"""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Return the number of certificates in the inventory"""
+        pass
+
+class SQLiteCertificateInventory(CertificateInventoryInterface):
+    """Inventory in the shared state database; the SAN index is a covering (name, certificate) table"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inventory_certificates (
+            id INTEGER PRIMARY KEY,
+            fingerprint TEXT NOT NULL UNIQUE,
+            serial TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            issuer TEXT NOT NULL,
+            names TEXT NOT NULL,
+            not_before REAL NOT NULL,
+            not_after REAL NOT NULL,
+            added REAL NOT NULL,
+            file_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS inventory_certificates_not_after ON inventory_certificates (not_after);
+        CREATE TABLE IF NOT EXISTS inventory_names (
+            rname TEXT NOT NULL,
+            certificate_id INTEGER NOT NULL,
+            PRIMARY KEY (rname, certificate_id)
+        ) WITHOUT ROWID;
+    """
+
+    COLUMNS = ', '.join(f'c.{field}' for field in ENTRY_FIELDS)
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def add_many(self, entries: Iterable[Dict]) -> int:
+        added = 0
+        now = time.time()
+        with self.db.transaction() as conn:
+            for entry in entries:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO inventory_certificates '
+                    '(fingerprint, serial, subject, issuer, names, not_before, not_after, added, file_id) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (entry['fingerprint'], entry['serial'], entry['subject'], entry['issuer'],
+                     json.dumps(entry['names']), entry['not_before'], entry['not_after'],
+                     entry.get('added') or now, entry.get('file_id'))
+                )
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                conn.executemany(
+                    'INSERT OR IGNORE INTO inventory_names (rname, certificate_id) VALUES (?, ?)',
+                    [(reverse_name(name), cursor.lastrowid) for name in entry['names']]
+                )
+        return added
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        row = self.db.execute(
+            f'SELECT {self.COLUMNS} FROM inventory_certificates c WHERE c.fingerprint = ?', (fingerprint.lower(),)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def covering(self, hostname: str, valid_at: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        rnames = [reverse_name(name) for name in covering_names(hostname)]
+        sql = (f'SELECT DISTINCT {self.COLUMNS} FROM inventory_names n '
+               'JOIN inventory_certificates c ON c.id = n.certificate_id '
+               f'WHERE n.rname IN ({", ".join("?" * len(rnames))})')
+        params = list(rnames)
+        if valid_at is not None:
+            sql += ' AND c.not_before <= ? AND c.not_after > ?'
+            params += [valid_at, valid_at]
+        rows = self.db.execute(sql + ' ORDER BY c.not_after DESC LIMIT ?', params + [limit]).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def under(self, domain: str, limit: int = 100) -> List[Dict]:
+        prefix = reverse_name(domain)
+        # '/' sorts right after '.', so the range holds exactly the names below the domain
+        rows = self.db.execute(
+            f'SELECT DISTINCT {self.COLUMNS} FROM inventory_names n '
+            'JOIN inventory_certificates c ON c.id = n.certificate_id '
+            'WHERE n.rname = ? OR (n.rname >= ? AND n.rname < ?) ORDER BY c.not_after DESC LIMIT ?',
+            (prefix, prefix + '.', prefix + '/', limit)
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def expiring(self, before: float, after: Optional[float] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+        rows = self.db.execute(
+            f'SELECT {self.COLUMNS} FROM inventory_certificates c WHERE c.not_after >= ? AND c.not_after < ? '
+            'ORDER BY c.not_after LIMIT ? OFFSET ?',
+            (time.time() if after is None else after, before, limit, offset)
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def count(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM inventory_certificates').fetchone()[0]
+
+    @staticmethod
+    def _entry(row) -> Dict:
+        entry = dict(zip(ENTRY_FIELDS, row))
+        entry['names'] = json.loads(entry['names'])
+        return entry
+
+class MemoryCertificateInventory(CertificateInventoryInterface):
+    """Per-process inventory for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        # reversed name -> fingerprints, plus the sorted reversed names for domain range scans
+        self._names: Dict[str, set] = {}
+        self._sorted_names: List[str] = []
+        self._expiry: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def add_many(self, entries: Iterable[Dict]) -> int:
+        added = 0
+        now = time.time()
+        with self._lock:
+            for entry in entries:
+                if entry['fingerprint'] in self._entries:
+                    continue
+                entry = {field: entry.get(field) for field in ENTRY_FIELDS}
+                entry['added'] = entry['added'] or now
+                self._entries[entry['fingerprint']] = entry
+                for name in entry['names']:
+                    rname = reverse_name(name)
+                    if rname not in self._names:
+                        self._names[rname] = set()
+                        self._sorted_names.append(rname)
+                    self._names[rname].add(entry['fingerprint'])
+                self._expiry.append((entry['not_after'], entry['fingerprint']))
+                added += 1
+            if added:
+                # Timsort merges the appended run in linear time, so bulk loads avoid per-item insort
+                self._sorted_names.sort()
+                self._expiry.sort()
+        return added
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(fingerprint.lower())
+        return dict(entry) if entry else None
+
+    def _by_expiry_desc(self, fingerprints, limit: int) -> List[Dict]:
+        entries = sorted((self._entries[fp] for fp in fingerprints), key=lambda e: e['not_after'], reverse=True)
+        return [dict(entry) for entry in entries[:limit]]
+
+    def covering(self, hostname: str, valid_at: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            fingerprints = set()
+            for name in covering_names(hostname):
+                fingerprints |= self._names.get(reverse_name(name), set())
+            if valid_at is not None:
+                fingerprints = {fp for fp in fingerprints
+                                if self._entries[fp]['not_before'] <= valid_at < self._entries[fp]['not_after']}
+            return self._by_expiry_desc(fingerprints, limit)
+
+    def under(self, domain: str, limit: int = 100) -> List[Dict]:
+        prefix = reverse_name(domain)
+        with self._lock:
+            fingerprints = set(self._names.get(prefix, ()))
+            start = bisect.bisect_left(self._sorted_names, prefix + '.')
+            end = bisect.bisect_left(self._sorted_names, prefix + '/')
+            for rname in self._sorted_names[start:end]:
+                fingerprints |= self._names[rname]
+            return self._by_expiry_desc(fingerprints, limit)
+
+    def expiring(self, before: float, after: Optional[float] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+        after = time.time() if after is None else after
+        with self._lock:
+            start = bisect.bisect_left(self._expiry, (after,))
+            end = bisect.bisect_left(self._expiry, (before,))
+            selected = self._expiry[start:end][offset:offset + limit]
+            return [dict(self._entries[fp]) for _, fp in selected]
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class CertificateInventoryFactory:
+    """Factory for creating certificate inventories"""
+
+    @staticmethod
+    def create_inventory(config) -> CertificateInventoryInterface:
+        """Create an inventory that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteCertificateInventory(config['STATE_DB_PATH'])
+        return MemoryCertificateInventory()
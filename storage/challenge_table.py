@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import logging
+from datetime import datetime
+import threading
+import time
+import os
+
+from .database import get_database
+from .session_records import ChallengeRecord
+
+logger = logging.getLogger(__name__)
+
+class ChallengeTableInterface(ABC):
+    """Abstract interface for ACME challenges indexed by (request_id, domain)"""
+
+    @abstractmethod
+    def put_many(self, request_id: str, challenges: List[Dict], expires: datetime):
+        """Store all challenges of one request"""
+        pass
+
+    @abstractmethod
+    def get(self, request_id: str, domain: str) -> Optional[Dict]:
+        """Return the challenge for one domain of a request"""
+        pass
+
+    @abstractmethod
+    def list(self, request_id: str) -> List[Dict]:
+        """Return every challenge of a request in insertion order"""
+        pass
+
+    @abstractmethod
+    def key_authorization(self, token: str, domain: str) -> Optional[str]:
+        """Return the key authorization of a live HTTP-01 token issued for domain (token index lookup)"""
+        pass
+
+    @abstractmethod
+    def delete(self, request_id: str) -> int:
+        """Remove a request's challenges, returning how many were removed"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove expired challenges, returning how many were removed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any stored challenge"""
+        pass
+
+class SQLiteChallengeTable(ChallengeTableInterface):
+    """Challenge table stored next to the sessions in the shared state database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS challenges (
+            request_id TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            type TEXT NOT NULL,
+            token TEXT NOT NULL,
+            url TEXT NOT NULL,
+            key_authorization TEXT NOT NULL,
+            expires REAL NOT NULL,
+            PRIMARY KEY (request_id, domain)
+        );
+        CREATE INDEX IF NOT EXISTS challenges_token ON challenges (token);
+        CREATE INDEX IF NOT EXISTS challenges_expires ON challenges (expires);
+    """
+
+    COLUMNS = 'domain, type, token, url, key_authorization'
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def put_many(self, request_id: str, challenges: List[Dict], expires: datetime):
+        rows = []
+        for challenge in challenges:
+            record = ChallengeRecord.from_dict(challenge)
+            rows.append((request_id, record.domain, record.type, record.token, record.url,
+                         record.key_authorization, expires.timestamp()))
+        with self.db.transaction() as conn:
+            conn.executemany(
+                f'INSERT OR REPLACE INTO challenges (request_id, {self.COLUMNS}, expires) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+            )
+
+    def get(self, request_id: str, domain: str) -> Optional[Dict]:
+        row = self.db.execute(
+            f'SELECT {self.COLUMNS} FROM challenges WHERE request_id = ? AND domain = ? AND expires > ?',
+            (request_id, domain, time.time())
+        ).fetchone()
+        return ChallengeRecord(*row).to_dict() if row else None
+
+    def list(self, request_id: str) -> List[Dict]:
+        rows = self.db.execute(
+            f'SELECT {self.COLUMNS} FROM challenges WHERE request_id = ? AND expires > ? ORDER BY rowid',
+            (request_id, time.time())
+        ).fetchall()
+        return [ChallengeRecord(*row).to_dict() for row in rows]
+
+    def key_authorization(self, token: str, domain: str) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT key_authorization FROM challenges WHERE token = ? AND domain = ? AND type = 'http-01' "
+            'AND expires > ?', (token, domain, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, request_id: str) -> int:
+        return self.db.execute('DELETE FROM challenges WHERE request_id = ?', (request_id,)).rowcount
+
+    def purge_expired(self) -> int:
+        return self.db.execute('DELETE FROM challenges WHERE expires <= ?', (time.time(),)).rowcount
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM challenges').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+class MemoryChallengeTable(ChallengeTableInterface):
+    """Per-process challenge table for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        self._requests = {}
+        # token -> request_id, so HTTP-01 lookups don't scan every request
+        self._tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def put_many(self, request_id: str, challenges: List[Dict], expires: datetime):
+        records = {c['domain']: ChallengeRecord.from_dict(c) for c in challenges}
+        with self._lock:
+            self._unindex(self._requests.get(request_id))
+            self._requests[request_id] = (records, expires)
+            for record in records.values():
+                self._tokens[record.token] = request_id
+
+    def _unindex(self, entry):
+        if entry is not None:
+            for record in entry[0].values():
+                self._tokens.pop(record.token, None)
+
+    def _records(self, request_id: str) -> Dict[str, ChallengeRecord]:
+        with self._lock:
+            entry = self._requests.get(request_id)
+        if entry is None or entry[1] <= datetime.now():
+            return {}
+        return entry[0]
+
+    def get(self, request_id: str, domain: str) -> Optional[Dict]:
+        record = self._records(request_id).get(domain)
+        return record.to_dict() if record else None
+
+    def list(self, request_id: str) -> List[Dict]:
+        return [record.to_dict() for record in self._records(request_id).values()]
+
+    def key_authorization(self, token: str, domain: str) -> Optional[str]:
+        with self._lock:
+            request_id = self._tokens.get(token)
+        record = self._records(request_id).get(domain) if request_id is not None else None
+        if record is None or record.token != token or record.type != 'http-01':
+            return None
+        return record.key_authorization
+
+    def delete(self, request_id: str) -> int:
+        with self._lock:
+            entry = self._requests.pop(request_id, None)
+            self._unindex(entry)
+        return len(entry[0]) if entry else 0
+
+    def purge_expired(self) -> int:
+        current_time = datetime.now()
+        with self._lock:
+            expired = [k for k, (_, expires) in self._requests.items() if expires <= current_time]
+            removed = 0
+            for key in expired:
+                entry = self._requests.pop(key)
+                self._unindex(entry)
+                removed += len(entry[0])
+            return removed
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            return min((expires for _, expires in self._requests.values()), default=None)
+
+class ChallengeTableFactory:
+    """Factory for creating challenge tables"""
+
+    @staticmethod
+    def create_table(config) -> ChallengeTableInterface:
+        """Create a table that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteChallengeTable(config['STATE_DB_PATH'])
+        return MemoryChallengeTable()
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class SQLiteDatabase:
+    """Shared SQLite database in WAL mode, safe across threads and worker processes of one host.
+
+    WAL relies on a shared-memory index beside the file, so the database must
+    be on a local disk; it is not safe on NFS/SMB or other volumes mounted by
+    several nodes.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Execute a single statement in autocommit mode"""
+        return self.connection().execute(sql, params)
+
+    def executescript(self, script: str):
+        """Execute a multi-statement script (used for schema creation)"""
+        self.connection().executescript(script)
+
+    @contextmanager
+    def transaction(self):
+        """Run a block inside a write transaction that other workers cannot interleave with"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+_databases: Dict[str, SQLiteDatabase] = {}
+_databases_lock = threading.Lock()
+
+def get_database(path: str) -> SQLiteDatabase:
+    """Return the shared database object for a path so stores can share connections"""
+    key = os.path.abspath(path)
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = SQLiteDatabase(key)
+        return _databases[key]
@@ -0,0 +1,154 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import logging
+from datetime import datetime
+import threading
+import secrets
+import pickle
+import heapq
+import time
+import os
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+def new_download_id() -> str:
+    """Return a random, unguessable download identifier"""
+    return secrets.token_urlsafe(16)
+
+class DownloadRegistryInterface(ABC):
+    """Abstract interface for the registry of downloadable certificate files"""
+
+    @abstractmethod
+    def register(self, file_info: Dict) -> str:
+        """Store a download entry and return its new random file id"""
+        pass
+
+    @abstractmethod
+    def get(self, file_id: str) -> Optional[Dict]:
+        """Return the download entry for file_id, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    def delete(self, file_id: str) -> Optional[Dict]:
+        """Remove a download entry, returning it if it existed"""
+        pass
+
+    @abstractmethod
+    def pop_expired(self) -> List[Dict]:
+        """Remove and return all expired entries so their files can be deleted"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any registered entry"""
+        pass
+
+class SQLiteDownloadRegistry(DownloadRegistryInterface):
+    """Download registry shared by every worker on the host using the same database file.
+
+    Single host only: SQLite's WAL locking needs shared memory, so the file
+    must not live on a network or shared volume used by several nodes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS downloads (
+            file_id TEXT PRIMARY KEY,
+            file_info BLOB NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS downloads_expires ON downloads (expires);
+    """
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def register(self, file_info: Dict) -> str:
+        file_id = new_download_id()
+        self.db.execute(
+            'INSERT INTO downloads (file_id, file_info, expires) VALUES (?, ?, ?)',
+            (file_id, pickle.dumps(file_info, protocol=pickle.HIGHEST_PROTOCOL), file_info['expires'].timestamp())
+        )
+        return file_id
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        row = self.db.execute(
+            'SELECT file_info FROM downloads WHERE file_id = ? AND expires > ?', (file_id, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def delete(self, file_id: str) -> Optional[Dict]:
+        with self.db.transaction() as conn:
+            row = conn.execute('SELECT file_info FROM downloads WHERE file_id = ?', (file_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM downloads WHERE file_id = ?', (file_id,))
+        return pickle.loads(row[0])
+
+    def pop_expired(self) -> List[Dict]:
+        now = time.time()
+        # Select and delete in one write transaction so two workers never reap the same entry
+        with self.db.transaction() as conn:
+            rows = conn.execute('SELECT file_info FROM downloads WHERE expires <= ?', (now,)).fetchall()
+            if rows:
+                conn.execute('DELETE FROM downloads WHERE expires <= ?', (now,))
+        return [pickle.loads(row[0]) for row in rows]
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM downloads').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+class MemoryDownloadRegistry(DownloadRegistryInterface):
+    """Per-process download registry for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        self._entries = {}
+        # Min-heap of (expires, file_id) so reaping only touches entries that are due
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def register(self, file_info: Dict) -> str:
+        file_id = new_download_id()
+        with self._lock:
+            self._entries[file_id] = file_info
+            heapq.heappush(self._expiry, (file_info['expires'], file_id))
+        return file_id
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        with self._lock:
+            file_info = self._entries.get(file_id)
+        if file_info is None or datetime.now() >= file_info['expires']:
+            return None
+        return file_info
+
+    def delete(self, file_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.pop(file_id, None)
+
+    def pop_expired(self) -> List[Dict]:
+        current_time = datetime.now()
+        expired = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= current_time:
+                _, file_id = heapq.heappop(self._expiry)
+                # Entries deleted early leave stale heap items behind; skip them
+                file_info = self._entries.pop(file_id, None)
+                if file_info is not None:
+                    expired.append(file_info)
+        return expired
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            return self._expiry[0][0] if self._expiry else None
+
+class DownloadRegistryFactory:
+    """Factory for creating download registries"""
+
+    @staticmethod
+    def create_registry(config) -> DownloadRegistryInterface:
+        """Create a registry that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteDownloadRegistry(config['STATE_DB_PATH'])
+        return MemoryDownloadRegistry()
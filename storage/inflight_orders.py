@@ -0,0 +1,189 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+from datetime import datetime
+import threading
+import time
+import os
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+def order_key(client: str, domains: List[str], email: str, validation_method: str, ca: str = '') -> str:
+    """Canonical key of one client's issuance request: the same names in any order or case give the same key.
+
+    client must be a secret bound to the submitter (e.g. a random id in its
+    signed session cookie): joining an order hands out its request_id, which
+    is all /verify_challenges needs, so other clients must never share a key.
+    """
+    names = ','.join(sorted({domain.strip().rstrip('.').lower() for domain in domains}))
+    canonical = '\n'.join((client, names, email.strip().lower(), validation_method, ca))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class InflightOrdersInterface(ABC):
+    """Abstract interface for single-flight coalescing of identical issuance requests.
+
+    The first request for a key claims it and creates the ACME order; requests
+    arriving meanwhile wait for the order's request_id and attach to it
+    instead of creating competing orders. A claim that is never published
+    (the leader crashed) lapses after its lease.
+    """
+
+    @abstractmethod
+    def claim(self, key: str, lease: float) -> Tuple[bool, Optional[str]]:
+        """Try to lead key: (True, None) if claimed, else (False, published request_id or None while pending)"""
+        pass
+
+    @abstractmethod
+    def publish(self, key: str, request_id: str, expires: datetime):
+        """Record the leader's order so later duplicates attach to it until it expires"""
+        pass
+
+    @abstractmethod
+    def release(self, key: str):
+        """Give up an unpublished claim (the order could not be created) so a waiter can lead"""
+        pass
+
+    @abstractmethod
+    def take_over(self, key: str, request_id: str, lease: float) -> bool:
+        """Claim key again if it still points at request_id (e.g. that order has finished)"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove lapsed claims and expired orders, returning how many were removed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any entry"""
+        pass
+
+    def join(self, key: str, lease: float, timeout: float, poll_interval: float = 0.05) -> Tuple[bool, Optional[str]]:
+        """Claim key or wait up to timeout for its leader to publish.
+
+        Returns (True, None) when the caller must create the order,
+        (False, request_id) to attach to the leader's order, or (False, None)
+        if the leader did not publish in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            leader, request_id = self.claim(key, lease)
+            if leader or request_id is not None:
+                return leader, request_id
+            if time.monotonic() >= deadline:
+                return False, None
+            time.sleep(poll_interval)
+
+class SQLiteInflightOrders(InflightOrdersInterface):
+    """In-flight orders shared by every worker through the state database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inflight_orders (
+            key TEXT PRIMARY KEY,
+            request_id TEXT,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS inflight_orders_expires ON inflight_orders (expires);
+    """
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def claim(self, key: str, lease: float) -> Tuple[bool, Optional[str]]:
+        now = time.time()
+        # One statement, so exactly one worker wins a new or lapsed key
+        claimed = self.db.execute(
+            'INSERT INTO inflight_orders (key, request_id, expires) VALUES (?, NULL, ?) '
+            'ON CONFLICT (key) DO UPDATE SET request_id = NULL, expires = excluded.expires '
+            'WHERE inflight_orders.expires <= ?',
+            (key, now + lease, now)
+        ).rowcount
+        if claimed:
+            return True, None
+        row = self.db.execute('SELECT request_id FROM inflight_orders WHERE key = ?', (key,)).fetchone()
+        return False, row[0] if row else None
+
+    def publish(self, key: str, request_id: str, expires: datetime):
+        self.db.execute(
+            'UPDATE inflight_orders SET request_id = ?, expires = ? WHERE key = ?',
+            (request_id, expires.timestamp(), key)
+        )
+
+    def release(self, key: str):
+        self.db.execute('DELETE FROM inflight_orders WHERE key = ? AND request_id IS NULL', (key,))
+
+    def take_over(self, key: str, request_id: str, lease: float) -> bool:
+        return self.db.execute(
+            'UPDATE inflight_orders SET request_id = NULL, expires = ? WHERE key = ? AND request_id = ?',
+            (time.time() + lease, key, request_id)
+        ).rowcount > 0
+
+    def purge_expired(self) -> int:
+        return self.db.execute('DELETE FROM inflight_orders WHERE expires <= ?', (time.time(),)).rowcount
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM inflight_orders').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+class MemoryInflightOrders(InflightOrdersInterface):
+    """Per-process in-flight orders for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        # key -> [request_id or None, expires timestamp]
+        self._entries: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, lease: float) -> Tuple[bool, Optional[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self._entries[key] = [None, now + lease]
+                return True, None
+            return False, entry[0]
+
+    def publish(self, key: str, request_id: str, expires: datetime):
+        with self._lock:
+            self._entries[key] = [request_id, expires.timestamp()]
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is None:
+                del self._entries[key]
+
+    def take_over(self, key: str, request_id: str, lease: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != request_id:
+                return False
+            self._entries[key] = [None, time.time() + lease]
+            return True
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires) in self._entries.items() if expires <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._entries:
+                return None
+            return datetime.fromtimestamp(min(expires for _, expires in self._entries.values()))
+
+class InflightOrdersFactory:
+    """Factory for creating in-flight order tables"""
+
+    @staticmethod
+    def create_table(config) -> InflightOrdersInterface:
+        """Create a table that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteInflightOrders(config['STATE_DB_PATH'])
+        return MemoryInflightOrders()
@@ -0,0 +1,214 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import logging
+from datetime import datetime
+import threading
+import time
+import os
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+class OCSPCacheInterface(ABC):
+    """Abstract interface for cached OCSP responses of issued certificates.
+
+    Entries are keyed by '<issuer key hash>/<serial>' (both hex) and hold the
+    certificate chain, the responder URL and the latest DER response. Times
+    are Unix timestamps. An entry expires with its certificate.
+    """
+
+    @abstractmethod
+    def put_certificate(self, key: str, chain_pem: bytes, responder_url: str, expires: float):
+        """Register a certificate for stapling; its response is fetched on the next refresh"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the entry for key, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    def store_response(self, key: str, response: bytes, this_update: float, next_update: float,
+                       refresh_at: float):
+        """Store a fetched DER response and when it should be refreshed"""
+        pass
+
+    @abstractmethod
+    def schedule_refresh(self, key: str, refresh_at: float):
+        """Move the next refresh of an entry, e.g. to back off after a failed fetch"""
+        pass
+
+    @abstractmethod
+    def claim_due(self, now: float, lease: float, limit: int = 100) -> List[Dict]:
+        """Claim unexpired entries whose refresh time has passed, most overdue first.
+
+        Each claimed entry's refresh is pushed to now + lease before it is
+        returned, so concurrent callers (other workers) never get the same
+        entry; if the claimant dies, the entry is due again after the lease.
+        """
+        pass
+
+    @abstractmethod
+    def next_refresh(self) -> Optional[datetime]:
+        """Return the earliest scheduled refresh of any entry"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove entries whose certificate has expired, returning how many were removed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any stored entry"""
+        pass
+
+class SQLiteOCSPCache(OCSPCacheInterface):
+    """OCSP cache shared by every worker, so each response is fetched once per host"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ocsp_responses (
+            key TEXT PRIMARY KEY,
+            chain_pem BLOB NOT NULL,
+            responder_url TEXT NOT NULL,
+            response BLOB,
+            this_update REAL,
+            next_update REAL,
+            refresh_at REAL NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ocsp_responses_refresh_at ON ocsp_responses (refresh_at);
+        CREATE INDEX IF NOT EXISTS ocsp_responses_expires ON ocsp_responses (expires);
+    """
+
+    COLUMNS = 'key, chain_pem, responder_url, response, this_update, next_update, refresh_at, expires'
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def put_certificate(self, key: str, chain_pem: bytes, responder_url: str, expires: float):
+        # Keep an already fetched response if the same certificate is registered again
+        self.db.execute(
+            'INSERT INTO ocsp_responses (key, chain_pem, responder_url, refresh_at, expires) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'chain_pem = excluded.chain_pem, responder_url = excluded.responder_url, expires = excluded.expires',
+            (key, chain_pem, responder_url, time.time(), expires)
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.execute(
+            f'SELECT {self.COLUMNS} FROM ocsp_responses WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return dict(zip(self.COLUMNS.split(', '), row)) if row else None
+
+    def store_response(self, key: str, response: bytes, this_update: float, next_update: float,
+                       refresh_at: float):
+        self.db.execute(
+            'UPDATE ocsp_responses SET response = ?, this_update = ?, next_update = ?, refresh_at = ? WHERE key = ?',
+            (response, this_update, next_update, refresh_at, key)
+        )
+
+    def schedule_refresh(self, key: str, refresh_at: float):
+        self.db.execute('UPDATE ocsp_responses SET refresh_at = ? WHERE key = ?', (refresh_at, key))
+
+    def claim_due(self, now: float, lease: float, limit: int = 100) -> List[Dict]:
+        # Select and reschedule in one write transaction so two workers never claim the same entry
+        with self.db.transaction() as conn:
+            rows = conn.execute(
+                f'SELECT {self.COLUMNS} FROM ocsp_responses WHERE refresh_at <= ? AND expires > ? '
+                'ORDER BY refresh_at LIMIT ?',
+                (now, now, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany('UPDATE ocsp_responses SET refresh_at = ? WHERE key = ?',
+                                 [(now + lease, row[0]) for row in rows])
+        return [dict(zip(self.COLUMNS.split(', '), row), refresh_at=now + lease) for row in rows]
+
+    def next_refresh(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(refresh_at) FROM ocsp_responses').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+    def purge_expired(self) -> int:
+        return self.db.execute('DELETE FROM ocsp_responses WHERE expires <= ?', (time.time(),)).rowcount
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM ocsp_responses').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+class MemoryOCSPCache(OCSPCacheInterface):
+    """Per-process OCSP cache for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def put_certificate(self, key: str, chain_pem: bytes, responder_url: str, expires: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'key': key, 'response': None, 'this_update': None, 'next_update': None,
+                    'refresh_at': time.time()
+                }
+            entry.update(chain_pem=chain_pem, responder_url=responder_url, expires=expires)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] <= time.time():
+                return None
+            return dict(entry)
+
+    def store_response(self, key: str, response: bytes, this_update: float, next_update: float,
+                       refresh_at: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.update(response=response, this_update=this_update, next_update=next_update,
+                             refresh_at=refresh_at)
+
+    def schedule_refresh(self, key: str, refresh_at: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['refresh_at'] = refresh_at
+
+    def claim_due(self, now: float, lease: float, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            due = [entry for entry in self._entries.values() if entry['refresh_at'] <= now < entry['expires']]
+            due.sort(key=lambda entry: entry['refresh_at'])
+            for entry in due[:limit]:
+                entry['refresh_at'] = now + lease
+            return [dict(entry) for entry in due[:limit]]
+
+    def next_refresh(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._entries:
+                return None
+            return datetime.fromtimestamp(min(entry['refresh_at'] for entry in self._entries.values()))
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry['expires'] <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._entries:
+                return None
+            return datetime.fromtimestamp(min(entry['expires'] for entry in self._entries.values()))
+
+class OCSPCacheFactory:
+    """Factory for creating OCSP response caches"""
+
+    @staticmethod
+    def create_cache(config) -> OCSPCacheInterface:
+        """Create a cache that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteOCSPCache(config['STATE_DB_PATH'])
+        return MemoryOCSPCache()
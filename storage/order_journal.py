@@ -0,0 +1,305 @@
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from datetime import datetime
+import threading
+import logging
+import fcntl
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Order state transitions, in the order an issuance goes through them
+ORDER_EVENTS = (
+    'order_created', 'challenge_signalled', 'challenge_valid', 'challenge_invalid',
+    'finalizing', 'certificate_downloaded', 'failed'
+)
+TERMINAL_EVENTS = frozenset({'certificate_downloaded', 'failed'})
+
+class OrderState:
+    """Latest journaled state of one order, folded from its records"""
+
+    __slots__ = ('request_id', 'step', 'domains', 'challenges', 'file_id', 'created', 'updated')
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.step = None
+        self.domains: List[str] = []
+        # domain -> last challenge event
+        self.challenges: Dict[str, str] = {}
+        self.file_id = None
+        self.created = None
+        self.updated = None
+
+    @property
+    def terminal(self) -> bool:
+        return self.step in TERMINAL_EVENTS
+
+    def apply(self, record: Dict):
+        event = record['event']
+        self.step = event
+        self.updated = record['ts']
+        if event == 'order_created':
+            self.created = record['ts']
+            self.domains = record.get('domains', [])
+        elif event.startswith('challenge_') and record.get('domain'):
+            self.challenges[record['domain']] = event
+        elif event == 'certificate_downloaded':
+            self.file_id = record.get('file_id')
+
+class _Batch:
+    """Records written and fsynced together; its appenders wait on it"""
+
+    __slots__ = ('lines', 'done', 'error')
+
+    def __init__(self):
+        self.lines: List[bytes] = []
+        self.done = False
+        self.error: Optional[OSError] = None
+
+class OrderJournal:
+    """Append-only, fsynced log of order state transitions, shared by all workers on a host.
+
+    Records are JSON lines. append() blocks until its record is on disk;
+    concurrent appends are written and fsynced together by one flusher
+    thread (group commit), so a burst of transitions costs one fsync.
+    A batch whose write fails is lost, not retried: its durable appenders
+    raise OSError, and later batches are written as usual.
+    Each process folds the log into OrderState objects, reading only the
+    bytes appended since its last lookup.
+    """
+
+    def __init__(self, path: str, fsync_window: float = 0.002, retention: float = 86400.0):
+        self.path = path
+        self.fsync_window = fsync_window
+        self.retention = retention
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._cond = threading.Condition()
+        self._index_lock = threading.Lock()
+        self._stats = {'appended': 0, 'fsyncs': 0}
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        self._batch = _Batch()
+        self._flusher = None
+        self._states: Dict[str, OrderState] = {}
+        self._compaction_due = False
+        self._offset = 0
+        self._inode = None
+        self._terminate_torn_record()
+
+    def _terminate_torn_record(self):
+        """End a record cut short by a crash, so the next append starts on a fresh line"""
+        fd = self._lock_current_file()
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                os.write(fd, b'\n')
+                os.fsync(fd)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def append(self, request_id: str, event: str, durable: bool = True, **data):
+        """Record a transition; with durable, return only once it has been fsynced"""
+        if event not in ORDER_EVENTS:
+            raise ValueError(f"Unknown order event: {event}")
+        record = {'ts': time.time(), 'request_id': request_id, 'event': event, **data}
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._cond:
+            if self._pid != os.getpid():
+                # The flusher thread and buffered records belong to the parent
+                os.close(self._fd)
+                self._reset()
+            batch = self._batch
+            batch.lines.append(line)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='order-journal', daemon=True)
+                self._flusher.start()
+            self._cond.notify_all()
+            while durable and not batch.done:
+                self._cond.wait()
+            if durable and batch.error is not None:
+                raise OSError(f"Order journal write failed, record lost: {batch.error}")
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._batch.lines:
+                    self._cond.wait()
+            # Let concurrent transitions join this batch
+            if self.fsync_window:
+                time.sleep(self.fsync_window)
+            with self._cond:
+                batch, self._batch = self._batch, _Batch()
+            try:
+                # One write per batch under an exclusive lock keeps workers' lines from interleaving
+                fd = self._lock_current_file()
+                try:
+                    os.write(fd, b''.join(batch.lines))
+                    os.fsync(fd)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            except OSError as e:
+                logger.error(f"Order journal write failed, {len(batch.lines)} records lost: {e}")
+                batch.error = e
+            with self._cond:
+                batch.done = True
+                if batch.error is None:
+                    self._stats['appended'] += len(batch.lines)
+                    self._stats['fsyncs'] += 1
+                self._cond.notify_all()
+
+    def _lock_current_file(self) -> int:
+        """Lock the journal for writing, reopening it first if another process compacted it"""
+        while True:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_ino == os.stat(self.path).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def state(self, request_id: str) -> Optional[OrderState]:
+        """Return the latest state of an order, including transitions written by other workers"""
+        with self._index_lock:
+            self._catch_up()
+            return self._states.get(request_id)
+
+    def pending(self) -> List[OrderState]:
+        """Return every order that has not reached a terminal state, oldest update first"""
+        with self._index_lock:
+            self._catch_up()
+            states = [state for state in self._states.values() if not state.terminal]
+        return sorted(states, key=lambda state: state.updated)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+        with self._index_lock:
+            stats['orders'] = len(self._states)
+        return stats
+
+    def _catch_up(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Compacted (replaced) since the last read: fold the new file from the start
+            self._states = {}
+            self._offset = 0
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # A record still being written has no newline yet; leave it for the next read
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping corrupt order journal record")
+                continue
+            state = self._states.get(record['request_id'])
+            if state is None:
+                state = self._states[record['request_id']] = OrderState(record['request_id'])
+            state.apply(record)
+        self._offset += end
+
+    @contextmanager
+    def recovery_lock(self):
+        """Yield True in the one process that holds the recovery lock, False in every other"""
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def reap(self) -> int:
+        """Forget orders that finished longer than `retention` ago; returns how many this process forgot.
+
+        Run periodically in every worker: each prunes its own folded states,
+        and the one that gets recovery_lock() also compacts the file.
+        """
+        cutoff = time.time() - self.retention
+        with self._index_lock:
+            self._catch_up()
+            finished = [rid for rid, state in self._states.items() if state.terminal and state.updated < cutoff]
+            for request_id in finished:
+                del self._states[request_id]
+            self._compaction_due = self._compaction_due or bool(finished)
+            due = self._compaction_due
+        if due:
+            with self.recovery_lock() as acquired:
+                if acquired:
+                    self.compact()
+                    with self._index_lock:
+                        self._compaction_due = False
+        return len(finished)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return when the earliest finished order falls out of retention"""
+        with self._index_lock:
+            updated = min((state.updated for state in self._states.values() if state.terminal), default=None)
+        return datetime.fromtimestamp(updated + self.retention) if updated is not None else None
+
+    def compact(self) -> int:
+        """Drop records of orders that finished longer than `retention` ago; returns how many were dropped.
+
+        Call while holding recovery_lock(). Finished orders are found in the
+        file itself, not in this process's (possibly already pruned) states.
+        Workers notice the replaced file, append to the new one and refold it
+        on their next lookup.
+        """
+        cutoff = time.time() - self.retention
+        temp_path = f"{self.path}.compact"
+        dropped = 0
+        # A separate descriptor, so this process's own flusher is held off too while the file is swapped
+        lock_fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            with open(self.path, 'rb') as source:
+                last = {}
+                for line in source:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    last[record['request_id']] = (record['event'], record['ts'])
+                finished = {rid for rid, (event, ts) in last.items() if event in TERMINAL_EVENTS and ts < cutoff}
+                if not finished:
+                    return 0
+                source.seek(0)
+                with open(temp_path, 'wb') as target:
+                    for line in source:
+                        try:
+                            request_id = json.loads(line)['request_id']
+                        except ValueError:
+                            continue
+                        if request_id in finished:
+                            dropped += 1
+                            continue
+                        target.write(line)
+                    target.flush()
+                    os.fsync(target.fileno())
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+        finally:
+            # Writers blocked on the old file see it was replaced and reopen the path
+            os.close(lock_fd)
+        logger.info(f"Compacted order journal: dropped {dropped} records of {len(finished)} finished orders")
+        return dropped
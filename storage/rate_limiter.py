@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+import logging
+from datetime import datetime
+import threading
+import time
+import re
+import os
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+def parse_limit(limit: str) -> Tuple[int, int]:
+    """Parse a limit such as '50 per hour' or '5/minute' into (amount, period_seconds)"""
+    match = _LIMIT_PATTERN.match(limit)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    return int(match.group(1)), _PERIODS[match.group(2).lower()]
+
+class RateLimiterInterface(ABC):
+    """Abstract interface for token-bucket rate limiters.
+
+    A bucket holds up to `amount` tokens and refills at amount/period per
+    second, so '5 per minute' allows a burst of five and then one request
+    every twelve seconds. A bucket that has refilled completely is
+    equivalent to no bucket at all, which is when it expires.
+    """
+
+    @abstractmethod
+    def consume(self, key: str, amount: int, period: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take cost tokens from the bucket; returns (allowed, seconds until allowed)"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove buckets that have refilled completely and return how many were removed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return when the earliest bucket will have refilled completely"""
+        pass
+
+def _refill(tokens: float, updated: float, now: float, amount: int, rate: float) -> float:
+    return min(float(amount), tokens + max(0.0, now - updated) * rate)
+
+class SQLiteRateLimiter(RateLimiterInterface):
+    """Token buckets shared by every worker on the host through the state database.
+
+    Each check is one short BEGIN IMMEDIATE transaction; in WAL mode with
+    synchronous=NORMAL the commit does not fsync, so checks stay well under
+    a millisecond.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            full_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rate_buckets_full_at ON rate_buckets (full_at);
+    """
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    def consume(self, key: str, amount: int, period: float, cost: float = 1.0) -> Tuple[bool, float]:
+        rate = amount / period
+        with self.db.transaction() as conn:
+            now = time.time()
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, amount, rate) if row else float(amount)
+            if tokens < cost:
+                return False, (cost - tokens) / rate
+            tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (amount - tokens) / rate)
+            )
+        return True, 0.0
+
+    def purge_expired(self) -> int:
+        cursor = self.db.execute('DELETE FROM rate_buckets WHERE full_at <= ?', (time.time(),))
+        return cursor.rowcount
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(full_at) FROM rate_buckets').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+class MemoryRateLimiter(RateLimiterInterface):
+    """Per-process token buckets for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        # key -> (tokens, updated, full_at)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, amount: int, period: float, cost: float = 1.0) -> Tuple[bool, float]:
+        rate = amount / period
+        with self._lock:
+            now = time.time()
+            bucket = self._buckets.get(key)
+            tokens = _refill(bucket[0], bucket[1], now, amount, rate) if bucket else float(amount)
+            if tokens < cost:
+                return False, (cost - tokens) / rate
+            tokens -= cost
+            self._buckets[key] = (tokens, now, now + (amount - tokens) / rate)
+        return True, 0.0
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, bucket in self._buckets.items() if bucket[2] <= now]
+            for key in expired:
+                del self._buckets[key]
+        return len(expired)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._buckets:
+                return None
+            return datetime.fromtimestamp(min(bucket[2] for bucket in self._buckets.values()))
+
+class RateLimiterFactory:
+    """Factory for creating rate limiters"""
+
+    @staticmethod
+    def create_limiter(config) -> RateLimiterInterface:
+        """Create a limiter that matches the configured session store backend"""
+        if config.get('SESSION_STORE', 'sqlite') == 'sqlite' and not os.environ.get('VERCEL'):
+            return SQLiteRateLimiter(config['STATE_DB_PATH'])
+        return MemoryRateLimiter()
@@ -0,0 +1,83 @@
+from typing import Callable, Dict, Optional
+import logging
+from datetime import datetime
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ExpiryReaper:
+    """Background thread that removes expired sessions and download artifacts on a schedule"""
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._tasks = {}
+        self._stats = {'runs': 0, 'last_run': None, 'last_duration_ms': 0.0, 'tasks': {}}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name: str, reap: Callable[[], int],
+                 oldest_expiry: Callable[[], Optional[datetime]]):
+        """Register a reap function and the expiry-index probe used to measure lag"""
+        self._tasks[name] = (reap, oldest_expiry)
+        self._stats['tasks'][name] = {'reaped_total': 0, 'reaped_last_run': 0, 'lag_seconds': 0.0, 'errors': 0}
+
+    def run_once(self) -> Dict[str, int]:
+        """Run every registered task once, returning the number of entries each removed"""
+        started = time.monotonic()
+        reaped = {}
+        for name, (reap, oldest_expiry) in self._tasks.items():
+            try:
+                # Lag is how long the oldest overdue entry has outlived its expiry
+                oldest = oldest_expiry()
+                now = datetime.now()
+                lag = (now - oldest).total_seconds() if oldest is not None and oldest <= now else 0.0
+                count = reap()
+            except Exception as e:
+                logger.error(f"Reaper task {name} failed: {e}", exc_info=True)
+                with self._lock:
+                    self._stats['tasks'][name]['errors'] += 1
+                continue
+
+            reaped[name] = count
+            with self._lock:
+                task_stats = self._stats['tasks'][name]
+                task_stats['reaped_total'] += count
+                task_stats['reaped_last_run'] = count
+                task_stats['lag_seconds'] = round(lag, 3)
+            if count:
+                logger.info(f"Reaper removed {count} expired {name} entries (lag {lag:.1f}s)")
+
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['last_run'] = datetime.now().isoformat()
+            self._stats['last_duration_ms'] = round((time.monotonic() - started) * 1000, 3)
+        return reaped
+
+    def stats(self) -> Dict:
+        """Return a snapshot of reap counts and lag metrics"""
+        with self._lock:
+            return {
+                **self._stats,
+                'interval_seconds': self.interval,
+                'tasks': {name: dict(task) for name, task in self._stats['tasks'].items()}
+            }
+
+    def start(self):
+        """Start the reaper thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='expiry-reaper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Signal the reaper thread to exit and wait for it"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import hashlib
+import base64
+
+class SessionRecord:
+    """Compact ACME session: DER-encoded keys plus only the URLs the verify path needs.
+
+    Keys stay as bytes until client_state() is called, so lookups that only need
+    metadata (templates, housekeeping) never pay for key decoding.
+    """
+
+    __slots__ = (
+        'account_key_der', 'domain_key_der', 'account_url', 'order_url', 'finalize_url',
+        'new_nonce_url', 'nonce', 'base_url', 'domains', 'validation_method', 'cert_type',
+        'staging', 'expires', 'trace_id'
+    )
+
+    def __init__(self, account_key_der: bytes, domain_key_der: bytes, account_url: str, order_url: str,
+                 finalize_url: str, new_nonce_url: str, nonce: Optional[str], base_url: str,
+                 domains: List[str], validation_method: str, cert_type: str, staging: bool,
+                 expires: datetime, trace_id: Optional[str] = None):
+        self.account_key_der = account_key_der
+        self.domain_key_der = domain_key_der
+        self.account_url = account_url
+        self.order_url = order_url
+        self.finalize_url = finalize_url
+        self.new_nonce_url = new_nonce_url
+        self.nonce = nonce
+        self.base_url = base_url
+        self.domains = domains
+        self.validation_method = validation_method
+        self.cert_type = cert_type
+        self.staging = staging
+        self.expires = expires
+        # Trace of the order phase, continued by the verify phase
+        self.trace_id = trace_id
+
+    @classmethod
+    def from_client_state(cls, state: Dict, domains: List[str], validation_method: str,
+                          cert_type: str, staging: bool, expires: datetime,
+                          trace_id: Optional[str] = None) -> 'SessionRecord':
+        """Build a record from RealACMEClient.export_compact_state()"""
+        return cls(
+            account_key_der=state['account_key_der'],
+            domain_key_der=state['domain_key_der'],
+            account_url=state['account_url'],
+            order_url=state['order_url'],
+            finalize_url=state['order_data']['finalize'],
+            new_nonce_url=state['directory']['newNonce'],
+            nonce=state['nonce'],
+            base_url=state['base_url'],
+            domains=domains,
+            validation_method=validation_method,
+            cert_type=cert_type,
+            staging=staging,
+            expires=expires,
+            trace_id=trace_id,
+        )
+
+    def client_state(self) -> Dict:
+        """Return the state dict RealACMEClient.from_state() expects"""
+        return {
+            'account_key_der': self.account_key_der,
+            'domain_key_der': self.domain_key_der,
+            'account_url': self.account_url,
+            'order_url': self.order_url,
+            'order_data': {'finalize': self.finalize_url},
+            'directory': {'newNonce': self.new_nonce_url},
+            'nonce': self.nonce,
+            'base_url': self.base_url,
+        }
+
+    def get(self, name: str, default=None):
+        """Dict-style access for callers written against the old session dicts"""
+        return getattr(self, name, default)
+
+    def __getstate__(self):
+        # A positional tuple pickles smaller than a slot-name mapping
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # Records pickled before trace_id existed are one field short
+        self.trace_id = None
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+class ChallengeRecord:
+    """One ACME challenge; file and DNS record values are derived from the key authorization"""
+
+    __slots__ = ('domain', 'type', 'token', 'url', 'key_authorization')
+
+    def __init__(self, domain: str, type: str, token: str, url: str, key_authorization: str):
+        self.domain = domain
+        self.type = type
+        self.token = token
+        self.url = url
+        self.key_authorization = key_authorization
+
+    @classmethod
+    def from_dict(cls, challenge: Dict) -> 'ChallengeRecord':
+        """Build a record from a challenge dict produced by RealACMEClient.generate_challenges()"""
+        return cls(challenge['domain'], challenge['type'], challenge['token'], challenge['url'],
+                   challenge.get('file_content') or challenge.get('key_authorization'))
+
+    def to_dict(self) -> Dict:
+        """Return the challenge dict used by templates and the ACME client"""
+        challenge = {
+            'type': self.type, 'domain': self.domain, 'token': self.token, 'url': self.url,
+        }
+        if self.type == 'dns-01':
+            digest = hashlib.sha256(self.key_authorization.encode('utf-8')).digest()
+            challenge['record_name'] = f"_acme-challenge.{self.domain.replace('*.', '')}"
+            challenge['record_value'] = base64.urlsafe_b64encode(digest).rstrip(b'=').decode('utf-8')
+        else:
+            challenge['file_path'] = f"/.well-known/acme-challenge/{self.token}"
+            challenge['file_content'] = self.key_authorization
+        return challenge
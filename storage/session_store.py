@@ -0,0 +1,267 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+import logging
+from datetime import datetime, timedelta
+import threading
+import tempfile
+import pickle
+import time
+import os
+
+from tracing import traced
+
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+class SessionStoreInterface(ABC):
+    """Abstract interface for keyed ACME session storage with native expiry"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the session stored under key, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, value: Dict, expires: datetime):
+        """Store a session under key until it expires"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove a session, returning whether it existed"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove expired sessions, returning how many were removed"""
+        pass
+
+    @abstractmethod
+    def oldest_expiry(self) -> Optional[datetime]:
+        """Return the earliest expiry of any stored session, expired or not"""
+        pass
+
+    @abstractmethod
+    def items(self) -> Dict[str, Dict]:
+        """Return all live sessions (bulk view for legacy callers, O(total sessions))"""
+        pass
+
+    def replace_all(self, sessions: Dict[str, Dict]):
+        """Make the store hold exactly the given sessions (legacy bulk write)"""
+        for key in set(self.items()) - set(sessions):
+            self.delete(key)
+        for key, value in sessions.items():
+            self.put(key, value, _expires_of(value))
+
+def _expires_of(value) -> datetime:
+    """Read a session's expiry, defaulting to one day for records that lack one"""
+    expires = value.get('expires') if isinstance(value, dict) else getattr(value, 'expires', None)
+    if isinstance(expires, datetime):
+        return expires
+    return datetime.now() + timedelta(days=1)
+
+class SQLiteSessionStore(SessionStoreInterface):
+    """Session store backed by a shared SQLite database in WAL mode"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires);
+    """
+
+    def __init__(self, path: str):
+        self.db = get_database(path)
+        self.db.executescript(self.SCHEMA)
+
+    @traced('session.load')
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.execute(
+            'SELECT value FROM sessions WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except (pickle.UnpicklingError, EOFError, TypeError, AttributeError) as e:
+            logger.error(f"Could not decode session {key}: {e}. Discarding it.")
+            self.delete(key)
+            return None
+
+    @traced('session.save')
+    def put(self, key: str, value: Dict, expires: datetime):
+        self.db.execute(
+            'INSERT OR REPLACE INTO sessions (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires.timestamp())
+        )
+
+    def delete(self, key: str) -> bool:
+        return self.db.execute('DELETE FROM sessions WHERE key = ?', (key,)).rowcount > 0
+
+    def replace_all(self, sessions: Dict[str, Dict]):
+        # One transaction instead of a commit per session
+        rows = [(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), _expires_of(value).timestamp())
+                for key, value in sessions.items()]
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM sessions')
+            conn.executemany('INSERT INTO sessions (key, value, expires) VALUES (?, ?, ?)', rows)
+
+    def purge_expired(self) -> int:
+        return self.db.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),)).rowcount
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        row = self.db.execute('SELECT MIN(expires) FROM sessions').fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+    def items(self) -> Dict[str, Dict]:
+        rows = self.db.execute(
+            'SELECT key, value FROM sessions WHERE expires > ?', (time.time(),)
+        ).fetchall()
+        return {key: pickle.loads(value) for key, value in rows}
+
+class MemorySessionStore(SessionStoreInterface):
+    """Per-process session store for serverless platforms without a writable disk"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @traced('session.load')
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= datetime.now():
+                del self._sessions[key]
+                return None
+            return value
+
+    @traced('session.save')
+    def put(self, key: str, value: Dict, expires: datetime):
+        with self._lock:
+            self._sessions[key] = (value, expires)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
+
+    def purge_expired(self) -> int:
+        current_time = datetime.now()
+        with self._lock:
+            expired = [k for k, (_, expires) in self._sessions.items() if expires <= current_time]
+            for key in expired:
+                del self._sessions[key]
+        return len(expired)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        with self._lock:
+            return min((expires for _, expires in self._sessions.values()), default=None)
+
+    def items(self) -> Dict[str, Dict]:
+        current_time = datetime.now()
+        with self._lock:
+            return {k: v for k, (v, expires) in self._sessions.items() if expires > current_time}
+
+class PickleSessionStore(SessionStoreInterface):
+    """Legacy adapter for the whole-file pickle session cache.
+
+    Every operation loads and rewrites the entire file, so per-request cost grows
+    with the number of sessions. Kept only for reading existing deployments.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, TypeError) as e:
+            logger.error(f"Could not load session cache: {e}. Starting fresh.")
+            return {}
+
+    def _save(self, sessions: Dict[str, Dict]):
+        # Write to a sibling temp file and rename so a crash never leaves a partial cache
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(sessions, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @traced('session.load')
+    def get(self, key: str) -> Optional[Dict]:
+        value = self._load().get(key)
+        if value is None or _expires_of(value) <= datetime.now():
+            return None
+        return value
+
+    @traced('session.save')
+    def put(self, key: str, value: Dict, expires: datetime):
+        with self._lock:
+            sessions = self._load()
+            sessions[key] = dict(value, expires=expires) if isinstance(value, dict) else value
+            self._save(sessions)
+
+    def replace_all(self, sessions: Dict[str, Dict]):
+        # One rewrite of the file instead of one per session
+        with self._lock:
+            self._save({key: dict(value, expires=_expires_of(value)) if isinstance(value, dict) else value
+                        for key, value in sessions.items()})
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            sessions = self._load()
+            existed = sessions.pop(key, None) is not None
+            if existed:
+                self._save(sessions)
+            return existed
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            sessions = self._load()
+            current_time = datetime.now()
+            live = {k: v for k, v in sessions.items() if _expires_of(v) > current_time}
+            if len(live) != len(sessions):
+                self._save(live)
+            return len(sessions) - len(live)
+
+    def oldest_expiry(self) -> Optional[datetime]:
+        return min((_expires_of(v) for v in self._load().values()), default=None)
+
+    def items(self) -> Dict[str, Dict]:
+        current_time = datetime.now()
+        return {k: v for k, v in self._load().items() if _expires_of(v) > current_time}
+
+class SessionStoreFactory:
+    """Factory for creating session stores"""
+
+    @staticmethod
+    def create_store(config) -> SessionStoreInterface:
+        """Create the session store selected by the application configuration"""
+        if os.environ.get('VERCEL'):
+            # No shared writable disk on Vercel. SESSION_DATA is not read: JSON cannot carry
+            # the DER keys a SessionRecord holds, and its challenges would be missing anyway
+            if os.environ.get('SESSION_DATA'):
+                logger.warning("SESSION_DATA is no longer supported and was ignored")
+            return MemorySessionStore()
+
+        backend = config.get('SESSION_STORE', 'sqlite')
+        if backend == 'sqlite':
+            return SQLiteSessionStore(config['STATE_DB_PATH'])
+        elif backend == 'pickle':
+            return PickleSessionStore(config['SESSION_CACHE_FILE'])
+        elif backend == 'memory':
+            return MemorySessionStore()
+        else:
+            raise ValueError(f"Unsupported session store: {backend}")
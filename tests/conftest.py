@@ -0,0 +1,68 @@
+import re
+import json
+import logging
+
+import pytest
+
+from config import TestingConfig
+
+# Passed to POST /generate_ssl unless a test overrides fields
+REAL_FORM = dict(domains='www.example.com, api.example.com', email='admin@example.org',
+                 validation_method='http', accept_agreement='on', cert_type='real')
+
+@pytest.fixture(scope='session')
+def fake_ca():
+    """Fake ACME CA (tools/fake_acme.py) on a random port; yields (base_url, server)"""
+    from fake_acme import start_fake_acme
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    base_url, server = start_fake_acme(ocsp_validity=600)
+    yield base_url, server
+    server.shutdown()
+
+@pytest.fixture
+def fake_dns():
+    """Fake authoritative DNS server (tools/fake_dns.py) on a random port, answering for example.com"""
+    from fake_dns import start_fake_dns
+    server = start_fake_dns()
+    server.add_zone('example.com', ttl=3600, minimum=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build apps with TestingConfig overridden; all state lives under tmp_path"""
+    def make(**overrides):
+        settings = dict(
+            UPLOAD_FOLDER=str(tmp_path),
+            STATE_DB_PATH=str(tmp_path / 'state.db'),
+            ORDER_JOURNAL_PATH=str(tmp_path / 'orders.journal'),
+            ARTIFACT_STORE_DIR=str(tmp_path / 'artifacts'),
+            STATIC_BUILD_DIR=str(tmp_path / 'static'),
+            JINJA_CACHE_DIR=str(tmp_path / 'jinja-cache'),
+            RATE_LIMIT_ENABLED=False,
+            CAA_CHECK_ENABLED=False,
+            REAPER_ENABLED=False,
+            ORDER_JOURNAL_ENABLED=False,
+        )
+        settings.update(overrides)
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value, raising=False)
+        from app_factory import create_app
+        return create_app('testing')
+    return make
+
+@pytest.fixture
+def real_app(make_app, fake_ca):
+    return make_app(ACME_BASE_URL=fake_ca[0])
+
+def request_id_of(html: str) -> str:
+    """Pull the request id out of the challenge page rendered by /generate_ssl"""
+    match = re.search(r'/verify_challenges/([^"/]+)"', html)
+    assert match, html[:500]
+    return match.group(1)
+
+def certificate_ready_event(body: str) -> dict:
+    """Decode the certificate_ready event from a /verify_challenges/<id>/events stream"""
+    assert 'event: certificate_ready\n' in body, body[-500:]
+    return json.loads(body.split('event: certificate_ready\ndata: ')[1].split('\n')[0])
@@ -0,0 +1,34 @@
+"""Application setup: template bytecode cache, default rate limits and reaper tasks"""
+import os
+
+def test_template_cache_is_private(make_app, tmp_path):
+    app = make_app(JINJA_CACHE_DIR=str(tmp_path / 'jinja'))
+    assert app.jinja_env.bytecode_cache.directory == str(tmp_path / 'jinja')
+    assert os.stat(tmp_path / 'jinja').st_mode & 0o777 == 0o700
+
+def test_shared_template_cache_is_refused(make_app, tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    assert make_app(JINJA_CACHE_DIR=str(shared)).jinja_env.bytecode_cache is None
+
+def test_symlinked_template_cache_is_refused(make_app, tmp_path):
+    target = tmp_path / 'elsewhere'
+    target.mkdir(mode=0o700)
+    os.symlink(target, tmp_path / 'link')
+    assert make_app(JINJA_CACHE_DIR=str(tmp_path / 'link')).jinja_env.bytecode_cache is None
+
+def test_default_limits_are_per_route(make_app):
+    client = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMIT_DEFAULTS=['2 per minute']).test_client()
+    assert [client.get('/').status_code for _ in range(3)] == [200, 200, 429]
+    # Another route has a bucket of its own
+    assert client.get('/api/certificates').status_code != 429
+    # Health checks and challenge fetches are never throttled
+    assert all(client.get('/health').status_code == 200 for _ in range(3))
+
+def test_reaper_runs_journal_retention(make_app):
+    app = make_app(REAPER_ENABLED=True, ORDER_JOURNAL_ENABLED=True, REAPER_INTERVAL_SECONDS=3600)
+    try:
+        assert 'order_journal' in app.reaper.run_once()
+    finally:
+        app.reaper.stop(5)
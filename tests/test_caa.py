@@ -0,0 +1,58 @@
+"""CAA pre-check against the stub nameserver"""
+import pytest
+
+from validators import DomainValidator
+from validators.caa import CAAChecker
+from validators.dns_resolver import CachingResolver
+
+@pytest.fixture
+def resolver(fake_dns):
+    return CachingResolver(nameservers=['127.0.0.1'], port=fake_dns.port, timeout=1.0, lifetime=1.0)
+
+def test_walks_up_to_the_registered_domain_only(fake_dns, resolver):
+    fake_dns.add_zone('com')
+    fake_dns.add_zone('co.uk')
+    # A record above the registered domain (here on the public suffix itself) is never consulted
+    fake_dns.add('com', 'CAA', 300, '0 issue "otherca.org"')
+    fake_dns.add('co.uk', 'CAA', 300, '0 issue "otherca.org"')
+    fake_dns.add('example.com', 'CAA', 300, '0 issue "otherca.org"')
+    fake_dns.add('sub.example.com', 'CAA', 300, '0 issue "letsencrypt.org"')
+    checker = CAAChecker(resolver)
+    assert checker._ancestors('a.b.example.co.uk') == ['a.b.example.co.uk', 'b.example.co.uk', 'example.co.uk']
+    results = checker.check_many(['www.example.com', 'deep.www.sub.example.com', 'www.example.co.uk'])
+    assert results['www.example.com'] == (False, 'CAA records at example.com only allow otherca.org')
+    # The closest ancestor with CAA records decides
+    assert results['deep.www.sub.example.com'] == (True, '')
+    assert results['www.example.co.uk'] == (True, '')
+
+def test_issuewild_governs_wildcards(fake_dns, resolver):
+    fake_dns.add('example.com', 'CAA', 300, '0 issue "letsencrypt.org"', '0 issuewild "otherca.org"')
+    results = CAAChecker(resolver).check_many(['www.example.com', '*.example.com'])
+    assert results['www.example.com'][0] and not results['*.example.com'][0]
+    # Without issuewild, issue applies to wildcards too; an empty issuer forbids everyone
+    fake_dns.add('other.example.com', 'CAA', 300, '0 issue ";"')
+    results = CAAChecker(resolver).check_many(['*.other.example.com'])
+    assert results['*.other.example.com'] == (False, 'CAA records at other.example.com forbid all issuance')
+
+def test_unknown_critical_tag_blocks_issuance(fake_dns, resolver):
+    fake_dns.add('critical.example.com', 'CAA', 300, '128 tbs "unknown"', '0 issue "letsencrypt.org"')
+    fake_dns.add('relaxed.example.com', 'CAA', 300, '0 tbs "unknown"', '0 issue "letsencrypt.org"')
+    results = CAAChecker(resolver).check_many(['critical.example.com', 'relaxed.example.com'])
+    assert results['critical.example.com'] == (False, "CAA record at critical.example.com has unknown critical tag 'tbs'")
+    assert results['relaxed.example.com'] == (True, '')
+
+def test_lookup_errors_fail_open(fake_dns, resolver):
+    fake_dns.failing.update({'www.example.com', 'example.com'})
+    assert CAAChecker(resolver).check('www.example.com') == (True, '')
+
+def test_validate_domains_rejects_blocked_names(fake_dns, monkeypatch):
+    monkeypatch.setattr(DomainValidator, '_resolver_options', {})
+    monkeypatch.setattr(DomainValidator, '_resolver', None)
+    DomainValidator.configure_resolver(nameservers=['127.0.0.1'], port=fake_dns.port, timeout=1.0)
+    fake_dns.add('blocked.example.com', 'CAA', 300, '0 issue "otherca.org"')
+    ok, domains, error = DomainValidator.validate_domains('www.example.com, api.example.com', check_caa=True)
+    assert ok and domains == ['www.example.com', 'api.example.com'] and error == ''
+    ok, domains, error = DomainValidator.validate_domains('www.example.com, blocked.example.com', check_caa=True)
+    assert not ok and domains == []
+    assert error == ('CAA records forbid letsencrypt.org from issuing '
+                     '(blocked.example.com: CAA records at blocked.example.com only allow otherca.org)')
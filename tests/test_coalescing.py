@@ -0,0 +1,56 @@
+"""Single-flight coalescing of duplicate /generate_ssl submissions"""
+import re
+import time
+import threading
+
+from storage import order_key
+
+from conftest import REAL_FORM, request_id_of
+
+def test_order_key_is_canonical_per_client():
+    key = order_key('client-a', ['www.example.com', 'api.example.com'], 'admin@example.org', 'http', 'ca')
+    assert key == order_key('client-a', ['API.example.com.', 'www.example.com'], 'Admin@example.org', 'http', 'ca')
+    assert key != order_key('client-b', ['www.example.com', 'api.example.com'], 'admin@example.org', 'http', 'ca')
+    assert key != order_key('client-a', ['www.example.com', 'api.example.com'], 'other@example.org', 'http', 'ca')
+
+def _submit_concurrently(submit, n):
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.append(request_id_of(submit().data.decode()))) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ids
+
+def test_concurrent_duplicates_in_one_session_share_an_order(real_app):
+    client = real_app.test_client()
+    # Loading the form sets the session cookie, so even the very first submits coalesce
+    client.get('/')
+    ids = _submit_concurrently(lambda: client.post('/generate_ssl', data=REAL_FORM), 4)
+    assert len(ids) == 4 and len(set(ids)) == 1
+
+def test_first_submits_without_a_cookie_share_the_form_client_id(real_app):
+    html = real_app.test_client().get('/').data.decode()
+    form = dict(REAL_FORM, coalesce_client=re.search(r'name="coalesce_client" value="([^"]+)"', html).group(1))
+    # Two double-submitted requests, neither carrying a session cookie
+    ids = _submit_concurrently(lambda: real_app.test_client().post('/generate_ssl', data=form), 2)
+    assert len(ids) == 2 and ids[0] == ids[1]
+    # A made-up client id is not accepted
+    other = request_id_of(real_app.test_client().post(
+        '/generate_ssl', data=dict(REAL_FORM, coalesce_client='x')).data.decode())
+    assert other != ids[0]
+
+def test_other_sessions_never_join(real_app):
+    first = request_id_of(real_app.test_client().post('/generate_ssl', data=REAL_FORM).data.decode())
+    # Same form from a stranger: a fresh order, not the first submitter's request id
+    other = request_id_of(real_app.test_client().post('/generate_ssl', data=REAL_FORM).data.decode())
+    assert other != first
+
+def test_published_order_lapses_after_short_window(make_app, fake_ca):
+    app = make_app(ACME_BASE_URL=fake_ca[0], ORDER_COALESCE_WAIT_SECONDS=0.5)
+    client = app.test_client()
+    first = request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode())
+    assert app.inflight_orders.oldest_expiry().timestamp() <= time.time() + 1
+    assert request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode()) == first
+    time.sleep(1.1)
+    assert request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode()) != first
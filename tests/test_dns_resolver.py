@@ -0,0 +1,71 @@
+"""Caching resolver against the stub nameserver: TTLs, negative caching and concurrent batches"""
+import time
+
+import pytest
+
+from validators.dns_resolver import CachingResolver, DNSResult, TTLCache
+
+@pytest.fixture
+def resolver(fake_dns):
+    return CachingResolver(nameservers=['127.0.0.1'], port=fake_dns.port, timeout=1.0, lifetime=2.0)
+
+def test_positive_answers_expire_with_their_ttl(fake_dns, resolver):
+    fake_dns.add('www.example.com', 'A', 1, '192.0.2.1')
+    result = resolver.resolve('www.example.com')
+    assert result.status == DNSResult.OK and result.records == ['192.0.2.1'] and 0 < result.ttl <= 1
+    assert resolver.resolve('WWW.example.com.') is result
+    assert fake_dns.queries[('www.example.com', 'A')] == 1
+    time.sleep(1.1)
+    assert resolver.resolve('www.example.com').status == DNSResult.OK
+    assert fake_dns.queries[('www.example.com', 'A')] == 2
+
+def test_nxdomain_is_cached_for_the_soa_negative_ttl(fake_dns, resolver):
+    # SOA minimum is 1s, below the resolver's 300s cap
+    result = resolver.resolve('missing.example.com')
+    assert result.status == DNSResult.NXDOMAIN and not result.exists and result.ttl == 1
+    assert resolver.resolve('missing.example.com').status == DNSResult.NXDOMAIN
+    assert fake_dns.queries[('missing.example.com', 'A')] == 1
+    time.sleep(1.1)
+    resolver.resolve('missing.example.com')
+    assert fake_dns.queries[('missing.example.com', 'A')] == 2
+
+def test_negative_ttl_is_capped(fake_dns):
+    fake_dns.add_zone('example.com', ttl=3600, minimum=3600)
+    fake_dns.add('v4only.example.com', 'A', 60, '192.0.2.1')
+    resolver = CachingResolver(nameservers=['127.0.0.1'], port=fake_dns.port, negative_ttl=30)
+    assert resolver.resolve('nothing.example.com').ttl == 30
+    nodata = resolver.resolve('v4only.example.com', 'AAAA')
+    assert nodata.status == DNSResult.NODATA and nodata.ttl == 30
+
+def test_lookup_errors_are_cached_briefly(fake_dns):
+    fake_dns.failing.add('broken.example.com')
+    resolver = CachingResolver(nameservers=['127.0.0.1'], port=fake_dns.port, lifetime=1.0, error_ttl=5)
+    result = resolver.resolve('broken.example.com')
+    assert result.status == DNSResult.ERROR and result.ttl == 5
+    resolver.resolve('broken.example.com')
+    assert fake_dns.queries[('broken.example.com', 'A')] == 1
+
+def test_resolve_many_looks_up_concurrently_once_per_name(fake_dns, resolver):
+    fake_dns.latency = 0.2
+    names = [f'host{i}.example.com' for i in range(8)]
+    for i, name in enumerate(names):
+        fake_dns.add(name, 'A', 300, f'192.0.2.{i + 1}')
+    resolver.resolve(names[0])
+    started = time.monotonic()
+    results = resolver.resolve_many(names + [names[1], 'missing.example.com'])
+    # Eight sequential lookups would take 1.6s
+    assert time.monotonic() - started < 0.8
+    assert set(results) == set(names) | {'missing.example.com'}
+    assert results['host7.example.com'].records == ['192.0.2.8']
+    assert results['missing.example.com'].status == DNSResult.NXDOMAIN
+    assert all(fake_dns.queries[(name, 'A')] == 1 for name in names)
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.put('a', 1, 60)
+    cache.put('b', 2, 60)
+    cache.get('a')
+    cache.put('c', 3, 60)
+    cache.put('d', 4, 0)
+    assert cache.get('b') is None and cache.get('d') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
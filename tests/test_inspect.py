@@ -0,0 +1,56 @@
+"""Bulk certificate inspection: report, host-wide pool slots and the endpoint's rate limit"""
+import io
+
+import pytest
+
+from services import CertificateInspector
+from services.certificate_inspector import pool_slot
+from ssl_generator import SSLGenerator
+
+@pytest.fixture(scope='module')
+def bundle():
+    """(name, content) pairs for 20 demo certificates with their keys"""
+    generator = SSLGenerator()
+    files = []
+    for i in range(10):
+        rendered = generator.render_certificate([f'h{i}.example.com'], 'admin@example.org')
+        files += [(f'{i}.pem', rendered['certificate'] + rendered['ca_bundle']),
+                  (f'{i}.key', rendered['private_key'])]
+    return files
+
+def test_report_matches_keys_and_hostnames(bundle):
+    report = CertificateInspector(1).inspect(bundle, ['h3.example.com', 'other.example.com'])
+    summary = report['summary']
+    assert summary['files'] == 20 and summary['keys'] == 10
+    assert summary['keys_without_certificate'] == 0 and summary['leaves_without_key'] == 0
+    assert report['hostnames']['other.example.com'] == []
+    assert report['hostnames']['h3.example.com']
+
+def test_pool_slots_cap_parallel_batches(tmp_path, bundle):
+    slots = str(tmp_path / 'slots')
+    with pool_slot(slots, 1) as first, pool_slot(slots, 1) as second:
+        assert first and not second
+    with pool_slot(slots, 2) as first, pool_slot(slots, 2) as second, pool_slot(slots, 2) as third:
+        assert first and second and not third
+
+    inspector = CertificateInspector(2, slots_dir=slots, host_pools=1)
+    with pool_slot(slots, 1):
+        # Another worker holds the host's only pool: parse inline
+        busy = inspector.inspect(bundle)
+    assert inspector.stats()['pool_busy'] == 1 and inspector.stats()['parallel_batches'] == 0
+
+    parallel = CertificateInspector(2, slots_dir=slots, host_pools=1)
+    assert parallel.inspect(bundle)['summary'] == busy['summary']
+    assert parallel.stats()['parallel_batches'] == 1
+
+def test_inspect_endpoint_is_rate_limited(make_app, bundle):
+    client = make_app(RATE_LIMIT_ENABLED=True, INSPECT_RATE_LIMIT=2).test_client()
+
+    def upload():
+        return client.post('/api/inspect', data={'files': [(io.BytesIO(data), name) for name, data in bundle[:2]]},
+                           content_type='multipart/form-data')
+
+    first = upload()
+    assert first.status_code == 200 and first.get_json()['summary']['certificates'] == 2
+    assert upload().status_code == 200
+    assert upload().status_code == 429
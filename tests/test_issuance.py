@@ -0,0 +1,79 @@
+"""End-to-end issuance against the fake ACME CA"""
+import os
+import errno
+import re
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+
+from storage import MemoryArtifactStore
+
+from conftest import REAL_FORM, request_id_of, certificate_ready_event
+
+def test_real_issuance_through_fake_ca(real_app):
+    client = real_app.test_client()
+    response = client.post('/generate_ssl', data=REAL_FORM)
+    assert response.status_code == 200
+    request_id = request_id_of(response.data.decode())
+
+    # The HTTP-01 responder answers for the pending tokens
+    challenges = real_app.challenge_table.list(request_id)
+    assert sorted(c['domain'] for c in challenges) == ['api.example.com', 'www.example.com']
+    token_response = client.get(f"/.well-known/acme-challenge/{challenges[0]['token']}",
+                                headers={'Host': challenges[0]['domain']})
+    assert token_response.status_code == 200
+    assert token_response.data.decode() == challenges[0]['file_content']
+
+    ready = certificate_ready_event(client.get(f'/verify_challenges/{request_id}/events').data.decode())
+    certificate = client.get(ready['downloads']['certificate'])
+    assert certificate.status_code == 200
+    leaf = x509.load_pem_x509_certificate(certificate.data)
+    names = leaf.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
+    assert sorted(names) == ['api.example.com', 'www.example.com']
+    key = client.get(ready['downloads']['private_key'])
+    assert key.status_code == 200 and b'PRIVATE KEY' in key.data
+
+    # The order's session and challenges are gone once the certificate is issued
+    assert real_app.session_store.get(request_id) is None
+    assert real_app.challenge_table.list(request_id) == []
+    assert real_app.certificate_inventory.get(leaf.fingerprint(hashes.SHA256()).hex()) is not None
+
+def test_issued_key_is_private_on_disk(real_app):
+    client = real_app.test_client()
+    request_id = request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode())
+    ready = certificate_ready_event(client.get(f'/verify_challenges/{request_id}/events').data.decode())
+    file_info = real_app.download_registry.get(ready['file_id'])
+    assert os.stat(file_info['files']['private_key']).st_mode & 0o777 == 0o600
+    assert os.path.dirname(file_info['files']['private_key']).startswith(real_app.artifact_store.root)
+
+def test_invalid_request_id_reports_error(real_app):
+    body = real_app.test_client().get('/verify_challenges/unknown/events').data.decode()
+    assert body.startswith('event: error\n')
+
+def test_demo_issuance_downloads_every_file(make_app):
+    client = make_app().test_client()
+    html = client.post('/generate_ssl', data=dict(REAL_FORM, cert_type='demo')).data.decode()
+    file_id = re.search(r'/download/([^/"]+)/certificate', html).group(1)
+    for file_type in ('certificate', 'private_key', 'ca_bundle', 'fullchain', 'pkcs12'):
+        response = client.get(f'/download/{file_id}/{file_type}')
+        assert response.status_code == 200, file_type
+
+def test_vercel_issuance_uses_the_in_memory_index(make_app, fake_ca, monkeypatch):
+    monkeypatch.setenv('VERCEL', '1')
+    app = make_app(ACME_BASE_URL=fake_ca[0])
+    assert isinstance(app.artifact_store, MemoryArtifactStore)
+    client = app.test_client()
+    request_id = request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode())
+    ready = certificate_ready_event(client.get(f'/verify_challenges/{request_id}/events').data.decode())
+    assert b'BEGIN CERTIFICATE' in client.get(ready['downloads']['certificate']).data
+    assert client.get(f"/download/{ready['file_id']}/fullchain").status_code == 200
+
+def test_issuance_survives_journal_write_failures(make_app, fake_ca, monkeypatch):
+    app = make_app(ACME_BASE_URL=fake_ca[0], ORDER_JOURNAL_ENABLED=True)
+    def append(*args, **kwargs):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+    monkeypatch.setattr(app.order_journal, 'append', append)
+    client = app.test_client()
+    request_id = request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode())
+    ready = certificate_ready_event(client.get(f'/verify_challenges/{request_id}/events').data.decode())
+    assert b'BEGIN CERTIFICATE' in client.get(ready['downloads']['certificate']).data
@@ -0,0 +1,60 @@
+"""SAN packing and weekly scheduling of the issuance planner"""
+import pytest
+
+from services import DemoSSLService
+from services.issuance_planner import IssuancePlanner
+from storage import MemoryArtifactStore
+
+def _weeks(plan):
+    weeks = {}
+    for certificate in plan.certificates:
+        for key in certificate.registered_domains:
+            weeks.setdefault(key, []).append(certificate.week)
+    return weeks
+
+def test_over_limit_domain_does_not_delay_others():
+    # example.com needs two certificates but may only get one a week
+    domains = [f'host{i}.example.com' for i in range(6)] + ['x.co.uk', 'bar.org']
+    plan = IssuancePlanner(max_sans=4, weekly_limit=1).plan(domains)
+    weeks = _weeks(plan)
+    assert sorted(weeks['example.com']) == [0, 1]
+    assert weeks['x.co.uk'] == [0] and weeks['bar.org'] == [0]
+    for week in (0, 1):
+        issued = [key for c in plan.certificates if c.week == week for key in c.registered_domains]
+        assert len(issued) == len(set(issued))
+    assert sorted(name for c in plan.certificates for name in c.domains) == sorted(domains)
+
+def test_issued_this_week_defers_only_that_domain():
+    plan = IssuancePlanner(max_sans=100, weekly_limit=2, issued_this_week={'example.com': 2}).plan(
+        ['www.example.com', 'www.example.net'])
+    assert _weeks(plan) == {'example.com': [1], 'example.net': [0]}
+
+def test_groups_share_certificates_and_stay_whole():
+    plan = IssuancePlanner(max_sans=5).plan(
+        ['a.example.com', 'b.example.com', 'c.example.com', 'a.example.net', 'b.example.net'])
+    assert len(plan.certificates) == 1
+    assert plan.summary()['weeks'] == 1
+
+def test_wildcards_replace_siblings_with_dns01():
+    plan = IssuancePlanner(dns01_available=True).plan(['a.example.com', 'b.example.com', 'example.com'])
+    assert plan.certificates[0].domains == ['example.com', '*.example.com']
+    assert plan.certificates[0].validation_method == 'dns'
+
+def test_rejects_invalid_names_and_wildcards_without_dns01():
+    plan = IssuancePlanner().plan(['*.example.com', 'bad_name!', 'ok.example.com'])
+    assert set(plan.rejected) == {'*.example.com', 'bad_name!'}
+    assert plan.certificates[0].domains == ['ok.example.com']
+
+def test_weekly_limit_must_be_positive():
+    with pytest.raises(ValueError):
+        IssuancePlanner(weekly_limit=0)
+
+def test_planned_orders_feed_generate_certificate(tmp_path):
+    plan = IssuancePlanner(max_sans=2, weekly_limit=1).plan(['www.example.com', 'api.example.com', 'www.example.net'])
+    service = DemoSSLService(MemoryArtifactStore(str(tmp_path / 'artifacts'), 1024 * 1024))
+    orders = list(plan.orders('admin@example.org', week=0))
+    assert len(orders) == 2
+    for order in orders:
+        result = service.generate_certificate(**order)
+        assert result['success'] and result['domains'] == order['domains']
+        assert set(result['files']) >= {'certificate', 'private_key', 'ca_bundle'}
@@ -0,0 +1,67 @@
+"""OCSP fetch, stapling endpoint and background refresh against the fake CA's responder"""
+import time
+import threading
+
+import pytest
+from cryptography.x509 import ocsp
+
+from storage import SQLiteOCSPCache, MemoryOCSPCache
+
+from conftest import REAL_FORM, request_id_of, certificate_ready_event
+
+@pytest.fixture
+def issued(real_app):
+    """Issue a certificate and return (client, OCSP URL, cache key)"""
+    client = real_app.test_client()
+    request_id = request_id_of(client.post('/generate_ssl', data=REAL_FORM).data.decode())
+    ready = certificate_ready_event(client.get(f'/verify_challenges/{request_id}/events').data.decode())
+    return client, ready['ocsp'], ready['ocsp'].split('/ocsp/', 1)[1]
+
+def test_staples_a_fetched_response(real_app, issued):
+    client, url, key = issued
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/ocsp-response'
+    assert 'max-age=' in response.headers['Cache-Control']
+    parsed = ocsp.load_der_ocsp_response(response.data)
+    assert parsed.response_status == ocsp.OCSPResponseStatus.SUCCESSFUL
+    assert parsed.certificate_status == ocsp.OCSPCertStatus.GOOD
+    # Refreshed at half-life of the fake CA's 600s validity
+    assert 240 < real_app.ocsp_cache.get(key)['refresh_at'] - time.time() <= 300
+    assert client.get('/ocsp/00/11').status_code == 404
+
+def test_refresh_picks_up_revocation(real_app, fake_ca, issued):
+    client, url, key = issued
+    client.get(url)
+    real_app.ocsp_cache.schedule_refresh(key, 0)
+    fake_ca[1].app.revoked_serials.add(int(key.split('/')[1], 16))
+    try:
+        assert real_app.ocsp_service.refresh_due() == 1
+        assert real_app.ocsp_service.refresh_due() == 0
+        assert ocsp.load_der_ocsp_response(client.get(url).data).certificate_status == ocsp.OCSPCertStatus.REVOKED
+    finally:
+        fake_ca[1].app.revoked_serials.clear()
+
+@pytest.mark.parametrize('backend', ['sqlite', 'memory'])
+def test_concurrent_refreshers_claim_each_entry_once(backend, tmp_path):
+    cache = SQLiteOCSPCache(str(tmp_path / 'state.db')) if backend == 'sqlite' else MemoryOCSPCache()
+    now = time.time()
+    for i in range(200):
+        cache.put_certificate(f'aa/{i:x}', b'chain', 'http://ocsp', now + 3600)
+    claimed = []
+    start = threading.Barrier(8)
+
+    def refresher():
+        start.wait()
+        while True:
+            batch = cache.claim_due(time.time(), lease=300, limit=10)
+            if not batch:
+                return
+            claimed.extend(entry['key'] for entry in batch)
+
+    threads = [threading.Thread(target=refresher) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f'aa/{i:x}' for i in range(200))
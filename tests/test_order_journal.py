@@ -0,0 +1,67 @@
+"""Order journal folding, recovery lock and retention"""
+import errno
+import time
+
+import pytest
+
+from storage import OrderJournal
+
+def _lines(path):
+    with open(path, 'rb') as f:
+        return f.read().count(b'\n')
+
+def test_folds_transitions_across_instances(tmp_path):
+    path = str(tmp_path / 'orders.journal')
+    writer, reader = OrderJournal(path), OrderJournal(path)
+    writer.append('r1', 'order_created', domains=['www.example.com'])
+    writer.append('r1', 'challenge_valid', domain='www.example.com')
+    assert reader.state('r1').challenges == {'www.example.com': 'challenge_valid'}
+    assert [state.request_id for state in reader.pending()] == ['r1']
+    writer.append('r1', 'certificate_downloaded', file_id='f1')
+    assert reader.state('r1').terminal and reader.state('r1').file_id == 'f1'
+    assert reader.pending() == []
+
+def test_reap_forgets_and_compacts_finished_orders(tmp_path):
+    path = str(tmp_path / 'orders.journal')
+    journal = OrderJournal(path, retention=0.2)
+    journal.append('done', 'order_created', domains=['a.example.com'])
+    journal.append('done', 'certificate_downloaded', file_id='f1')
+    journal.append('open', 'order_created', domains=['b.example.com'])
+    assert journal.reap() == 0 and _lines(path) == 3
+    time.sleep(0.3)
+    assert journal.oldest_expiry().timestamp() <= time.time()
+    assert journal.reap() == 1
+    assert journal.state('done') is None and journal.state('open') is not None
+    assert _lines(path) == 1 and journal.oldest_expiry() is None
+    # Appends continue on the compacted file
+    journal.append('open', 'failed')
+    assert journal.state('open').terminal and _lines(path) == 2
+
+def test_reap_compacts_later_when_another_worker_holds_the_lock(tmp_path):
+    path = str(tmp_path / 'orders.journal')
+    journal = OrderJournal(path, retention=0.1)
+    journal.append('done', 'order_created', domains=['a.example.com'])
+    journal.append('done', 'failed')
+    time.sleep(0.2)
+    with OrderJournal(path).recovery_lock() as acquired:
+        assert acquired
+        assert journal.reap() == 1
+        assert _lines(path) == 2
+    # Already forgotten here, but the file still needs compacting
+    assert journal.reap() == 0
+    assert _lines(path) == 0
+
+def test_failed_batch_fails_only_its_own_appenders(tmp_path, monkeypatch):
+    journal = OrderJournal(str(tmp_path / 'orders.journal'), fsync_window=0)
+    lock_current_file = journal._lock_current_file
+    failures = [OSError(errno.ENOSPC, 'No space left on device')]
+    def flaky():
+        if failures:
+            raise failures.pop()
+        return lock_current_file()
+    monkeypatch.setattr(journal, '_lock_current_file', flaky)
+    with pytest.raises(OSError):
+        journal.append('lost', 'order_created', domains=['a.example.com'])
+    # The next batch is written, not failed with the earlier error
+    journal.append('kept', 'order_created', domains=['b.example.com'])
+    assert journal.state('lost') is None and journal.state('kept') is not None
@@ -0,0 +1,52 @@
+"""Public Suffix List trie and registered-domain grouping"""
+import json
+
+import pytest
+
+from validators import DomainValidator
+from validators.public_suffix import PublicSuffixTrie, get_public_suffix_trie, load_trie
+
+@pytest.mark.parametrize('domain, registrable', [
+    ('www.example.com', 'example.com'),
+    ('a.b.example.co.uk', 'example.co.uk'),
+    ('EXAMPLE.CO.UK.', 'example.co.uk'),
+    ('user.github.io', 'user.github.io'),      # private section
+    ('www.foo.ck', 'www.foo.ck'),              # wildcard rule *.ck
+    ('www.ck', 'www.ck'),                      # exception !www.ck
+    ('a.city.kawasaki.jp', 'city.kawasaki.jp'),
+    ('shop.example.xn--55qx5d.cn', 'example.xn--55qx5d.cn'),  # punycode of an IDN rule
+    ('host.example.unlistedtld', 'example.unlistedtld'),      # implicit '*' rule
+    ('co.uk', None),
+    ('foo.ck', None),
+])
+def test_registrable_domain(domain, registrable):
+    assert get_public_suffix_trie().registrable_domain(domain) == registrable
+
+def test_public_suffixes_are_rejected():
+    assert not DomainValidator.validate_single_domain('co.uk')[0]
+    assert not DomainValidator.validate_single_domain('*.co.uk')[0]
+    assert DomainValidator.validate_single_domain('*.example.co.uk')[0]
+
+def test_grouping_by_registered_domain():
+    groups = DomainValidator.group_by_registered_domain(
+        ['www.example.co.uk', 'a.github.io', 'b.github.io', '*.example.co.uk', 'example.com'])
+    assert groups == {
+        'example.co.uk': ['www.example.co.uk', '*.example.co.uk'],
+        'a.github.io': ['a.github.io'],
+        'b.github.io': ['b.github.io'],
+        'example.com': ['example.com'],
+    }
+
+def test_private_rules_can_be_excluded():
+    lines = ['// ===BEGIN ICANN DOMAINS===', 'io', '// ===BEGIN PRIVATE DOMAINS===', 'github.io']
+    assert PublicSuffixTrie.from_lines(lines, include_private=False).registrable_domain('a.github.io') == 'github.io'
+    assert PublicSuffixTrie.from_lines(lines).registrable_domain('a.github.io') == 'a.github.io'
+
+def test_compiled_cache_is_rebuilt_when_the_list_changes(tmp_path):
+    list_path, cache_path = tmp_path / 'list.dat', tmp_path / 'list.json'
+    list_path.write_text('com\n')
+    assert load_trie(str(list_path), str(cache_path)).registrable_domain('a.b.com') == 'b.com'
+    digest = json.loads(cache_path.read_text())['source_sha256']
+    list_path.write_text('com\nb.com\n')
+    assert load_trie(str(list_path), str(cache_path)).registrable_domain('a.b.com') == 'a.b.com'
+    assert json.loads(cache_path.read_text())['source_sha256'] != digest
@@ -0,0 +1,120 @@
+"""Expiry and purge behaviour shared by the SQLite and in-memory storage backends"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import (
+    SQLiteSessionStore, MemorySessionStore, SQLiteChallengeTable, MemoryChallengeTable,
+    SQLiteDownloadRegistry, MemoryDownloadRegistry, SQLiteArtifactStore, MemoryArtifactStore,
+    SQLiteInflightOrders, MemoryInflightOrders, SQLiteOCSPCache, MemoryOCSPCache
+)
+
+PAST = datetime.now() - timedelta(minutes=1)
+FUTURE = datetime.now() + timedelta(hours=1)
+
+def _backends(sqlite_class, memory_class):
+    return pytest.mark.parametrize('backend', ['sqlite', 'memory'], ids=[sqlite_class.__name__, memory_class.__name__])
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'state.db')
+
+@_backends(SQLiteSessionStore, MemorySessionStore)
+def test_session_store_expiry(backend, db_path):
+    store = SQLiteSessionStore(db_path) if backend == 'sqlite' else MemorySessionStore()
+    store.put('live', {'domains': ['a.example.com']}, FUTURE)
+    store.put('stale', {'domains': ['b.example.com']}, PAST)
+    assert store.oldest_expiry() <= PAST + timedelta(seconds=1)
+    assert store.purge_expired() == 1
+    assert store.purge_expired() == 0
+    assert store.get('stale') is None
+    assert list(store.items()) == ['live']
+    assert store.oldest_expiry() > datetime.now()
+
+@_backends(SQLiteChallengeTable, MemoryChallengeTable)
+def test_challenge_table_expiry(backend, db_path):
+    table = SQLiteChallengeTable(db_path) if backend == 'sqlite' else MemoryChallengeTable()
+    challenge = {'type': 'http-01', 'domain': 'a.example.com', 'token': 'tok', 'url': 'https://ca/chall/1',
+                 'file_content': 'tok.thumb'}
+    table.put_many('expired', [challenge], PAST)
+    table.put_many('live', [dict(challenge, token='tok2', domain='b.example.com')], FUTURE)
+    assert table.list('expired') == []
+    assert table.key_authorization('tok', 'a.example.com') is None
+    assert table.purge_expired() == 1
+    assert table.key_authorization('tok2', 'b.example.com') == 'tok.thumb'
+    assert table.delete('live') == 1
+    assert table.oldest_expiry() is None
+
+@_backends(SQLiteDownloadRegistry, MemoryDownloadRegistry)
+def test_download_registry_pops_expired_once(backend, db_path):
+    registry = SQLiteDownloadRegistry(db_path) if backend == 'sqlite' else MemoryDownloadRegistry()
+    stale = registry.register({'files': {}, 'expires': PAST, 'domain': 'a.example.com'})
+    live = registry.register({'files': {}, 'expires': FUTURE, 'domain': 'b.example.com'})
+    assert registry.get(stale) is None
+    assert [entry['domain'] for entry in registry.pop_expired()] == ['a.example.com']
+    assert registry.pop_expired() == []
+    assert registry.get(live)['domain'] == 'b.example.com'
+    assert registry.delete(live)['domain'] == 'b.example.com'
+    assert registry.get(live) is None
+
+@_backends(SQLiteArtifactStore, MemoryArtifactStore)
+def test_artifact_store_purge_and_quota(backend, db_path, tmp_path):
+    root = str(tmp_path / 'artifacts')
+    store = SQLiteArtifactStore(db_path, root, 300) if backend == 'sqlite' else MemoryArtifactStore(root, 300)
+    stale, paths = store.save({'certificate': b'c' * 50, 'private_key': b'k' * 50}, PAST)
+    assert os.stat(paths['private_key']).st_mode & 0o777 == 0o600
+    assert os.stat(paths['certificate']).st_mode & 0o777 == 0o644
+    assert store.purge_expired() == 1
+    assert not os.path.exists(os.path.join(root, stale))
+
+    oldest, _ = store.save({'certificate': b'c' * 100}, FUTURE)
+    newest, _ = store.save({'certificate': b'c' * 100}, FUTURE)
+    store.touch(oldest)
+    # Over quota: the least recently used artifact goes first
+    third, _ = store.save({'certificate': b'c' * 150}, FUTURE)
+    assert os.path.isdir(os.path.join(root, oldest)) and not os.path.exists(os.path.join(root, newest))
+    assert store.stats()['evicted'] == 1 and store.usage() == (2, 250)
+    with pytest.raises(OSError):
+        store.save({'certificate': b'c' * 301}, FUTURE)
+    assert store.remove(third) and not store.remove(third)
+
+def test_artifact_store_sweeps_orphans(db_path, tmp_path):
+    root = tmp_path / 'artifacts'
+    store = SQLiteArtifactStore(db_path, str(root), 1000)
+    kept, _ = store.save({'certificate': b'c'}, FUTURE)
+    orphan = root / 'ab'
+    orphan.mkdir()
+    (orphan / 'private.key').write_bytes(b'k')
+    old = time.time() - 120
+    os.utime(orphan, (old, old))
+    assert store.sweep_orphans() == 1
+    assert not orphan.exists() and (root / kept).is_dir()
+
+@_backends(SQLiteInflightOrders, MemoryInflightOrders)
+def test_inflight_orders_lapse(backend, db_path):
+    orders = SQLiteInflightOrders(db_path) if backend == 'sqlite' else MemoryInflightOrders()
+    assert orders.claim('key', lease=60) == (True, None)
+    assert orders.claim('key', lease=60) == (False, None)
+    orders.publish('key', 'request-1', FUTURE)
+    assert orders.claim('key', lease=60) == (False, 'request-1')
+    orders.publish('key', 'request-1', PAST)
+    assert orders.purge_expired() == 1
+    # A claim whose leader never published lapses after its lease
+    assert orders.claim('key', lease=0) == (True, None)
+    assert orders.claim('key', lease=60) == (True, None)
+
+@_backends(SQLiteOCSPCache, MemoryOCSPCache)
+def test_ocsp_cache_expiry(backend, db_path):
+    cache = SQLiteOCSPCache(db_path) if backend == 'sqlite' else MemoryOCSPCache()
+    now = time.time()
+    cache.put_certificate('stale', b'chain', 'http://ocsp', now - 1)
+    cache.put_certificate('live', b'chain', 'http://ocsp', now + 3600)
+    assert cache.get('stale') is None
+    assert [entry['key'] for entry in cache.claim_due(now + 1, lease=60)] == ['live']
+    # Claimed entries are rescheduled, so a second caller gets nothing until the lease ends
+    assert cache.claim_due(now + 1, lease=60) == []
+    assert [entry['key'] for entry in cache.claim_due(now + 61, lease=60)] == ['live']
+    assert cache.purge_expired() == 1
+    assert cache.oldest_expiry() > datetime.now()
@@ -0,0 +1,211 @@
+"""Minimal in-memory ACME server for local load tests and development.
+
+It implements just enough of RFC 8555 for RealACMEClient: directory, nonces,
+accounts, orders, authorizations, challenges, finalization and certificate
+download. JWS signatures are not checked and every challenge becomes valid
+as soon as it is signalled, so no DNS or HTTP-01 reachability is needed.
+Certificates are signed by a throwaway CA generated at startup, which also
+answers OCSP requests for them at /ocsp (GET and POST, RFC 6960).
+
+    python tools/fake_acme.py --port 14000
+    ACME_BASE_URL=http://127.0.0.1:14000 gunicorn app:app
+"""
+import json
+import time
+import base64
+import argparse
+import binascii
+import datetime
+import itertools
+import threading
+
+from urllib.parse import unquote
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server
+from cryptography import x509
+from cryptography.x509 import ocsp
+from cryptography.x509.oid import NameOID, AuthorityInformationAccessOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _self_signed_ca():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Fake ACME Test CA')])
+    now = datetime.datetime.utcnow()
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=3650))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    return key, cert
+
+def create_fake_acme_app(base_url: str, latency: float = 0.0, ocsp_validity: float = 86400.0) -> Flask:
+    """Build the fake CA; latency adds a fixed delay to every response to mimic CA round trips.
+
+    OCSP responses are valid for ocsp_validity seconds. Serials added to
+    app.revoked_serials are reported as revoked.
+    """
+    app = Flask('fake_acme')
+    ids = itertools.count(1)
+    lock = threading.Lock()
+    orders, authorizations, challenges, certificates = {}, {}, {}, {}
+    issued, revoked_serials = {}, set()
+    ca_key, ca_cert = _self_signed_ca()
+    ca_pem = ca_cert.public_bytes(serialization.Encoding.PEM)
+
+    def next_id() -> str:
+        with lock:
+            return str(next(ids))
+
+    def jws_payload() -> dict:
+        payload = request.get_json(force=True)['payload']
+        return json.loads(_b64decode(payload)) if payload else {}
+
+    def with_nonce(response, status=200):
+        response.status_code = status
+        response.headers['Replay-Nonce'] = f"nonce-{next_id()}"
+        return response
+
+    @app.before_request
+    def simulate_latency():
+        if latency:
+            time.sleep(latency)
+
+    @app.route('/directory')
+    def directory():
+        return jsonify(newNonce=f"{base_url}/new-nonce", newAccount=f"{base_url}/new-account",
+                       newOrder=f"{base_url}/new-order")
+
+    @app.route('/new-nonce', methods=['HEAD', 'GET'])
+    def new_nonce():
+        return with_nonce(app.response_class(''))
+
+    @app.route('/new-account', methods=['POST'])
+    def new_account():
+        jws_payload()
+        response = with_nonce(jsonify(status='valid'), 201)
+        response.headers['Location'] = f"{base_url}/account/{next_id()}"
+        return response
+
+    @app.route('/new-order', methods=['POST'])
+    def new_order():
+        identifiers = jws_payload()['identifiers']
+        order_id = next_id()
+        authorization_urls = []
+        for identifier in identifiers:
+            authz_id = next_id()
+            authz_challenges = []
+            for challenge_type in ('http-01', 'dns-01'):
+                challenge_id = next_id()
+                challenges[challenge_id] = {
+                    'type': challenge_type, 'url': f"{base_url}/challenge/{challenge_id}",
+                    'token': f"token-{challenge_id}", 'status': 'pending'
+                }
+                authz_challenges.append(challenges[challenge_id])
+            authorizations[authz_id] = {'identifier': identifier, 'status': 'pending', 'challenges': authz_challenges}
+            authorization_urls.append(f"{base_url}/authz/{authz_id}")
+        orders[order_id] = {
+            'status': 'pending', 'identifiers': identifiers, 'authorizations': authorization_urls,
+            'finalize': f"{base_url}/order/{order_id}/finalize"
+        }
+        response = with_nonce(jsonify(orders[order_id]), 201)
+        response.headers['Location'] = f"{base_url}/order/{order_id}"
+        return response
+
+    @app.route('/authz/<authz_id>')
+    def authorization(authz_id):
+        return jsonify(authorizations[authz_id])
+
+    @app.route('/challenge/<challenge_id>', methods=['GET', 'POST'])
+    def challenge(challenge_id):
+        if request.method == 'POST':
+            jws_payload()
+            challenges[challenge_id]['status'] = 'valid'
+        return with_nonce(jsonify(challenges[challenge_id]))
+
+    @app.route('/order/<order_id>')
+    def order(order_id):
+        return jsonify(orders[order_id])
+
+    @app.route('/order/<order_id>/finalize', methods=['POST'])
+    def finalize(order_id):
+        csr = x509.load_der_x509_csr(_b64decode(jws_payload()['csr']))
+        now = datetime.datetime.utcnow()
+        cert = (x509.CertificateBuilder().subject_name(csr.subject).issuer_name(ca_cert.subject)
+                .public_key(csr.public_key()).serial_number(x509.random_serial_number())
+                .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=90))
+                .add_extension(csr.extensions.get_extension_for_class(x509.SubjectAlternativeName).value,
+                               critical=False)
+                .add_extension(x509.AuthorityInformationAccess([x509.AccessDescription(
+                    AuthorityInformationAccessOID.OCSP, x509.UniformResourceIdentifier(f"{base_url}/ocsp")
+                )]), critical=False)
+                .sign(ca_key, hashes.SHA256()))
+        issued[cert.serial_number] = cert
+        certificates[order_id] = cert.public_bytes(serialization.Encoding.PEM) + ca_pem
+        orders[order_id].update(status='valid', certificate=f"{base_url}/certificate/{order_id}")
+        return with_nonce(jsonify(orders[order_id]))
+
+    @app.route('/certificate/<order_id>')
+    def certificate(order_id):
+        return app.response_class(certificates[order_id], mimetype='application/pem-certificate-chain')
+
+    @app.route('/ocsp', methods=['POST'])
+    @app.route('/ocsp/<path:encoded>')
+    def ocsp_responder(encoded=None):
+        try:
+            der = request.get_data() if encoded is None else base64.b64decode(unquote(encoded))
+            ocsp_request = ocsp.load_der_ocsp_request(der)
+        except (ValueError, binascii.Error):
+            return ocsp_response(ocsp.OCSPResponseBuilder.build_unsuccessful(ocsp.OCSPResponseStatus.MALFORMED_REQUEST))
+        cert = issued.get(ocsp_request.serial_number)
+        if cert is None:
+            return ocsp_response(ocsp.OCSPResponseBuilder.build_unsuccessful(ocsp.OCSPResponseStatus.UNAUTHORIZED))
+        now = datetime.datetime.utcnow().replace(microsecond=0)
+        revoked = cert.serial_number in revoked_serials
+        builder = ocsp.OCSPResponseBuilder().add_response(
+            cert=cert, issuer=ca_cert, algorithm=hashes.SHA1(),
+            cert_status=ocsp.OCSPCertStatus.REVOKED if revoked else ocsp.OCSPCertStatus.GOOD,
+            this_update=now, next_update=now + datetime.timedelta(seconds=ocsp_validity),
+            revocation_time=now if revoked else None,
+            revocation_reason=x509.ReasonFlags.unspecified if revoked else None
+        ).responder_id(ocsp.OCSPResponderEncoding.HASH, ca_cert)
+        return ocsp_response(builder.sign(ca_key, hashes.SHA256()))
+
+    def ocsp_response(response):
+        return app.response_class(response.public_bytes(serialization.Encoding.DER),
+                                  mimetype='application/ocsp-response')
+
+    app.ca_certificate = ca_cert
+    app.ca_key = ca_key
+    app.revoked_serials = revoked_serials
+    return app
+
+def start_fake_acme(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, ocsp_validity: float = 86400.0):
+    """Serve the fake CA on a background thread; returns (base_url, server)"""
+    server = make_server(host, port, None, threaded=True)
+    base_url = f"http://{host}:{server.server_port}"
+    server.app = create_fake_acme_app(base_url, latency, ocsp_validity)
+    threading.Thread(target=server.serve_forever, name='fake-acme', daemon=True).start()
+    return base_url, server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a minimal in-memory ACME server for local testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=14000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every response')
+    parser.add_argument('--ocsp-validity', type=float, default=86400.0, help='Seconds each OCSP response is valid')
+    args = parser.parse_args(argv)
+
+    base_url, server = start_fake_acme(args.host, args.port, args.latency_ms / 1000.0, args.ocsp_validity)
+    print(f"Fake ACME directory at {base_url}/directory (ACME_BASE_URL={base_url})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
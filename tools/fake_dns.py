@@ -0,0 +1,120 @@
+"""Minimal authoritative DNS server for tests and local development.
+
+Answers UDP queries from in-memory zones. Records are added with
+add(name, rdtype, ttl, *rdata); a name under a zone that has no records at
+all is NXDOMAIN, and one that has records of other types is NODATA. Both
+negative answers carry the zone's SOA in the authority section, so they
+are cached for its RFC 2308 negative TTL. Names listed in `failing` get
+SERVFAIL, and every query is counted, so tests can tell cache hits from
+lookups.
+
+    python tools/fake_dns.py --port 15353 --zone example.com
+    DNS_NAMESERVERS=127.0.0.1 DNS_PORT=15353 flask run
+"""
+import time
+import argparse
+import threading
+import socketserver
+from collections import Counter
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+class FakeDNSServer(socketserver.ThreadingUDPServer):
+    """Threaded UDP server, so a `latency` delay overlaps across concurrent queries"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        super().__init__((host, port), _Handler)
+        self.port = self.server_address[1]
+        self.latency = latency
+        # zone -> SOA rrset returned with negative answers
+        self.zones = {}
+        # (name, rdtype) -> rrset
+        self.records = {}
+        self.failing = set()
+        self.queries = Counter()
+        self._lock = threading.Lock()
+
+    def add_zone(self, zone: str, ttl: int = 3600, minimum: int = 300):
+        zone = _absolute(zone)
+        self.zones[zone] = dns.rrset.from_text(
+            zone, ttl, 'IN', 'SOA', f"ns.{zone} hostmaster.{zone} 1 7200 900 1209600 {minimum}"
+        )
+
+    def add(self, name: str, rdtype: str, ttl: int, *rdata: str):
+        name = _absolute(name)
+        self.records[(name, rdtype.upper())] = dns.rrset.from_text(name, ttl, 'IN', rdtype, *rdata)
+
+    def answer(self, query: dns.message.Message) -> dns.message.Message:
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        question = query.question[0]
+        name = question.name.to_text().lower()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        with self._lock:
+            self.queries[(name.rstrip('.'), rdtype)] += 1
+        if name.rstrip('.') in self.failing:
+            response.set_rcode(dns.rcode.SERVFAIL)
+            return response
+        zone = next((z for z in self.zones if name == z or name.endswith('.' + z)), None)
+        if zone is None:
+            response.set_rcode(dns.rcode.REFUSED)
+            return response
+        rrset = self.records.get((name, rdtype))
+        if rrset is not None:
+            response.answer.append(rrset)
+            return response
+        if name != zone and not any(owner == name for owner, _ in self.records):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        response.authority.append(self.zones[zone])
+        return response
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        sock.sendto(self.server.answer(query).to_wire(), self.client_address)
+
+def _absolute(name: str) -> str:
+    return name.lower().rstrip('.') + '.'
+
+def start_fake_dns(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0) -> FakeDNSServer:
+    """Serve on a background thread; returns the server (its port is server.port)"""
+    server = FakeDNSServer(host, port, latency)
+    threading.Thread(target=server.serve_forever, name='fake-dns', daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a minimal authoritative DNS server for local testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=15353)
+    parser.add_argument('--zone', action='append', default=[], help='Zone to answer for (repeatable)')
+    parser.add_argument('--record', action='append', default=[],
+                        help="'name ttl type rdata', e.g. 'www.example.com 300 A 127.0.0.1' (repeatable)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every answer')
+    args = parser.parse_args(argv)
+
+    server = start_fake_dns(args.host, args.port, args.latency_ms / 1000.0)
+    for zone in args.zone:
+        server.add_zone(zone)
+    for record in args.record:
+        name, ttl, rdtype, rdata = record.split(None, 3)
+        server.add(name, rdtype, int(ttl), rdata)
+    print(f"Fake DNS on {args.host}:{server.port} (DNS_NAMESERVERS={args.host} DNS_PORT={server.port})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Cold-start import profiler.
+
+Runs `python -X importtime` on a module in a fresh interpreter and reports
+where the import time goes. With --budget-ms or --forbid it exits non-zero
+when the cold import is too slow or pulls in a stack that should load lazily,
+so CI can guard the serverless cold start:
+
+    python tools/importtime.py app --budget-ms 400 --forbid cryptography --forbid dns
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ImportEntry:
+    """One line of -X importtime output"""
+
+    __slots__ = ('name', 'depth', 'self_us', 'cumulative_us')
+
+    def __init__(self, name: str, depth: int, self_us: int, cumulative_us: int):
+        self.name = name
+        self.depth = depth
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+
+MARKER = '-- importtime start --'
+
+def parse_importtime(output: str) -> List[ImportEntry]:
+    """Parse -X importtime stderr into entries, skipping interpreter start-up before the marker"""
+    entries = []
+    lines = output.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        # Names are indented by two spaces per nesting level after one separator space
+        name = fields[2].rstrip()
+        stripped = name.lstrip(' ')
+        entries.append(ImportEntry(stripped, (len(name) - len(stripped) - 1) // 2,
+                                   int(fields[0]), int(fields[1])))
+    return entries
+
+def total_us(entries: List[ImportEntry]) -> int:
+    """Wall time of the measured import: the sum of its top-level entries"""
+    return sum(e.cumulative_us for e in entries if e.depth == 0)
+
+def measure(module: str, env: Optional[Dict[str, str]] = None) -> Tuple[List[ImportEntry], List[str]]:
+    """Import module in a fresh interpreter; returns (importtime entries, loaded module names)"""
+    code = (f"import sys, json; sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush(); "
+            f"import {module}; print(json.dumps(sorted(sys.modules)))")
+    run_env = dict(os.environ, **(env or {}))
+    run_env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, run_env.get('PYTHONPATH')]))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=run_env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr), json.loads(proc.stdout.strip().splitlines()[-1])
+
+def report(module: str, runs: int = 3, top: int = 15) -> Dict:
+    """Measure module over several cold runs and keep the fastest, which is the least noisy"""
+    best = None
+    for _ in range(max(1, runs)):
+        entries, loaded = measure(module)
+        if best is None or total_us(entries) < total_us(best[0]):
+            best = (entries, loaded)
+    entries, loaded = best
+    by_cumulative = sorted(entries, key=lambda e: e.cumulative_us, reverse=True)
+    by_self = sorted(entries, key=lambda e: e.self_us, reverse=True)
+    return {
+        'module': module,
+        'total_ms': round(total_us(entries) / 1000, 1),
+        'modules_imported': len(entries),
+        'top_cumulative': [{'name': e.name, 'ms': round(e.cumulative_us / 1000, 1)} for e in by_cumulative[:top]],
+        'top_self': [{'name': e.name, 'ms': round(e.self_us / 1000, 1)} for e in by_self[:top]],
+        'loaded': loaded,
+    }
+
+def forbidden_loaded(loaded: List[str], forbidden: List[str]) -> List[str]:
+    """Forbidden packages (or any of their submodules) present after the import"""
+    return [name for name in forbidden
+            if any(m == name or m.startswith(name + '.') for m in loaded)]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Report cold import time and enforce a budget')
+    parser.add_argument('module', nargs='?', default='app', help='Module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=3, help='Cold runs; the fastest is reported')
+    parser.add_argument('--top', type=int, default=15, help='How many modules to list')
+    parser.add_argument('--budget-ms', type=float, help='Fail if the cold import takes longer')
+    parser.add_argument('--forbid', action='append', default=[], metavar='PACKAGE',
+                        help='Fail if this package is imported at cold start (repeatable)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    result = report(args.module, args.runs, args.top)
+    violations = forbidden_loaded(result['loaded'], args.forbid)
+    over_budget = args.budget_ms is not None and result['total_ms'] > args.budget_ms
+
+    if args.json:
+        output = {k: v for k, v in result.items() if k != 'loaded'}
+        output.update({'budget_ms': args.budget_ms, 'forbidden_loaded': violations})
+        print(json.dumps(output, indent=2))
+    else:
+        print(f"import {result['module']}: {result['total_ms']} ms across {result['modules_imported']} modules")
+        print('\nSlowest by cumulative time:')
+        for item in result['top_cumulative']:
+            print(f"  {item['ms']:>8.1f} ms  {item['name']}")
+        print('\nSlowest by self time:')
+        for item in result['top_self']:
+            print(f"  {item['ms']:>8.1f} ms  {item['name']}")
+        if args.budget_ms is not None:
+            print(f"\nBudget: {args.budget_ms} ms ({'EXCEEDED' if over_budget else 'ok'})")
+        for name in violations:
+            print(f"Forbidden at cold start: {name}")
+
+    return 1 if over_budget or violations else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Bulk certificate and key audit.
+
+Inspects PEM, DER and PKCS#12 files, and ZIP archives of them, for expiry,
+SAN coverage, certificate/key matches and chain order, like POST
+/api/inspect. Files are parsed in a process pool; with --cache the parse
+results are kept by content hash, so re-auditing unchanged bundles is instant.
+Exits 1 when the audit finds a problem:
+
+    python tools/inspect_certs.py certs/*.pem bundle.zip --hostname www.example.com --cache .inspect-cache.json
+"""
+import os
+import sys
+import json
+import argparse
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Summary counters that fail the audit
+PROBLEMS = ('expired', 'not_yet_valid', 'keys_without_certificate', 'leaves_without_key',
+            'misordered_chains', 'files_with_errors', 'uncovered_hostnames')
+
+def print_report(report: Dict):
+    for entry in report['files']:
+        print(f"{entry['name']}  ({entry['format']}, {entry['size']} bytes)")
+        for cert in entry['certificates']:
+            kind = 'CA  ' if cert['ca'] else 'leaf'
+            key = '' if cert['ca'] else ('  key: found' if cert['key_found'] else '  key: MISSING')
+            print(f"  {kind} {cert['subject']}  {cert['status']} ({cert['expires_in_days']} days){key}")
+            if cert['names'] and not cert['ca']:
+                print(f"       SAN: {', '.join(cert['names'])}")
+        for key in entry['keys']:
+            matched = f"{len(key['certificates'])} certificate(s)" if key['certificates'] else 'NO certificate'
+            print(f"  key  {key['key_type']} matches {matched}")
+        for problem in entry['chain']['problems']:
+            print(f"  chain: {problem}")
+        for error in entry['errors']:
+            print(f"  error: {error}")
+    for hostname, matches in report['hostnames'].items():
+        covered = [m for m in matches if m['status'] in ('valid', 'expiring')]
+        print(f"{hostname}: {'covered by ' + str(len(covered)) if covered else 'NOT covered'}")
+    summary = report['summary']
+    print('\n' + ', '.join(f"{name}={value}" for name, value in summary.items()))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Audit certificate and key files')
+    parser.add_argument('paths', nargs='+', help='PEM/DER/PKCS#12 files or ZIP archives')
+    parser.add_argument('--hostname', action='append', default=[], help='Check SAN coverage (repeatable)')
+    parser.add_argument('--warn-days', type=float, default=30.0, help='Flag certificates expiring sooner')
+    parser.add_argument('--workers', type=int, help='Parsing processes (default: one per CPU)')
+    parser.add_argument('--cache', help='JSON file keeping parse results between runs')
+    parser.add_argument('--max-files', type=int, default=100000, help='Refuse larger audits')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    from services import CertificateInspector, expand_uploads
+
+    uploads = []
+    for path in args.paths:
+        with open(path, 'rb') as f:
+            uploads.append((path, f.read()))
+    try:
+        files = expand_uploads(uploads, args.max_files, sys.maxsize)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    inspector = CertificateInspector(args.workers, cache_entries=sys.maxsize)
+    if args.cache and os.path.exists(args.cache):
+        with open(args.cache, encoding='utf-8') as f:
+            inspector.import_cache(json.load(f))
+    report = inspector.inspect(files, args.hostname, args.warn_days)
+    if args.cache:
+        with open(args.cache, 'w', encoding='utf-8') as f:
+            json.dump(inspector.export_cache(), f)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if any(report['summary'][name] for name in PROBLEMS) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Load generator for the full web flow.
+
+Virtual users loop over weighted scenarios with realistic form posts:
+
+- demo: POST /generate_ssl (demo) then GET /download/<id>/{certificate,private_key,ca_bundle}
+- real: POST /generate_ssl (real) -> GET /download_challenge/<request>/<domain>
+        -> POST /verify_challenges/<request> -> GET /download/<id>/certificate
+
+Run against an app you started yourself (pointed at tools/fake_acme.py with
+ACME_BASE_URL, and with RATE_LIMIT_ENABLED=false and CAA_CHECK_ENABLED=false),
+or let --spawn start the fake CA and a gunicorn server:
+
+    python tools/loadtest.py --spawn --workers 4 --users 50 --ramp 10 --duration 60
+    python tools/loadtest.py --target http://127.0.0.1:5001 --mix demo=1,real=1 --json results.json
+"""
+import os
+import re
+import sys
+import time
+import json
+import random
+import logging
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FILE_ID = re.compile(r'/download/([^/"]+)/certificate')
+_REQUEST_ID = re.compile(r'/verify_challenges/([^/"]+)"')
+
+class RouteStats:
+    """Latency samples and error counts for one route"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = Counter()
+        self.bytes = 0
+
+    def record(self, latency: float, error: Optional[str], size: int = 0):
+        self.latencies.append(latency)
+        self.bytes += size
+        if error:
+            self.errors[error] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        errors = sum(self.errors.values())
+        return {
+            'requests': len(ordered),
+            'errors': errors,
+            'error_rate': errors / len(ordered) if ordered else 0.0,
+            'throughput_rps': len(ordered) / elapsed if elapsed else 0.0,
+            'latency_ms': {name: _percentile(ordered, q) * 1000
+                           for name, q in (('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99), ('max', 100))},
+            'error_breakdown': dict(self.errors.most_common()),
+            'bytes': self.bytes,
+        }
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.4999)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class ScenarioFailed(Exception):
+    """Aborts the rest of a scenario iteration once one of its steps failed"""
+
+class LoadTest:
+    """Drives concurrent virtual users against a running instance of the app"""
+
+    def __init__(self, target: str, users: int = 10, ramp: float = 0.0, duration: float = 30.0,
+                 mix: Optional[Dict[str, float]] = None, think_time: float = 0.0, timeout: float = 60.0,
+                 domains_per_order: int = 2):
+        self.target = target.rstrip('/')
+        self.users = users
+        self.ramp = ramp
+        self.duration = duration
+        self.mix = mix or {'demo': 1.0}
+        self.think_time = think_time
+        self.timeout = timeout
+        self.domains_per_order = domains_per_order
+        self.stats: Dict[str, RouteStats] = {}
+        self.iterations = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scenarios: Dict[str, Callable] = {'demo': self._demo, 'real': self._real}
+        unknown = set(self.mix) - set(self._scenarios)
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    def run(self) -> Dict:
+        threads = [threading.Thread(target=self._user, args=(index,), name=f"vu-{index}", daemon=True)
+                   for index in range(self.users)]
+        started = time.perf_counter()
+        for index, thread in enumerate(threads):
+            # Users start evenly spread over the ramp period
+            delay = started + self.ramp * index / max(1, self.users) - time.perf_counter()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            thread.start()
+        self._stop.wait(max(0.0, self.duration - (time.perf_counter() - started)))
+        self._stop.set()
+        for thread in threads:
+            if thread.ident is not None:
+                thread.join(self.timeout)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        total = RouteStats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.errors.update(stats.errors)
+            total.bytes += stats.bytes
+        return {
+            'target': self.target,
+            'users': self.users,
+            'ramp_seconds': self.ramp,
+            'elapsed_seconds': elapsed,
+            'iterations': dict(self.iterations),
+            'total': total.summary(elapsed),
+            'routes': {route: stats.summary(elapsed) for route, stats in sorted(self.stats.items())},
+        }
+
+    def _user(self, index: int):
+        session = requests.Session()
+        names, weights = zip(*self.mix.items())
+        iteration = 0
+        while not self._stop.is_set():
+            scenario = random.choices(names, weights)[0]
+            try:
+                self._scenarios[scenario](session, f"u{index}-{iteration}")
+                outcome = scenario
+            except ScenarioFailed:
+                outcome = f"{scenario} (failed)"
+            with self._lock:
+                self.iterations[outcome] += 1
+            iteration += 1
+            if self.think_time:
+                self._stop.wait(random.uniform(0.5, 1.5) * self.think_time)
+
+    def _request(self, session: requests.Session, route: str, method: str, path: str,
+                 expect: int = 200, **kwargs) -> requests.Response:
+        error = None
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.target + path, timeout=self.timeout,
+                                        allow_redirects=False, **kwargs)
+            body = response.content
+            if response.status_code != expect:
+                error = f"HTTP {response.status_code}"
+                if response.is_redirect:
+                    error += f" -> {response.headers.get('Location', '?')}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+            body = b''
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.stats.setdefault(route, RouteStats()).record(latency, error, len(body))
+        if error:
+            raise ScenarioFailed(error)
+        return response
+
+    def _form(self, tag: str, cert_type: str) -> Dict:
+        domains = [f"{label}.{tag}.loadtest.example.com" for label in ('www', 'api', 'app', 'cdn')]
+        return {
+            'domains': ', '.join(domains[:self.domains_per_order]),
+            'email': f"{tag}@loadtest.example.com",
+            'validation_method': 'http',
+            'cert_type': cert_type,
+            'accept_agreement': 'on',
+        }
+
+    def _match(self, route: str, pattern, response: requests.Response) -> str:
+        match = pattern.search(response.text)
+        if match is None:
+            # The page rendered without the expected link, usually because of a flashed error
+            with self._lock:
+                self.stats[route].errors['missing link in page'] += 1
+            raise ScenarioFailed('missing link in page')
+        return match.group(1)
+
+    def _demo(self, session: requests.Session, tag: str):
+        response = self._request(session, 'POST /generate_ssl [demo]', 'POST', '/generate_ssl',
+                                 data=self._form(tag, 'demo'))
+        file_id = self._match('POST /generate_ssl [demo]', _FILE_ID, response)
+        for file_type in ('certificate', 'private_key', 'ca_bundle'):
+            self._request(session, f"GET /download/<id>/{file_type}", 'GET', f"/download/{file_id}/{file_type}")
+
+    def _real(self, session: requests.Session, tag: str):
+        form = self._form(tag, 'real')
+        response = self._request(session, 'POST /generate_ssl [real]', 'POST', '/generate_ssl', data=form)
+        request_id = self._match('POST /generate_ssl [real]', _REQUEST_ID, response)
+        for domain in form['domains'].split(', '):
+            self._request(session, 'GET /download_challenge', 'GET', f"/download_challenge/{request_id}/{domain}")
+        response = self._request(session, 'POST /verify_challenges', 'POST', f"/verify_challenges/{request_id}")
+        file_id = self._match('POST /verify_challenges', _FILE_ID, response)
+        self._request(session, 'GET /download/<id>/certificate', 'GET', f"/download/{file_id}/certificate")
+
+def print_report(report: Dict):
+    print(f"\n{report['users']} users against {report['target']} for {report['elapsed_seconds']:.1f}s; "
+          f"iterations: {report['iterations']}")
+    header = f"{'route':<36} {'reqs':>7} {'err%':>6} {'rps':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['routes'].items()) + [('TOTAL', report['total'])]
+    for route, summary in rows:
+        latency = summary['latency_ms']
+        print(f"{route:<36} {summary['requests']:>7} {summary['error_rate'] * 100:>5.1f}% "
+              f"{summary['throughput_rps']:>8.1f} {latency['p50']:>7.0f}ms {latency['p90']:>6.0f}ms "
+              f"{latency['p95']:>6.0f}ms {latency['p99']:>6.0f}ms {latency['max']:>6.0f}ms")
+    errors = [(route, error, count) for route, summary in report['routes'].items()
+              for error, count in summary['error_breakdown'].items()]
+    if errors:
+        print('\nErrors:')
+        for route, error, count in errors:
+            print(f"  {count:>6}  {route}: {error}")
+
+def spawn_app(workers: int, port: int, acme_latency: float):
+    """Start the fake CA in this process and the app under gunicorn; returns (target, process, work_dir)"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from fake_acme import start_fake_acme
+
+    # Per-request access logs from the fake CA would drown the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    acme_url, _ = start_fake_acme(latency=acme_latency)
+    work_dir = tempfile.mkdtemp(prefix='sdts-loadtest-')
+    env = dict(os.environ,
+               ACME_BASE_URL=acme_url,
+               UPLOAD_FOLDER=work_dir,
+               STATE_DB_PATH=os.path.join(work_dir, 'state.db'),
+               RATE_LIMIT_ENABLED='false',
+               CAA_CHECK_ENABLED='false',
+               SESSION_SECRET=os.environ.get('SESSION_SECRET', 'loadtest'),
+               FLASK_CONFIG=os.environ.get('FLASK_CONFIG', 'production'))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f"127.0.0.1:{port}",
+         '--workers', str(workers), '--timeout', '120', '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    target = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            if requests.get(f"{target}/health", timeout=2).status_code == 200:
+                return target, process, work_dir
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError('gunicorn did not become healthy within 60 seconds')
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test the SSL generator web flow')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--target', help='Base URL of a running app')
+    target.add_argument('--spawn', action='store_true', help='Start the fake CA and gunicorn locally')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --spawn')
+    parser.add_argument('--port', type=int, default=5099, help='gunicorn port with --spawn')
+    parser.add_argument('--acme-latency-ms', type=float, default=0.0, help='Fake CA response delay with --spawn')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--ramp', type=float, default=0.0, help='Seconds over which users are started')
+    parser.add_argument('--duration', type=float, default=30.0, help='Total test length in seconds')
+    parser.add_argument('--mix', default='demo=1', help='Scenario weights, e.g. demo=3,real=1')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between iterations')
+    parser.add_argument('--domains', type=int, default=2, help='Domains per order (1-4)')
+    parser.add_argument('--json', help='Write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    process = work_dir = None
+    if args.spawn:
+        target_url, process, work_dir = spawn_app(args.workers, args.port, args.acme_latency_ms / 1000.0)
+    else:
+        target_url = args.target
+    try:
+        test = LoadTest(target_url, users=args.users, ramp=args.ramp, duration=args.duration,
+                        mix=_parse_mix(args.mix), think_time=args.think_time,
+                        domains_per_order=max(1, min(4, args.domains)))
+        report = test.run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,392 @@
+import os
+import re
+import json
+import time
+import queue
+import random
+import secrets
+import logging
+import threading
+import contextvars
+from functools import wraps
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'sdts-ssl-generator'
+
+# W3C trace context header: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+class Span:
+    """One timed operation; children share its trace_id and name it as parent"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'links', 'start', 'duration',
+                 'error', 'local_root', '_started')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None, links: Optional[List[Dict]] = None, local_root: bool = True):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.links = links or []
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        # First span of this trace in this process (a request, a background job)
+        self.local_root = local_root
+        self._started = time.perf_counter()
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict:
+        record = {
+            'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'name': self.name, 'start': round(self.start, 6), 'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes, 'pid': os.getpid(),
+        }
+        if self.links:
+            record['links'] = self.links
+        if self.error:
+            record['error'] = self.error
+        return record
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is off or the trace was not sampled"""
+
+    __slots__ = ()
+    trace_id = None
+    span_id = None
+
+    def set(self, key: str, value):
+        pass
+
+class _NoopContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NOOP_SPAN
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = _NoopContext()
+
+# The span code is running under; _NOOP_SPAN marks an unsampled trace so its children are skipped too
+_current: contextvars.ContextVar = contextvars.ContextVar('sdts_current_span', default=None)
+
+class _SpanContext:
+    __slots__ = ('tracer', 'span', 'token')
+
+    def __init__(self, tracer: 'Tracer', span):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current.reset(self.token)
+        except ValueError:
+            # Ended from another context (e.g. a request torn down elsewhere); just unset it
+            _current.set(None)
+        if self.span is not _NOOP_SPAN:
+            self.span.finish(exc)
+            self.tracer.export(self.span)
+        return False
+
+class JSONLinesExporter:
+    """Appends finished spans to a JSON-lines file shared by every worker.
+
+    Spans are buffered per process and written with one append when a root
+    span ends (or the buffer fills), so a request costs a single write.
+    """
+
+    def __init__(self, path: str, max_buffer: int = 256):
+        self.path = path
+        self.max_buffer = max_buffer
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._fd = None
+        self._pid = None
+
+    def export(self, span: Span):
+        line = (json.dumps(span.to_dict(), separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        with self._lock:
+            self._buffer.append(line)
+            if span.local_root or len(self._buffer) >= self.max_buffer:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = b''.join(self._buffer), []
+        try:
+            if self._pid != os.getpid():
+                # Don't share the parent's descriptor after a fork
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                self._pid = os.getpid()
+            # O_APPEND keeps each worker's batch contiguous
+            os.write(self._fd, batch)
+        except OSError as e:
+            logger.warning(f"Could not write spans to {self.path}: {e}")
+
+class OTLPExporter:
+    """Ships spans to an OpenTelemetry collector as OTLP/HTTP JSON from a background thread.
+
+    Spans are dropped (and counted) rather than blocking requests when the
+    collector falls behind.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME, batch_size: int = 512,
+                 interval: float = 2.0, max_queue: int = 10000):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._stats = {'sent': 0, 'dropped': 0, 'failed': 0}
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        self._ensure_running()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self._stats['dropped'] += 1
+
+    def flush(self):
+        self._send(self._drain())
+
+    def stats(self) -> Dict:
+        return dict(self._stats, queued=self._queue.qsize())
+
+    def _ensure_running(self):
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._send(batch)
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch: List[Span]):
+        if not batch:
+            return
+        # Imported here so enabling OTLP doesn't load requests at startup
+        import requests
+        body = {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [_otlp_span(span) for span in batch]}],
+        }]}
+        try:
+            response = requests.post(self.endpoint, json=body, timeout=5)
+            response.raise_for_status()
+            self._stats['sent'] += len(batch)
+        except requests.exceptions.RequestException as e:
+            self._stats['failed'] += len(batch)
+            logger.warning(f"Could not export {len(batch)} spans to {self.endpoint}: {e}")
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+def _otlp_span(span: Span) -> Dict:
+    start_ns = int(span.start * 1e9)
+    encoded = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        # SPAN_KIND_SERVER for request roots, SPAN_KIND_INTERNAL otherwise
+        'kind': 2 if span.local_root and 'http.method' in span.attributes else 1,
+        'startTimeUnixNano': str(start_ns),
+        'endTimeUnixNano': str(start_ns + int(span.duration * 1e9)),
+        'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+    }
+    if span.parent_id:
+        encoded['parentSpanId'] = span.parent_id
+    if span.links:
+        encoded['links'] = [{'traceId': link['trace_id'], 'spanId': link['span_id']} for link in span.links]
+    return encoded
+
+class Tracer:
+    """Creates spans and hands finished ones to the exporters"""
+
+    def __init__(self, exporters: List, sample_rate: float = 1.0):
+        self.exporters = exporters
+        self.sample_rate = sample_rate
+        self._stats = {'spans': 0, 'traces_sampled': 0, 'traces_skipped': 0}
+
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+             attributes: Optional[Dict] = None) -> _SpanContext:
+        current = _current.get()
+        links = None
+        if trace_id is not None and (current is None or current is _NOOP_SPAN or current.trace_id != trace_id):
+            # Continue an earlier trace (e.g. the order phase of an issuance), linked to the running one
+            if current is not None and current is not _NOOP_SPAN:
+                links = [{'trace_id': current.trace_id, 'span_id': current.span_id}]
+        elif current is _NOOP_SPAN:
+            return _SpanContext(self, _NOOP_SPAN)
+        elif current is not None:
+            return _SpanContext(self, Span(name, current.trace_id, current.span_id, attributes, local_root=False))
+        elif random.random() < self.sample_rate:
+            trace_id = secrets.token_hex(16)
+        else:
+            self._stats['traces_skipped'] += 1
+            return _SpanContext(self, _NOOP_SPAN)
+        self._stats['traces_sampled'] += 1
+        return _SpanContext(self, Span(name, trace_id, parent_id, attributes, links))
+
+    def export(self, span: Span):
+        self._stats['spans'] += 1
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush()
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        for exporter in self.exporters:
+            if isinstance(exporter, OTLPExporter):
+                stats['otlp'] = exporter.stats()
+        return stats
+
+_tracer: Optional[Tracer] = None
+
+def configure_tracing(path: Optional[str] = None, otlp_endpoint: Optional[str] = None,
+                      sample_rate: float = 1.0, service_name: str = SERVICE_NAME) -> Optional[Tracer]:
+    """Install the process-wide tracer; with neither a file nor an endpoint, tracing is turned off"""
+    global _tracer
+    exporters = []
+    if path:
+        exporters.append(JSONLinesExporter(path))
+    if otlp_endpoint:
+        exporters.append(OTLPExporter(otlp_endpoint, service_name))
+    _tracer = Tracer(exporters, sample_rate) if exporters else None
+    return _tracer
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+def span(name: str, **attributes):
+    """Time a block as a child of the current span: `with span('acme.keygen', bits=2048) as s:`.
+
+    trace_id= continues that trace instead (linking the current span). Costs
+    one global lookup when tracing is off.
+    """
+    if _tracer is None:
+        return _NOOP_CONTEXT
+    trace_id = attributes.pop('trace_id', None)
+    return _tracer.span(name, trace_id=trace_id, attributes=attributes)
+
+def traced(name: str):
+    """Decorator form of span() for functions and methods"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the running span, or None when untraced"""
+    current = _current.get()
+    return current.trace_id if current is not None else None
+
+def bind(func):
+    """Wrap func to run in the caller's trace context, e.g. as a background thread's target"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+def init_tracing(app):
+    """Open a root span per request and report its trace id in X-Trace-Id.
+
+    An incoming W3C traceparent header makes the request a child of the
+    caller's span. Nothing is installed unless TRACING_ENABLED is set.
+    """
+    if not app.config.get('TRACING_ENABLED'):
+        return None
+    tracer = configure_tracing(app.config['TRACING_FILE'], app.config['TRACING_OTLP_ENDPOINT'],
+                               app.config['TRACING_SAMPLE_RATE'])
+    if tracer is None:
+        return None
+    from flask import g, request
+
+    @app.before_request
+    def start_request_span():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        trace_id = parent_id = None
+        match = _TRACEPARENT.match(request.headers.get('traceparent', ''))
+        if match and int(match.group(3), 16) & 1:
+            # Only follow callers that sampled the trace; otherwise our own sample rate decides
+            trace_id, parent_id = match.group(1), match.group(2)
+        context = tracer.span(f"{request.method} {rule}", trace_id=trace_id, parent_id=parent_id,
+                              attributes={'http.method': request.method, 'http.route': rule})
+        context.__enter__()
+        g.trace_span = context
+
+    @app.after_request
+    def tag_response(response):
+        context = g.get('trace_span')
+        if context is not None and context.span is not _NOOP_SPAN:
+            context.span.set('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = context.span.trace_id
+        return response
+
+    # Streamed responses keep the request context, so the span also covers the stream
+    @app.teardown_request
+    def end_request_span(error=None):
+        context = g.pop('trace_span', None)
+        if context is not None:
+            context.__exit__(type(error) if error else None, error, None)
+
+    import atexit
+    atexit.register(tracer.flush)
+    return tracer
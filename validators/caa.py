@@ -0,0 +1,124 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import dns.rdata
+import dns.exception
+
+from .dns_resolver import CachingResolver, DNSResult
+from .public_suffix import get_public_suffix_trie
+
+logger = logging.getLogger(__name__)
+
+# Property tags defined by RFC 8659, RFC 8657 and RFC 9495; unknown critical tags block issuance
+KNOWN_TAGS = {'issue', 'issuewild', 'iodef', 'issuemail', 'issuevmc', 'contactemail', 'contactphone'}
+CRITICAL_FLAG = 128
+
+class CAARecord:
+    """One parsed CAA property"""
+
+    __slots__ = ('flags', 'tag', 'value')
+
+    def __init__(self, flags: int, tag: str, value: str):
+        self.flags = flags
+        self.tag = tag.lower()
+        self.value = value
+
+    @classmethod
+    def from_text(cls, text: str) -> 'CAARecord':
+        rdata = dns.rdata.from_text('IN', 'CAA', text)
+        return cls(rdata.flags, rdata.tag.decode('ascii'), rdata.value.decode('utf-8', 'replace'))
+
+    @property
+    def issuer(self) -> str:
+        """Issuer domain name of an issue/issuewild value ('' means no CA may issue)"""
+        return self.value.split(';', 1)[0].strip().lower()
+
+class CAAChecker:
+    """RFC 8659 CAA pre-check for a batch of names.
+
+    Each name is walked up towards its registered domain until a CAA RRset is
+    found. All ancestor lookups of a batch run concurrently through the shared
+    caching resolver, and relevant sets are memoized per ancestor so sibling
+    names reuse their parents' results.
+    """
+
+    def __init__(self, resolver: CachingResolver, issuer: str = 'letsencrypt.org'):
+        self.resolver = resolver
+        self.issuer = issuer.lower()
+        self._relevant = {}
+
+    def check_many(self, domains: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Return {domain: (issuance_allowed, reason)} for every name"""
+        chains = {domain: self._ancestors(domain) for domain in domains}
+        # One concurrent batch covers every ancestor of every name
+        answers = self.resolver.resolve_many([name for chain in chains.values() for name in chain], 'CAA')
+
+        results = {}
+        for domain, chain in chains.items():
+            owner, records = self._relevant_set(chain, answers)
+            results[domain] = self._authorize(domain, owner, records)
+        return results
+
+    def check(self, domain: str) -> Tuple[bool, str]:
+        return self.check_many([domain])[domain]
+
+    def _ancestors(self, domain: str) -> List[str]:
+        """The name itself followed by each parent, up to and including the registered domain"""
+        name = domain[2:] if domain.startswith('*.') else domain
+        registered = get_public_suffix_trie().registrable_domain(name) or name
+        labels = name.split('.')
+        depth = len(registered.split('.'))
+        return ['.'.join(labels[i:]) for i in range(0, len(labels) - depth + 1)]
+
+    def _relevant_set(self, chain: List[str], answers: Dict[str, DNSResult]) -> Tuple[Optional[str], List[CAARecord]]:
+        """Return the closest ancestor that has CAA records, with its parsed records"""
+        for index, name in enumerate(chain):
+            if name in self._relevant:
+                return self._relevant[name]
+            result = answers[name]
+            if result.status == DNSResult.ERROR:
+                # Fail open: the CA makes the final decision, and a flaky resolver shouldn't block orders
+                logger.warning(f"CAA lookup for {name} failed: {result.message}")
+            if result.status == DNSResult.OK and result.records:
+                relevant = (name, self._parse(name, result.records))
+                for visited in chain[:index + 1]:
+                    self._relevant[visited] = relevant
+                return relevant
+        for visited in chain:
+            self._relevant[visited] = (None, [])
+        return None, []
+
+    @staticmethod
+    def _parse(name: str, texts: List[str]) -> List[CAARecord]:
+        records = []
+        for text in texts:
+            try:
+                records.append(CAARecord.from_text(text))
+            except (dns.exception.DNSException, ValueError) as e:
+                logger.warning(f"Ignoring malformed CAA record at {name}: {text} ({e})")
+        return records
+
+    def _authorize(self, domain: str, owner: Optional[str], records: List[CAARecord]) -> Tuple[bool, str]:
+        if not records:
+            return True, ""
+
+        for record in records:
+            if record.flags & CRITICAL_FLAG and record.tag not in KNOWN_TAGS:
+                return False, f"CAA record at {owner} has unknown critical tag '{record.tag}'"
+
+        # issuewild governs wildcard names when present, otherwise issue applies to both
+        issue = [r for r in records if r.tag == 'issue']
+        if domain.startswith('*.'):
+            issuewild = [r for r in records if r.tag == 'issuewild']
+            if issuewild:
+                issue = issuewild
+
+        if not issue:
+            return True, ""
+        if any(r.issuer == self.issuer for r in issue):
+            return True, ""
+
+        allowed = sorted({r.issuer for r in issue if r.issuer})
+        if not allowed:
+            return False, f"CAA records at {owner} forbid all issuance"
+        return False, f"CAA records at {owner} only allow {', '.join(allowed)}"
@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import dns.exception
+import dns.rdatatype
+import dns.resolver
+
+logger = logging.getLogger(__name__)
+
+class DNSResult:
+    """Outcome of one cached DNS lookup"""
+
+    __slots__ = ('name', 'rdtype', 'status', 'records', 'cname', 'ttl', 'message')
+
+    OK = 'ok'
+    NXDOMAIN = 'nxdomain'
+    NODATA = 'nodata'
+    ERROR = 'error'
+
+    def __init__(self, name: str, rdtype: str, status: str, records: Optional[List[str]] = None,
+                 cname: Optional[str] = None, ttl: float = 0.0, message: str = ''):
+        self.name = name
+        self.rdtype = rdtype
+        self.status = status
+        self.records = records or []
+        self.cname = cname
+        self.ttl = ttl
+        self.message = message
+
+    @property
+    def exists(self) -> bool:
+        """Whether the name exists (has the records, or at least a CNAME)"""
+        return self.status == self.OK or (self.status == self.NODATA and self.cname is not None)
+
+    def __repr__(self):
+        return f"DNSResult({self.name!r}, {self.rdtype!r}, {self.status!r}, records={self.records!r})"
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after their own TTL"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class CachingResolver:
+    """Concurrent DNS resolver with a per-process, TTL-respecting LRU cache.
+
+    Positive answers are cached for their record TTL and NXDOMAIN/NODATA answers
+    for the zone's SOA negative TTL (RFC 2308), capped by negative_ttl.
+    """
+
+    def __init__(self, nameservers: Optional[List[str]] = None, port: int = 53, timeout: float = 2.0,
+                 lifetime: float = 5.0, max_workers: int = 32, cache_size: int = 10000,
+                 negative_ttl: float = 300.0, error_ttl: float = 5.0):
+        if nameservers:
+            self._resolver = dns.resolver.Resolver(configure=False)
+            self._resolver.nameservers = list(nameservers)
+        else:
+            self._resolver = dns.resolver.Resolver()
+        self._resolver.port = port
+        self._resolver.timeout = timeout
+        self._resolver.lifetime = lifetime
+        self.max_workers = max_workers
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.cache = TTLCache(cache_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def resolve(self, name: str, rdtype: str = 'A') -> DNSResult:
+        """Resolve one name, answering from the cache when possible"""
+        key = (name.lower().rstrip('.'), rdtype)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._lookup(key[0], rdtype)
+
+    def resolve_many(self, names: Iterable[str], rdtype: str = 'A') -> Dict[str, DNSResult]:
+        """Resolve many names concurrently; the batch takes about as long as the slowest lookup"""
+        unique = list(dict.fromkeys(names))
+        results = {}
+        pending = []
+        for name in unique:
+            cached = self.cache.get((name.lower().rstrip('.'), rdtype))
+            if cached is not None:
+                results[name] = cached
+            else:
+                pending.append(name)
+        if len(pending) == 1:
+            results[pending[0]] = self._lookup(pending[0].lower().rstrip('.'), rdtype)
+        elif pending:
+            executor = self._get_executor()
+            lookups = executor.map(lambda n: self._lookup(n.lower().rstrip('.'), rdtype), pending)
+            for name, result in zip(pending, lookups):
+                results[name] = result
+        return results
+
+    def stats(self) -> Dict:
+        return {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dns')
+        return self._executor
+
+    def _lookup(self, name: str, rdtype: str) -> DNSResult:
+        result = self._query(name, rdtype)
+        self.cache.put((name, rdtype), result, result.ttl)
+        return result
+
+    def _query(self, name: str, rdtype: str) -> DNSResult:
+        try:
+            answer = self._resolver.resolve(name, rdtype, raise_on_no_answer=False, search=False)
+        except dns.resolver.NXDOMAIN as e:
+            ttl = self._negative_ttl(self._first_response(e))
+            return DNSResult(name, rdtype, DNSResult.NXDOMAIN, ttl=ttl, message=f"Domain {name} does not exist")
+        except (dns.exception.DNSException, OSError) as e:
+            return DNSResult(name, rdtype, DNSResult.ERROR, ttl=self.error_ttl, message=str(e))
+
+        # A single query returns the CNAME chain too, so no follow-up CNAME lookup is needed
+        cname = None
+        for rrset in answer.response.answer:
+            if rrset.rdtype == dns.rdatatype.CNAME:
+                cname = rrset[0].target.to_text()
+                break
+
+        if answer.rrset is None:
+            ttl = self._negative_ttl(answer.response)
+            return DNSResult(name, rdtype, DNSResult.NODATA, cname=cname, ttl=ttl,
+                             message=f"No {rdtype} records for {name}")
+
+        ttl = max(0.0, answer.expiration - time.time())
+        return DNSResult(name, rdtype, DNSResult.OK, records=[r.to_text() for r in answer.rrset],
+                         cname=cname, ttl=ttl)
+
+    def _negative_ttl(self, response) -> float:
+        """Negative-cache TTL from the authority SOA, falling back to the configured default"""
+        if response is not None:
+            for rrset in response.authority:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    return float(min(rrset.ttl, rrset[0].minimum, self.negative_ttl))
+        return self.negative_ttl
+
+    @staticmethod
+    def _first_response(error: dns.resolver.NXDOMAIN):
+        try:
+            responses = error.responses()
+        except Exception:
+            return None
+        return next(iter(responses.values()), None)
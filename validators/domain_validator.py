@@ -1,10 +1,11 @@
 import re
 import validators
-from typing import List, Dict, Tuple
-import dns.resolver
+from typing import List, Dict, Tuple, Optional
 import logging
 import ipaddress
 
+from .public_suffix import get_public_suffix_trie
+
 logger = logging.getLogger(__name__)
 
 class DomainValidator:
@@ -23,15 +24,22 @@ class DomainValidator:
     # Maximum domains per certificate
     MAX_DOMAINS = 100
     
+    # Shared caching resolver, built lazily from _resolver_options (see configure_resolver)
+    _resolver = None
+    _resolver_options = {}
+    
+    # CA whose issuance CAA records must permit
+    CAA_ISSUER = 'letsencrypt.org'
+    
     @classmethod
-    def validate_domains(cls, domains: str) -> Tuple[bool, List[str], str]:
+    def validate_domains(cls, domains: str, check_caa: bool = False) -> Tuple[bool, List[str], str]:
         """
-        Validate domain input string
+        Validate domain input string, optionally rejecting names whose CAA records forbid issuance
         Returns: (is_valid, domain_list, error_message)
         """
         try:
-            # Split and clean domains
-            domain_list = [d.strip().lower() for d in domains.split(',') if d.strip()]
+            # Split and clean domains, dropping duplicates but keeping the first one first
+            domain_list = list(dict.fromkeys(d.strip().lower() for d in domains.split(',') if d.strip()))
             
             if not domain_list:
                 return False, [], "No domains provided"
@@ -40,12 +48,19 @@ class DomainValidator:
                 return False, [], f"Too many domains. Maximum allowed: {cls.MAX_DOMAINS}"
             
             # Validate each domain
-            valid_domains = []
             for domain in domain_list:
                 is_valid, error = cls.validate_single_domain(domain)
                 if not is_valid:
                     return False, [], f"Invalid domain '{domain}': {error}"
-                valid_domains.append(domain)
+            
+            # Keep names under the same registered domain together
+            valid_domains = [d for group in cls.group_by_registered_domain(domain_list).values() for d in group]
+            
+            if check_caa:
+                blocked = [(d, reason) for d, (allowed, reason) in cls.check_caa(valid_domains).items() if not allowed]
+                if blocked:
+                    details = '; '.join(f"{d}: {reason}" for d, reason in blocked)
+                    return False, [], f"CAA records forbid {cls.CAA_ISSUER} from issuing ({details})"
             
             return True, valid_domains, ""
             
@@ -57,8 +72,9 @@ class DomainValidator:
     def validate_single_domain(cls, domain: str) -> Tuple[bool, str]:
         """Validate a single domain"""
         try:
-            # Basic format check
-            if not cls.DOMAIN_PATTERN.match(domain):
+            # Basic format check (a leading wildcard label is checked separately below)
+            base_domain = domain[2:] if domain.startswith('*.') else domain
+            if not cls.DOMAIN_PATTERN.match(base_domain):
                 return False, "Invalid domain format"
             
             # Check for reserved TLDs
@@ -91,12 +107,39 @@ class DomainValidator:
                 if len(label) == 0:
                     return False, "Empty domain label"
             
+            # A certificate can't cover a whole public suffix (e.g. co.uk or *.co.uk)
+            if get_public_suffix_trie().is_public_suffix(base_domain):
+                if domain.startswith('*.'):
+                    return False, f"Wildcard cannot cover the public suffix {base_domain}"
+                return False, "Public suffixes cannot be used as domains"
+            
             return True, ""
             
         except Exception as e:
             logger.error(f"Single domain validation error: {str(e)}")
             return False, f"Validation error: {str(e)}"
     
+    @classmethod
+    def registered_domain(cls, domain: str) -> Optional[str]:
+        """Return the registrable domain for a name (wildcards included), e.g. example.co.uk"""
+        base_domain = domain[2:] if domain.startswith('*.') else domain
+        return get_public_suffix_trie().registrable_domain(base_domain)
+    
+    @classmethod
+    def group_by_registered_domain(cls, domains: List[str]) -> Dict[str, List[str]]:
+        """Group names by registrable domain, preserving first-seen order of groups and names"""
+        groups = {}
+        for domain in domains:
+            key = cls.registered_domain(domain) or domain
+            groups.setdefault(key, []).append(domain)
+        return groups
+    
+    @classmethod
+    def check_caa(cls, domains: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Check CAA authorization for every name concurrently; returns {domain: (allowed, reason)}"""
+        from .caa import CAAChecker
+        return CAAChecker(cls.get_resolver(), cls.CAA_ISSUER).check_many(domains)
+    
     @classmethod
     def validate_email(cls, email: str) -> Tuple[bool, str]:
         """Validate email address"""
@@ -124,41 +167,65 @@ class DomainValidator:
             logger.error(f"Email validation error: {str(e)}")
             return False, f"Email validation error: {str(e)}"
     
+    @classmethod
+    def configure_resolver(cls, nameservers: Optional[List[str]] = None, port: int = 53,
+                           timeout: float = 2.0, **kwargs):
+        """Replace the shared resolver settings, e.g. to point lookups at a local stub server.
+
+        dnspython is only imported when the first lookup builds the resolver.
+        """
+        cls._resolver_options = dict(nameservers=nameservers, port=port, timeout=timeout, **kwargs)
+        cls._resolver = None
+    
+    @classmethod
+    def get_resolver(cls) -> 'CachingResolver':
+        """Return the shared caching resolver, creating it from the configured options if needed"""
+        if cls._resolver is None:
+            from .dns_resolver import CachingResolver
+            cls._resolver = CachingResolver(**cls._resolver_options)
+        return cls._resolver
+    
     @classmethod
     def check_dns_resolution(cls, domain: str) -> Tuple[bool, str]:
         """Check if domain resolves to DNS"""
+        return cls.check_dns_resolution_batch([domain])[domain]
+    
+    @classmethod
+    def check_dns_resolution_batch(cls, domains: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Check many domains concurrently; returns {domain: (resolves, error_message)}"""
+        from .dns_resolver import DNSResult
         try:
             # Remove wildcard for DNS check
-            check_domain = domain.replace('*.', '')
-            
-            # Try to resolve A record
-            try:
-                dns.resolver.resolve(check_domain, 'A')
-                return True, ""
-            except dns.resolver.NXDOMAIN:
-                return False, f"Domain {domain} does not exist"
-            except dns.resolver.NoAnswer:
-                # Try CNAME record
-                try:
-                    dns.resolver.resolve(check_domain, 'CNAME')
-                    return True, ""
-                except dns.resolver.NXDOMAIN:
-                    return False, f"Domain {domain} does not exist"
-                except Exception:
-                    return False, f"Domain {domain} has no A or CNAME records"
-            except Exception as e:
-                return False, f"DNS resolution failed: {str(e)}"
+            check_domains = {domain: domain.replace('*.', '') for domain in domains}
+            results = cls.get_resolver().resolve_many(check_domains.values(), 'A')
+            
+            checked = {}
+            for domain, check_domain in check_domains.items():
+                result = results[check_domain]
+                if result.exists:
+                    checked[domain] = (True, "")
+                elif result.status == DNSResult.NXDOMAIN:
+                    checked[domain] = (False, f"Domain {domain} does not exist")
+                elif result.status == DNSResult.NODATA:
+                    checked[domain] = (False, f"Domain {domain} has no A or CNAME records")
+                else:
+                    checked[domain] = (False, f"DNS resolution failed: {result.message}")
+            return checked
                 
         except Exception as e:
             logger.error(f"DNS resolution check error: {str(e)}")
-            return False, f"DNS check error: {str(e)}"
+            return {domain: (False, f"DNS check error: {str(e)}") for domain in domains}
     
     @classmethod
-    def validate_validation_method(cls, method: str) -> Tuple[bool, str]:
+    def validate_validation_method(cls, method: str, domains: Optional[List[str]] = None) -> Tuple[bool, str]:
         """Validate ACME validation method"""
         valid_methods = ['dns', 'http']
         
         if not method or method not in valid_methods:
             return False, f"Invalid validation method. Must be one of: {', '.join(valid_methods)}"
         
+        # Let's Encrypt only issues wildcards through DNS-01
+        if method == 'http' and domains and any(d.startswith('*.') for d in domains):
+            return False, "Wildcard domains require DNS validation"
+        
         return True, "" 
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_LIST_PATH = os.path.join(DATA_DIR, 'public_suffix_list.dat')
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, 'public_suffix_list.json')
+
+# Node markers; labels never contain these characters
+_RULE = '$'
+_EXCEPTION = '!'
+
+class PublicSuffixTrie:
+    """Suffix trie over the Public Suffix List with O(labels) registrable-domain lookups"""
+
+    __slots__ = ('_root',)
+
+    def __init__(self, root: Optional[Dict] = None):
+        self._root = root if root is not None else {}
+
+    @classmethod
+    def from_lines(cls, lines, include_private: bool = True) -> 'PublicSuffixTrie':
+        """Compile a trie from the lines of a public_suffix_list.dat file"""
+        trie = cls()
+        for line in lines:
+            line = line.strip()
+            if line.startswith('// ===BEGIN PRIVATE DOMAINS===') and not include_private:
+                break
+            if not line or line.startswith('//'):
+                continue
+            rule = line.split()[0]
+            trie.add_rule(rule)
+            # Rules are published in Unicode; index the punycode form too
+            try:
+                ascii_rule = rule.encode('idna').decode('ascii')
+            except UnicodeError:
+                continue
+            if ascii_rule != rule:
+                trie.add_rule(ascii_rule)
+        return trie
+
+    def add_rule(self, rule: str):
+        """Add one PSL rule (plain, wildcard '*.' or exception '!')"""
+        exception = rule.startswith('!')
+        labels = rule.lstrip('!').lower().split('.')
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        node[_EXCEPTION if exception else _RULE] = 1
+
+    def public_suffix_length(self, labels: List[str]) -> int:
+        """Return how many rightmost labels form the public suffix"""
+        # The implicit '*' rule makes every TLD a public suffix
+        suffix_length = 1
+        node = self._root
+        for depth, label in enumerate(reversed(labels)):
+            wildcard = node.get('*')
+            if wildcard is not None and _RULE in wildcard:
+                suffix_length = max(suffix_length, depth + 1)
+            child = node.get(label)
+            if child is None:
+                break
+            if _EXCEPTION in child:
+                # An exception rule wins and removes its leftmost label
+                return depth
+            if _RULE in child:
+                suffix_length = depth + 1
+            node = child
+        return suffix_length
+
+    def public_suffix(self, domain: str) -> str:
+        """Return the public suffix of a domain, e.g. 'co.uk' for 'www.example.co.uk'"""
+        labels = domain.lower().rstrip('.').split('.')
+        return '.'.join(labels[-self.public_suffix_length(labels):])
+
+    def registrable_domain(self, domain: str) -> Optional[str]:
+        """Return the registrable domain (public suffix plus one label), or None for a bare suffix"""
+        labels = domain.lower().rstrip('.').split('.')
+        suffix_length = self.public_suffix_length(labels)
+        if len(labels) <= suffix_length:
+            return None
+        return '.'.join(labels[-(suffix_length + 1):])
+
+    def is_public_suffix(self, domain: str) -> bool:
+        """Return whether the domain is itself a public suffix"""
+        labels = domain.lower().rstrip('.').split('.')
+        return len(labels) <= self.public_suffix_length(labels)
+
+    def to_dict(self) -> Dict:
+        return self._root
+
+def _source_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def load_trie(list_path: str = DEFAULT_LIST_PATH, cache_path: Optional[str] = DEFAULT_CACHE_PATH) -> PublicSuffixTrie:
+    """Load the trie from the pre-compiled cache, compiling (and caching) it from the list if stale"""
+    with open(list_path, 'rb') as f:
+        source = f.read()
+    digest = _source_digest(source)
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('source_sha256') == digest:
+                return PublicSuffixTrie(cached['trie'])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable public suffix cache {cache_path}: {e}")
+
+    trie = PublicSuffixTrie.from_lines(source.decode('utf-8').splitlines())
+    if cache_path:
+        write_cache(trie, digest, cache_path)
+    return trie
+
+def write_cache(trie: PublicSuffixTrie, digest: str, cache_path: str):
+    """Write the compiled trie as compact JSON; read-only filesystems just skip caching"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'source_sha256': digest, 'trie': trie.to_dict()}, f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.info(f"Could not write public suffix cache {cache_path}: {e}")
+
+_trie: Optional[PublicSuffixTrie] = None
+_trie_lock = threading.Lock()
+
+def get_public_suffix_trie() -> PublicSuffixTrie:
+    """Return the process-wide trie, loading it on first use"""
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                _trie = load_trie(
+                    os.environ.get('PUBLIC_SUFFIX_LIST_PATH') or DEFAULT_LIST_PATH,
+                    os.environ.get('PUBLIC_SUFFIX_CACHE_PATH') or DEFAULT_CACHE_PATH
+                )
+    return _trie
+
+if __name__ == '__main__':
+    # Pre-compile the cache at build time: python -m validators.public_suffix
+    logging.basicConfig(level=logging.INFO)
+    list_path = os.environ.get('PUBLIC_SUFFIX_LIST_PATH') or DEFAULT_LIST_PATH
+    cache_path = os.environ.get('PUBLIC_SUFFIX_CACHE_PATH') or DEFAULT_CACHE_PATH
+    with open(list_path, 'rb') as f:
+        source = f.read()
+    write_cache(PublicSuffixTrie.from_lines(source.decode('utf-8').splitlines()), _source_digest(source), cache_path)
+    logger.info(f"Wrote public suffix cache to {cache_path}")